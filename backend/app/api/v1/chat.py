@@ -3,8 +3,23 @@ Chat API endpoints
 Handles LLM chat interactions via Ollama
 """
 from fastapi import APIRouter, HTTPException, status
-from app.schemas.chat import ChatRequest, ChatResponse, ChatErrorResponse
+from fastapi.responses import StreamingResponse
+from app.schemas.chat import (
+    ChatRequest,
+    ChatBatchRequest,
+    ChatResponse,
+    ChatErrorResponse,
+    ChatSessionCreate,
+    ChatSession,
+    ChatSessionWithMessages
+)
+from app.db.queries import chat_sessions as session_queries
+from app.services.chat_session_service import get_history_writer
 from app.services.llm_chat_service import LLMChatService
+from app.services.llm_providers import LLMUnavailableError, get_llm_router
+from app.services.model_residency import get_residency_manager
+import json
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +33,7 @@ router = APIRouter()
     status_code=status.HTTP_200_OK,
     responses={
         500: {"model": ChatErrorResponse, "description": "Internal server error"},
+        503: {"model": ChatErrorResponse, "description": "No LLM provider available"},
         400: {"model": ChatErrorResponse, "description": "Bad request"}
     }
 )
@@ -25,12 +41,11 @@ def chat_with_llm(request: ChatRequest):
     """
     Send a message to the LLM and receive a response
 
-    This endpoint uses Haystack pipeline with Ollama as the backend.
+    The request is routed to the fastest healthy LLM provider (see LLM_PROVIDERS),
+    with failover on timeouts; set `provider` to pin it to one backend.
     If rag_id is provided, retrieves relevant documents from the RAG collection
     and includes them as context for the LLM response.
 
-    Ollama must be running at the configured endpoint (default: http://localhost:11434)
-
     Args:
         request: ChatRequest containing the user message and optional rag_id
 
@@ -49,11 +64,21 @@ def chat_with_llm(request: ChatRequest):
         result = LLMChatService.generate_response(
             user_message=request.message.strip(),
             rag_id=request.rag_id,
-            top_k=request.top_k
+            top_k=request.top_k,
+            provider=request.provider,
+            session_id=request.session_id,
+            compress_context=request.compress_context
         )
 
         return ChatResponse(**result)
 
+    except LLMUnavailableError as e:
+        logger.error(f"LLM unavailable: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
     except ValueError as e:
         # RAG not found or validation errors
         logger.error(f"Validation error: {str(e)}")
@@ -74,18 +99,149 @@ def chat_with_llm(request: ChatRequest):
         )
 
 
+@router.post(
+    "/batch",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}, "description": "One JSON result per line"},
+        400: {"model": ChatErrorResponse, "description": "Bad request"},
+        500: {"model": ChatErrorResponse, "description": "Internal server error"}
+    }
+)
+def chat_batch(request: ChatBatchRequest):
+    """
+    Answer a list of questions against a RAG (evaluation runs)
+
+    Questions are embedded in one batch, retrievals run concurrently and
+    generations are sent to the LLM with a bounded concurrency. Results are
+    streamed back as NDJSON as they complete (each line carries the question
+    index and per-item timings), followed by a final summary line.
+    """
+    from app.config import settings
+
+    questions = [q.strip() for q in request.questions]
+    if any(not q for q in questions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Questions cannot be empty"
+        )
+    if len(questions) > settings.CHAT_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many questions (max {settings.CHAT_BATCH_MAX_QUESTIONS})"
+        )
+
+    start = time.perf_counter()
+    try:
+        results = LLMChatService.generate_batch(
+            questions=questions,
+            rag_id=request.rag_id,
+            top_k=request.top_k,
+            provider=request.provider,
+            concurrency=request.concurrency
+        )
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Error in batch chat endpoint: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to start batch: {str(e)}"
+        )
+
+    def ndjson():
+        succeeded = failed = 0
+        for result in results:
+            if result["status"] == "success":
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps({"type": "result", **result}, ensure_ascii=False) + "\n"
+
+        yield json.dumps({
+            "type": "summary",
+            "rag_id": request.rag_id,
+            "total": len(questions),
+            "succeeded": succeeded,
+            "failed": failed,
+            "duration_ms": (time.perf_counter() - start) * 1000
+        }) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+# ==================== CHAT SESSIONS ====================
+
+@router.post("/sessions", response_model=ChatSession, status_code=status.HTTP_201_CREATED)
+def create_chat_session(session: ChatSessionCreate):
+    """Create a server-side chat session (pass its id as session_id in chat requests)"""
+    if session.rag_id is not None:
+        from app.db.queries import rags as rag_queries
+        if not rag_queries.get_rag_by_id(session.rag_id):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"RAG {session.rag_id} not found"
+            )
+
+    try:
+        return session_queries.create_session(rag_id=session.rag_id, title=session.title)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create chat session: {str(e)}"
+        )
+
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionWithMessages)
+def get_chat_session(session_id: int, limit: int = 200):
+    """Get a chat session with its most recent messages"""
+    # Make sure queued turns are visible
+    get_history_writer().flush()
+
+    session = session_queries.get_session_by_id(session_id)
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat session {session_id} not found"
+        )
+
+    session['messages'] = session_queries.get_session_messages(session_id, limit=limit)
+    return session
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_chat_session(session_id: int):
+    """Delete a chat session and its messages"""
+    if not session_queries.delete_session(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat session {session_id} not found"
+        )
+
+
 @router.get("/health")
 def chat_health_check():
     """
     Check if the chat service is available
 
-    Returns basic information about the chat configuration
+    Returns basic information about the chat configuration, the rolling
+    latency / error rate of each LLM provider and whether the Ollama model
+    is currently loaded
     """
     from app.config import settings
 
+    providers = get_llm_router().stats()
+    residency = get_residency_manager()
+
     return {
-        "status": "ok",
+        "status": "ok" if any(p["healthy"] for p in providers) else "degraded",
         "ollama_url": settings.OLLAMA_BASE_URL,
         "model": settings.OLLAMA_MODEL,
+        "providers": providers,
+        "model_residency": residency.status() if residency else None,
         "message": "Chat service is running. Ensure Ollama is active at the configured URL."
     }
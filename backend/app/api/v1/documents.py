@@ -2,19 +2,27 @@
 Documents API endpoints
 Handles document CRUD, versioning, and generation from workflows
 """
-from fastapi import APIRouter, HTTPException, status, Query
+from fastapi import APIRouter, HTTPException, status, Query, Response
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
+from app.schemas.common import ListView
 from app.schemas.document import (
     Document,
+    DocumentListItem,
     DocumentCreate,
     DocumentUpdate,
     DocumentVersion,
+    DocumentVersionListItem,
+    VersionStorageReport,
+    VersionCompactionResult,
     DocumentWithVersions,
     GenerateDocumentRequest,
     DocumentStatus
 )
-from app.db.queries import documents as document_queries
+from app.db.async_queries import documents as document_queries
+from app.db.pagination import decode_cursor, set_next_cursor
 from app.services.document_generator import DocumentGenerator
+from app.services.version_compaction import compact_versions
 
 router = APIRouter()
 
@@ -22,10 +30,10 @@ router = APIRouter()
 # ==================== DOCUMENT CRUD ====================
 
 @router.post("/", response_model=Document, status_code=status.HTTP_201_CREATED)
-def create_document(document: DocumentCreate):
+async def create_document(document: DocumentCreate):
     """Create a new document manually"""
     try:
-        db_document = document_queries.create_document(
+        db_document = await document_queries.create_document(
             project_id=document.project_id,
             workflow_id=document.workflow_id,
             title=document.title,
@@ -42,19 +50,26 @@ def create_document(document: DocumentCreate):
         )
 
 
-@router.get("/", response_model=List[Document])
-def get_documents(
+@router.get("/", response_model=List[DocumentListItem])
+async def get_documents(
+    response: Response,
     status_filter: Optional[DocumentStatus] = Query(None, alias="status"),
     limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    view: ListView = Query(ListView.FULL, description="summary: omit content, add content_length"),
+    cursor: Optional[str] = Query(None, description="Opaque X-Next-Cursor value of the previous page")
 ):
-    """Get all documents with optional filters"""
+    """Get all documents with optional filters (most recently updated first)"""
+    after = decode_cursor(cursor)
     try:
-        documents = document_queries.get_documents(
+        documents = await document_queries.get_documents(
             status=status_filter.value if status_filter else None,
             limit=limit,
-            offset=offset
+            offset=offset,
+            summary=view == ListView.SUMMARY,
+            after=after
         )
+        set_next_cursor(response, documents, limit, "updated_at")
         return documents
     except Exception as e:
         raise HTTPException(
@@ -64,9 +79,9 @@ def get_documents(
 
 
 @router.get("/{document_id}", response_model=Document)
-def get_document(document_id: int):
+async def get_document(document_id: int):
     """Get a specific document by ID"""
-    document = document_queries.get_document_by_id(document_id)
+    document = await document_queries.get_document_by_id(document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,19 +91,11 @@ def get_document(document_id: int):
 
 
 @router.put("/{document_id}", response_model=Document)
-def update_document(document_id: int, document_update: DocumentUpdate):
+async def update_document(document_id: int, document_update: DocumentUpdate):
     """Update a document (creates a new version if content changes)"""
     try:
-        # Check if document exists
-        existing = document_queries.get_document_by_id(document_id)
-        if not existing:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Document {document_id} not found"
-            )
-
-        # Update document
-        updated = document_queries.update_document(
+        # Single UPDATE ... RETURNING: None if the document does not exist
+        updated = await document_queries.update_document(
             document_id=document_id,
             title=document_update.title,
             content=document_update.content,
@@ -98,6 +105,11 @@ def update_document(document_id: int, document_update: DocumentUpdate):
             create_version=document_update.content is not None,
             change_summary=f"Updated via API"
         )
+        if not updated:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Document {document_id} not found"
+            )
 
         return updated
     except HTTPException:
@@ -110,9 +122,9 @@ def update_document(document_id: int, document_update: DocumentUpdate):
 
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_document(document_id: int):
+async def delete_document(document_id: int):
     """Delete a document (cascade deletes versions and chunks)"""
-    success = document_queries.delete_document(document_id)
+    success = await document_queries.delete_document(document_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -123,10 +135,11 @@ def delete_document(document_id: int):
 # ==================== DOCUMENT GENERATION ====================
 
 @router.post("/generate", response_model=Document, status_code=status.HTTP_201_CREATED)
-def generate_document(request: GenerateDocumentRequest):
+async def generate_document(request: GenerateDocumentRequest):
     """Generate a document from a workflow"""
     try:
-        document = DocumentGenerator.generate_document_from_workflow(
+        document = await run_in_threadpool(
+            DocumentGenerator.generate_document_from_workflow,
             workflow_id=request.workflow_id,
             title=request.title,
             content_type=request.content_type.value,
@@ -148,9 +161,9 @@ def generate_document(request: GenerateDocumentRequest):
 # ==================== DOCUMENT STATUS WORKFLOW ====================
 
 @router.post("/{document_id}/validate", response_model=Document)
-def validate_document(document_id: int):
+async def validate_document(document_id: int):
     """Change document status to 'validated'"""
-    document = document_queries.validate_document(document_id)
+    document = await document_queries.validate_document(document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -160,9 +173,9 @@ def validate_document(document_id: int):
 
 
 @router.post("/{document_id}/publish", response_model=Document)
-def publish_document(document_id: int):
+async def publish_document(document_id: int):
     """Change document status to 'published'"""
-    document = document_queries.publish_document(document_id)
+    document = await document_queries.publish_document(document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -173,25 +186,28 @@ def publish_document(document_id: int):
 
 # ==================== DOCUMENT VERSIONS ====================
 
-@router.get("/{document_id}/versions", response_model=List[DocumentVersion])
-def get_document_versions(document_id: int):
-    """Get all versions of a document"""
+@router.get("/{document_id}/versions", response_model=List[DocumentVersionListItem])
+async def get_document_versions(
+    document_id: int,
+    view: ListView = Query(ListView.SUMMARY, description="full: rebuild and include every version's content")
+):
+    """Get all versions of a document (metadata only unless view=full)"""
     # Check if document exists
-    document = document_queries.get_document_by_id(document_id)
+    document = await document_queries.get_document_by_id(document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Document {document_id} not found"
         )
 
-    versions = document_queries.get_document_versions(document_id)
+    versions = await document_queries.get_document_versions(document_id, summary=view == ListView.SUMMARY)
     return versions
 
 
 @router.get("/{document_id}/versions/{version_number}", response_model=DocumentVersion)
-def get_document_version(document_id: int, version_number: int):
+async def get_document_version(document_id: int, version_number: int):
     """Get a specific version of a document"""
-    version = document_queries.get_version_by_number(document_id, version_number)
+    version = await document_queries.get_version_by_number(document_id, version_number)
     if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -201,9 +217,12 @@ def get_document_version(document_id: int, version_number: int):
 
 
 @router.get("/{document_id}/with-versions", response_model=DocumentWithVersions)
-def get_document_with_versions(document_id: int):
-    """Get a document with all its versions"""
-    document = document_queries.get_document_with_versions(document_id)
+async def get_document_with_versions(
+    document_id: int,
+    view: ListView = Query(ListView.SUMMARY, description="full: rebuild and include every version's content")
+):
+    """Get a document with all its versions (version metadata only unless view=full)"""
+    document = await document_queries.get_document_with_versions(document_id, summary=view == ListView.SUMMARY)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -212,23 +231,51 @@ def get_document_with_versions(document_id: int):
     return document
 
 
+@router.get("/versions/storage", response_model=VersionStorageReport)
+async def get_version_storage_report(document_id: Optional[int] = None):
+    """Storage used by document versions (all documents, or one) and bytes saved by delta storage"""
+    return await document_queries.get_version_storage_report(document_id)
+
+
+@router.post("/versions/compact", response_model=VersionCompactionResult)
+async def compact_document_versions(
+    keep_last: Optional[int] = Query(None, ge=0, description="Versions kept per document (default: settings, 0 = all)"),
+    max_age_days: Optional[int] = Query(None, ge=0, description="Drop older versions (default: settings, 0 = never)")
+):
+    """Run a version compaction pass now (re-encode as snapshots + deltas, apply retention)"""
+    try:
+        return await run_in_threadpool(compact_versions, keep_last=keep_last, max_age_days=max_age_days)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Version compaction failed: {str(e)}"
+        )
+
+
 # ==================== PROJECT-SPECIFIC ENDPOINTS ====================
 
-@router.get("/by-project/{project_id}", response_model=List[Document])
-def get_documents_by_project(
+@router.get("/by-project/{project_id}", response_model=List[DocumentListItem])
+async def get_documents_by_project(
     project_id: int,
+    response: Response,
     status_filter: Optional[DocumentStatus] = Query(None, alias="status"),
     limit: int = Query(100, ge=1, le=500),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    view: ListView = Query(ListView.FULL, description="summary: omit content, add content_length"),
+    cursor: Optional[str] = Query(None, description="Opaque X-Next-Cursor value of the previous page")
 ):
-    """Get all documents for a specific project"""
+    """Get all documents for a specific project (most recently updated first)"""
+    after = decode_cursor(cursor)
     try:
-        documents = document_queries.get_documents_by_project(
+        documents = await document_queries.get_documents_by_project(
             project_id=project_id,
             status=status_filter.value if status_filter else None,
             limit=limit,
-            offset=offset
+            offset=offset,
+            summary=view == ListView.SUMMARY,
+            after=after
         )
+        set_next_cursor(response, documents, limit, "updated_at")
         return documents
     except Exception as e:
         raise HTTPException(
@@ -238,10 +285,11 @@ def get_documents_by_project(
 
 
 @router.post("/generate-project-summary/{project_id}", response_model=Document, status_code=status.HTTP_201_CREATED)
-def generate_project_summary(project_id: int, title: Optional[str] = None):
+async def generate_project_summary(project_id: int, title: Optional[str] = None):
     """Generate a summary document for all workflows in a project"""
     try:
-        document = DocumentGenerator.generate_summary_document_for_project(
+        document = await run_in_threadpool(
+            DocumentGenerator.generate_summary_document_for_project,
             project_id=project_id,
             title=title
         )
@@ -259,10 +307,10 @@ def generate_project_summary(project_id: int, title: Optional[str] = None):
 
 
 @router.get("/stats/by-project/{project_id}")
-def get_document_stats(project_id: int):
+async def get_document_stats(project_id: int):
     """Get document statistics for a project"""
     try:
-        stats = document_queries.get_document_stats_by_project(project_id)
+        stats = await document_queries.get_document_stats_by_project(project_id)
         return stats
     except Exception as e:
         raise HTTPException(
@@ -274,11 +322,11 @@ def get_document_stats(project_id: int):
 # ==================== DOCUMENT INDEXING (HAYSTACK) ====================
 
 @router.post("/{document_id}/index")
-def index_document(document_id: int):
+async def index_document(document_id: int):
     """Index a document using Haystack (for both project and RAG documents)"""
     from app.services.haystack_service import HaystackService
 
-    document = document_queries.get_document_by_id(document_id)
+    document = await document_queries.get_document_by_id(document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -287,7 +335,8 @@ def index_document(document_id: int):
 
     try:
         # Index using Haystack
-        result = HaystackService.index_document(
+        result = await run_in_threadpool(
+            HaystackService.index_document,
             document_id=document_id,
             title=document['title'],
             content=document['content'],
@@ -300,7 +349,7 @@ def index_document(document_id: int):
         )
 
         # Update document metadata
-        document_queries.update_document(
+        await document_queries.update_document(
             document_id=document_id,
             is_indexed=True,
             chunks_count=result['chunks_created']
@@ -1,16 +1,18 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List
-from app.schemas.project import Project, ProjectCreate, ProjectUpdate
-from app.db.queries import projects as project_queries
+from fastapi import APIRouter, HTTPException, status, Query, Response
+from typing import List, Optional
+from app.config import settings
+from app.schemas.project import Project, ProjectCreate, ProjectUpdate, ProjectStats, ProjectStatsBatchItem
+from app.db.async_queries import projects as project_queries
+from app.db.pagination import decode_cursor, set_next_cursor
 
 router = APIRouter()
 
 
 @router.post("/", response_model=Project, status_code=status.HTTP_201_CREATED)
-def create_project(project: ProjectCreate):
+async def create_project(project: ProjectCreate):
     """Crée un nouveau projet"""
     try:
-        db_project = project_queries.create_project(
+        db_project = await project_queries.create_project(
             name=project.name,
             description=project.description
         )
@@ -23,10 +25,17 @@ def create_project(project: ProjectCreate):
 
 
 @router.get("/", response_model=List[Project])
-def get_projects(skip: int = 0, limit: int = 100):
-    """Récupère tous les projets"""
+async def get_projects(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Opaque X-Next-Cursor value of the previous page")
+):
+    """Récupère tous les projets (plus récents d'abord)"""
+    after = decode_cursor(cursor)
     try:
-        projects = project_queries.get_all_projects(skip=skip, limit=limit)
+        projects = await project_queries.get_all_projects(skip=skip, limit=limit, after=after)
+        set_next_cursor(response, projects, limit, "created_at")
         return projects
     except Exception as e:
         raise HTTPException(
@@ -35,10 +44,36 @@ def get_projects(skip: int = 0, limit: int = 100):
         )
 
 
+@router.get("/stats", response_model=List[ProjectStatsBatchItem])
+async def get_projects_stats(
+    ids: List[int] = Query(..., description="Project ids (repeat the parameter: ?ids=1&ids=2)")
+):
+    """
+    Statistiques de plusieurs projets en une requête (pages liste): une entrée
+    par id demandé, dans l'ordre, found=False pour un projet inexistant
+    """
+    project_ids = list(dict.fromkeys(ids))
+    if len(project_ids) > settings.STATS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many ids (max {settings.STATS_BATCH_MAX_IDS})"
+        )
+
+    rows = await project_queries.get_project_stats_batch(project_ids)
+    return [
+        ProjectStatsBatchItem(
+            project_id=row['project_id'],
+            found=row['found'],
+            stats=ProjectStats(**row) if row['found'] else None
+        )
+        for row in rows
+    ]
+
+
 @router.get("/{project_id}", response_model=Project)
-def get_project(project_id: int):
+async def get_project(project_id: int):
     """Récupère un projet par son ID"""
-    project = project_queries.get_project_by_id(project_id)
+    project = await project_queries.get_project_by_id(project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,62 +83,55 @@ def get_project(project_id: int):
 
 
 @router.put("/{project_id}", response_model=Project)
-def update_project(project_id: int, project: ProjectUpdate):
+async def update_project(project_id: int, project: ProjectUpdate):
     """Met à jour un projet"""
-    db_project = project_queries.get_project_by_id(project_id)
-    if not db_project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Project {project_id} not found"
-        )
-
     try:
-        updated_project = project_queries.update_project(
+        updated_project = await project_queries.update_project(
             project_id=project_id,
             name=project.name,
             description=project.description
         )
-        return updated_project
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error updating project: {str(e)}"
         )
 
-
-@router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_project(project_id: int):
-    """Supprime un projet"""
-    db_project = project_queries.get_project_by_id(project_id)
-    if not db_project:
+    # UPDATE ... RETURNING sans ligne: le projet n'existe pas
+    if not updated_project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Project {project_id} not found"
         )
+    return updated_project
+
 
+@router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_project(project_id: int):
+    """Supprime un projet"""
     try:
-        project_queries.delete_project(project_id)
+        deleted = await project_queries.delete_project(project_id)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting project: {str(e)}"
         )
 
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project {project_id} not found"
+        )
+
 
 @router.get("/{project_id}/stats")
-def get_project_stats(project_id: int):
-    """Récupère les statistiques d'un projet"""
-    project = project_queries.get_project_by_id(project_id)
-    if not project:
+async def get_project_stats(project_id: int):
+    """Récupère les statistiques d'un projet (une ligne de project_stats, tenue à jour par triggers)"""
+    stats = await project_queries.get_project_stats(project_id)
+    if not stats:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Project {project_id} not found"
         )
 
-    from app.db.queries import workflows as workflow_queries
-    workflow_count = workflow_queries.count_workflows_by_project(project_id)
-
-    return {
-        "project_id": project_id,
-        "workflow_count": workflow_count
-    }
+    return stats
@@ -1,12 +1,30 @@
 """
 RAG API endpoints using Haystack for document indexing
 """
-from fastapi import APIRouter, HTTPException, status, UploadFile, File
-from typing import List
-from app.schemas.rag import RAG, RAGCreate, RAGUpdate, UploadedFile, RAGStats
-from app.db.queries import rags as rag_queries
-from app.db.queries import documents as doc_queries
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, UploadFile, File, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+import asyncio
+import io
+import json
+import logging
+from psycopg import AsyncCursor
+from app.config import settings
+from app.schemas.rag import RAG, RAGCreate, RAGUpdate, UploadedFile, RAGStats, RAGStatsBatchItem
+from app.schemas.common import ListView
+from app.schemas.document import DocumentListItem
+from app.db.async_queries import rags as rag_queries
+from app.db.async_queries import documents as doc_queries
+from app.db.pagination import decode_cursor, set_next_cursor
+from app.db.versioning import get_version_cache
 from app.services.haystack_service import HaystackService
+from app.services.blob_store import CHUNK_SIZE, BlobNotFound, get_blob_store
+from app.services.text_stream import iter_utf8, validate_utf8
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -14,12 +32,13 @@ router = APIRouter()
 # ==================== RAG CRUD ====================
 
 @router.post("/", response_model=RAG, status_code=status.HTTP_201_CREATED)
-def create_rag(rag: RAGCreate):
+async def create_rag(rag: RAGCreate):
     """Create a new RAG collection"""
     try:
-        db_rag = rag_queries.create_rag(
+        db_rag = await rag_queries.create_rag(
             name=rag.name,
-            description=rag.description
+            description=rag.description,
+            semantic_cache_threshold=rag.semantic_cache_threshold
         )
         return db_rag
     except Exception as e:
@@ -30,10 +49,17 @@ def create_rag(rag: RAGCreate):
 
 
 @router.get("/", response_model=List[RAG])
-def get_rags(skip: int = 0, limit: int = 100):
-    """Get all RAG collections"""
+async def get_rags(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Opaque X-Next-Cursor value of the previous page")
+):
+    """Get all RAG collections (most recent first)"""
+    after = decode_cursor(cursor)
     try:
-        rags = rag_queries.get_all_rags(skip=skip, limit=limit)
+        rags = await rag_queries.get_all_rags(skip=skip, limit=limit, after=after)
+        set_next_cursor(response, rags, limit, "created_at")
         return rags
     except Exception as e:
         raise HTTPException(
@@ -42,10 +68,36 @@ def get_rags(skip: int = 0, limit: int = 100):
         )
 
 
+@router.get("/stats", response_model=List[RAGStatsBatchItem])
+async def get_rags_stats(
+    ids: List[int] = Query(..., description="RAG ids (repeat the parameter: ?ids=1&ids=2)")
+):
+    """
+    Statistics of several RAGs in one query (list pages): one entry per
+    requested id, in order, found=False for an unknown RAG
+    """
+    rag_ids = list(dict.fromkeys(ids))
+    if len(rag_ids) > settings.STATS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many ids (max {settings.STATS_BATCH_MAX_IDS})"
+        )
+
+    rows = await rag_queries.get_rag_stats_batch(rag_ids)
+    return [
+        RAGStatsBatchItem(
+            rag_id=row['rag_id'],
+            found=row['found'],
+            stats=RAGStats(**row) if row['found'] else None
+        )
+        for row in rows
+    ]
+
+
 @router.get("/{rag_id}", response_model=RAG)
-def get_rag(rag_id: int):
+async def get_rag(rag_id: int):
     """Get a specific RAG by ID"""
-    rag = rag_queries.get_rag_by_id(rag_id)
+    rag = await rag_queries.get_rag_by_id(rag_id)
     if not rag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -55,44 +107,45 @@ def get_rag(rag_id: int):
 
 
 @router.put("/{rag_id}", response_model=RAG)
-def update_rag(rag_id: int, rag_update: RAGUpdate):
+async def update_rag(rag_id: int, rag_update: RAGUpdate):
     """Update a RAG"""
-    existing = rag_queries.get_rag_by_id(rag_id)
-    if not existing:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"RAG {rag_id} not found"
-        )
-
     try:
-        updated = rag_queries.update_rag(
+        updated = await rag_queries.update_rag(
             rag_id=rag_id,
             name=rag_update.name,
-            description=rag_update.description
+            description=rag_update.description,
+            semantic_cache_threshold=rag_update.semantic_cache_threshold
         )
-        return updated
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update RAG: {str(e)}"
         )
 
+    # UPDATE ... RETURNING returned no row: the RAG does not exist
+    if not updated:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"RAG {rag_id} not found"
+        )
+    return updated
+
 
 @router.delete("/{rag_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_rag(rag_id: int):
+async def delete_rag(rag_id: int):
     """Delete a RAG (cascade deletes documents and files)"""
     # Also delete from Haystack index
     try:
-        documents = doc_queries.get_documents_by_rag(rag_id, limit=1000)
+        documents = await doc_queries.get_documents_by_rag(rag_id, limit=1000, summary=True)
         for doc in documents:
             try:
-                HaystackService.delete_document_from_index(doc['id'])
+                await run_in_threadpool(HaystackService.delete_document_from_index, doc['id'])
             except:
                 pass  # Continue even if deletion fails
     except:
         pass
 
-    success = rag_queries.delete_rag(rag_id)
+    success = await rag_queries.delete_rag(rag_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -101,158 +154,552 @@ def delete_rag(rag_id: int):
 
 
 @router.get("/{rag_id}/stats", response_model=RAGStats)
-def get_rag_stats(rag_id: int):
-    """Get statistics for a RAG"""
-    rag = rag_queries.get_rag_by_id(rag_id)
-    if not rag:
+async def get_rag_stats(rag_id: int):
+    """Get statistics for a RAG (single-row lookup, kept up to date by triggers)"""
+    stats = await rag_queries.get_rag_stats(rag_id)
+    if not stats:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"RAG {rag_id} not found"
         )
-
-    stats = rag_queries.get_rag_stats(rag_id)
     return stats
 
 
 # ==================== FILE UPLOAD ====================
 
-@router.post("/{rag_id}/upload", status_code=status.HTTP_201_CREATED)
+# Extension -> document content type
+UPLOAD_CONTENT_TYPES = {
+    '.txt': 'text',
+    '.md': 'markdown',
+    '.json': 'json'
+}
+
+
+def _file_extension(filename: str) -> str:
+    return '.' + filename.rsplit('.', 1)[-1].lower()
+
+
+def _upload_error(position: int, file: UploadFile, error: str) -> Dict[str, Any]:
+    return {'position': position, 'filename': file.filename, 'status': 'error', 'error': error}
+
+
+def _blob_text(sha256: str) -> Iterator[str]:
+    """Decoded content of a stored upload, read CHUNK_SIZE at a time"""
+    with get_blob_store().open(sha256) as blob:
+        yield from iter_utf8(iter(lambda: blob.read(CHUNK_SIZE), b""))
+
+
+def _put_text_file(fileobj: BinaryIO, max_bytes: int, too_large: str) -> Dict[str, Any]:
+    """Stream a spooled upload into the blob store, checking its size and UTF-8 validity on the way"""
+    def chunks() -> Iterator[bytes]:
+        size = 0
+        for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(too_large)
+            yield chunk
+
+    return get_blob_store().put(validate_utf8(chunks()))
+
+
+async def _prepare_upload(position: int, file: UploadFile) -> Dict[str, Any]:
+    """
+    Read, decode and store one file in the blob store (decoding and hashing
+    run in the threadpool, not on the event loop)
+
+    Files above UPLOAD_STREAMING_THRESHOLD_BYTES are never read whole: they
+    are validated while streamed to the blob store, and their rows are later
+    written from the blob (COPY), so memory stays flat whatever their size.
+
+    Returns:
+        The file's rows to insert (status 'ready'), or its error result
+    """
+    max_bytes = settings.UPLOAD_MAX_FILE_BYTES
+    too_large = f"File {file.filename} exceeds {max_bytes // (1024 * 1024)}MB limit"
+    streamed = file.size is None or file.size > settings.UPLOAD_STREAMING_THRESHOLD_BYTES
+    content_text = None
+    try:
+        # Check file size before reading the spool
+        if file.size is not None and file.size > max_bytes:
+            return _upload_error(position, file, too_large)
+
+        if streamed:
+            blob = await run_in_threadpool(_put_text_file, file.file, max_bytes, too_large)
+        else:
+            # Read file content (the document keeps the text)
+            content_bytes = await file.read()
+            if len(content_bytes) > max_bytes:
+                return _upload_error(position, file, too_large)
+            content_text = await run_in_threadpool(content_bytes.decode, 'utf-8')
+
+            # Stream the spooled upload into the blob store (hashed while written,
+            # identical contents stored once); the row only keeps the digest
+            await file.seek(0)
+            blob = await run_in_threadpool(get_blob_store().put_file, file.file)
+    except UnicodeDecodeError:
+        return _upload_error(position, file, 'File is not valid UTF-8 text')
+    except Exception as e:
+        return _upload_error(position, file, str(e))
+
+    file_ext = _file_extension(file.filename)
+    row = {
+        'filename': file.filename,
+        'file_type': file_ext.lstrip('.'),
+        'file_size': blob['size'],
+        'blob_sha256': blob['sha256'],
+        'mime_type': file.content_type,
+        'content_type': UPLOAD_CONTENT_TYPES.get(file_ext, 'text')
+    }
+    if not streamed:
+        row['content'] = content_text
+    return {
+        'position': position,
+        'status': 'ready',
+        'streamed': streamed,
+        'deduplicated': blob['deduplicated'],
+        'row': row
+    }
+
+
+async def _insert_uploads(rag_id: int, prepared: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Insert a batch of prepared uploads in one statement, after matching them
+    against earlier uploads of the same content
+
+    A file whose content is already in the RAG (or earlier in the batch) is
+    reported as 'duplicate' with the existing document id, without new rows.
+    Matching and inserts run in one transaction holding the RAG's upload
+    lock: concurrent uploads of the same file to a RAG are serialized, and
+    the second one finds the first.
+    """
+    try:
+        async with rag_queries.upload_transaction(rag_id) as cursor:
+            results = await _insert_uploads_locked(rag_id, prepared, cursor)
+    except Exception as e:
+        return [
+            {'position': item['position'], 'filename': item['row']['filename'], 'status': 'error', 'error': str(e)}
+            for item in prepared
+        ]
+
+    # Committed: the new documents' first versions can be served from the cache
+    cache = get_version_cache()
+    for item in prepared:
+        if 'document_id' in item and 'content' in item['row']:
+            cache.put(item['document_id'], 1, item['row']['content'])
+    return results
+
+
+async def _insert_uploads_locked(
+    rag_id: int,
+    prepared: List[Dict[str, Any]],
+    cursor: AsyncCursor
+) -> List[Dict[str, Any]]:
+    """_insert_uploads within its transaction: a failed insert only fails its own files"""
+    digests = list({item['row']['blob_sha256'] for item in prepared})
+    existing = await rag_queries.find_uploaded_files_by_digests(rag_id, digests, cursor=cursor)
+
+    to_create: List[Dict[str, Any]] = []
+    duplicates: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    first_in_batch: Dict[str, Dict[str, Any]] = {}
+    for item in prepared:
+        sha256 = item['row']['blob_sha256']
+        match = existing.get(sha256)
+        if match and match['rag_id'] == rag_id:
+            duplicates.append((item, match))
+        elif sha256 in first_in_batch:
+            duplicates.append((item, first_in_batch[sha256]))
+        else:
+            first_in_batch[sha256] = item
+            to_create.append(item)
+
+    # Small files: one multi-row statement; large ones: one COPY each, from the blob
+    batch = [item for item in to_create if not item['streamed']]
+    try:
+        created = await rag_queries.create_uploaded_documents(rag_id, [item['row'] for item in batch], cursor=cursor)
+        for item, ids in zip(batch, created):
+            item.update(ids)
+    except Exception as e:
+        for item in batch:
+            item['error'] = str(e)
+
+    for item in to_create:
+        if item['streamed']:
+            sha256 = item['row']['blob_sha256']
+            try:
+                item.update(await rag_queries.create_uploaded_document_streamed(
+                    rag_id, item['row'], lambda: _blob_text(sha256), cursor=cursor
+                ))
+            except Exception as e:
+                item['error'] = str(e)
+
+    results = []
+    for item in to_create:
+        if 'error' in item:
+            results.append({
+                'position': item['position'], 'filename': item['row']['filename'],
+                'status': 'error', 'error': item['error']
+            })
+            continue
+        match = existing.get(item['row']['blob_sha256'])
+        results.append({
+            'position': item['position'],
+            'filename': item['row']['filename'],
+            'file_id': item['file_id'],
+            'document_id': item['document_id'],
+            'blob_sha256': item['row']['blob_sha256'],
+            'streamed': item['streamed'],
+            'deduplicated': item['deduplicated'],
+            # Content shared with another RAG: indexing reuses that document's embeddings
+            'shared_with_document_id': match['document_id'] if match else None,
+            'status': 'success'
+        })
+
+    for item, original in duplicates:
+        if 'document_id' not in original:
+            # Its first copy in this batch failed to insert
+            results.append({
+                'position': item['position'], 'filename': item['row']['filename'],
+                'status': 'error', 'error': 'Identical file in the same upload failed'
+            })
+            continue
+        results.append({
+            'position': item['position'],
+            'filename': item['row']['filename'],
+            'file_id': original['file_id'],
+            'document_id': original['document_id'],
+            'duplicate_of': original['filename'] if 'filename' in original else original['row']['filename'],
+            'status': 'duplicate'
+        })
+
+    return sorted(results, key=lambda result: result['position'])
+
+
+async def _process_uploads(rag_id: int, files: List[UploadFile]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Prepare files concurrently (UPLOAD_CONCURRENCY at a time) and yield each
+    file's result as soon as it is known. Inserts follow the request order: a
+    prepared file waits for every file before it, so that among identical
+    files the first one in the request is the original. Files ready together
+    are inserted in one batch (at most UPLOAD_INSERT_BATCH_SIZE per statement).
+    """
+    semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+    batch_size = settings.UPLOAD_INSERT_BATCH_SIZE
+
+    async def prepare(position: int, file: UploadFile) -> Dict[str, Any]:
+        async with semaphore:
+            return await _prepare_upload(position, file)
+
+    pending = {asyncio.create_task(prepare(position, file)) for position, file in enumerate(files)}
+    prepared: Dict[int, Dict[str, Any]] = {}
+    next_position = 0
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                item = task.result()
+                prepared[item['position']] = item
+                if item['status'] != 'ready':
+                    yield item
+            # Only the prefix of the request that is fully prepared
+            ready = []
+            while next_position in prepared:
+                item = prepared.pop(next_position)
+                if item['status'] == 'ready':
+                    ready.append(item)
+                next_position += 1
+            for start in range(0, len(ready), batch_size):
+                for result in await _insert_uploads(rag_id, ready[start:start + batch_size]):
+                    yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _detach_uploads(files: List[UploadFile]) -> List[UploadFile]:
+    """
+    Take ownership of the uploads' spooled files: FastAPI closes the form's
+    files when the endpoint returns, before a streamed body is sent
+    """
+    detached = []
+    for file in files:
+        detached.append(UploadFile(file=file.file, size=file.size, filename=file.filename, headers=file.headers))
+        file.file = io.BytesIO()  # What the form closes instead
+    return detached
+
+
+async def _index_uploaded_documents(rag_id: int, uploads: List[Dict[str, Any]]) -> None:
+    """Background indexing of freshly uploaded documents (upload success results)"""
+    for upload in uploads:
+        document_id = upload['document_id']
+        try:
+            if upload['streamed']:
+                # Large file: chunks and embeddings built from the blob, in pieces
+                result = await run_in_threadpool(
+                    HaystackService.index_text_stream,
+                    document_id=document_id,
+                    title=upload['filename'],
+                    texts=lambda: _blob_text(upload['blob_sha256']),
+                    content_sha256=upload['blob_sha256'],
+                    metadata={
+                        'rag_id': rag_id,
+                        'content_type': UPLOAD_CONTENT_TYPES.get(_file_extension(upload['filename']), 'text'),
+                        'status': 'draft'
+                    }
+                )
+                await doc_queries.update_document(
+                    document_id=document_id,
+                    is_indexed=True,
+                    chunks_count=result['chunks_created']
+                )
+                continue
+
+            document = await doc_queries.get_document_by_id(document_id)
+            if document:
+                await _index_rag_document(rag_id, document)
+        except Exception as e:
+            logger.warning(f"Background indexing failed for document {document_id}: {e}")
+
+
+@router.post(
+    "/{rag_id}/upload",
+    status_code=status.HTTP_201_CREATED,
+    responses={201: {"content": {"application/x-ndjson": {}}, "description": "With stream=true: one JSON result per line"}}
+)
 async def upload_files(
     rag_id: int,
-    files: List[UploadFile] = File(...)
+    background_tasks: BackgroundTasks,
+    files: List[UploadFile] = File(...),
+    index: bool = Query(False, description="Index the new documents in the background once stored"),
+    stream: bool = Query(False, description="Stream per-file results as NDJSON as each file finishes")
 ):
     """
     Upload files to a RAG collection
     Accepts: .txt, .md, .json
-    Creates a document for each file
+    Creates a document for each file; a file whose content is already in the
+    RAG is reported as 'duplicate' with the existing document id
+
+    Files are read, decoded and stored concurrently; their rows are inserted
+    in batches. Results carry the file's position in the request.
     """
     # Verify RAG exists
-    rag = rag_queries.get_rag_by_id(rag_id)
+    rag = await rag_queries.get_rag_by_id(rag_id)
     if not rag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"RAG {rag_id} not found"
         )
 
-    allowed_extensions = {'.txt', '.md', '.json'}
-    results = []
-
+    # Validate file types before processing anything
     for file in files:
-        # Validate file type
-        file_ext = '.' + file.filename.rsplit('.', 1)[-1].lower()
-        if file_ext not in allowed_extensions:
+        file_ext = _file_extension(file.filename)
+        if file_ext not in UPLOAD_CONTENT_TYPES:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"File type {file_ext} not allowed. Use .txt, .md, or .json"
             )
 
-        try:
-            # Read file content
-            content_bytes = await file.read()
-
-            # Check file size (limit to 10MB)
-            if len(content_bytes) > 10 * 1024 * 1024:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"File {file.filename} exceeds 10MB limit"
-                )
-
-            content_text = content_bytes.decode('utf-8')
-
-            # Determine content type
-            content_type_map = {
-                '.txt': 'text',
-                '.md': 'markdown',
-                '.json': 'json'
-            }
-            content_type = content_type_map.get(file_ext, 'text')
-
-            # Store uploaded file
-            uploaded_file = rag_queries.create_uploaded_file(
-                rag_id=rag_id,
-                filename=file.filename,
-                file_type=file_ext.lstrip('.'),
-                file_size=len(content_bytes),
-                file_content=content_bytes,
-                mime_type=file.content_type,
-                metadata={'original_filename': file.filename}
-            )
-
-            # Create document from file
-            document = doc_queries.create_document_for_rag(
-                rag_id=rag_id,
-                title=file.filename,
-                content=content_text,
-                content_type=content_type,
-                status='draft',
-                metadata={
-                    'uploaded_file_id': uploaded_file['id'],
-                    'source': 'file_upload',
-                    'original_filename': file.filename
-                }
-            )
-
-            results.append({
-                'filename': file.filename,
-                'file_id': uploaded_file['id'],
-                'document_id': document['id'],
-                'status': 'success'
-            })
+    if not stream:
+        results = [result async for result in _process_uploads(rag_id, files)]
+        results.sort(key=lambda result: result['position'])
+        created = [result for result in results if result['status'] == 'success']
+        if index and created:
+            background_tasks.add_task(_index_uploaded_documents, rag_id, created)
+        return {
+            'rag_id': rag_id,
+            'files_processed': len(results),
+            'indexing_scheduled': index and bool(created),
+            'results': results
+        }
 
-        except UnicodeDecodeError:
-            results.append({
-                'filename': file.filename,
-                'status': 'error',
-                'error': 'File is not valid UTF-8 text'
-            })
-        except Exception as e:
-            results.append({
-                'filename': file.filename,
-                'status': 'error',
-                'error': str(e)
-            })
+    owned = _detach_uploads(files)
+    created: List[Dict[str, Any]] = []
 
-    return {
-        'rag_id': rag_id,
-        'files_processed': len(results),
-        'results': results
-    }
+    async def ndjson():
+        counts = {'success': 0, 'duplicate': 0, 'error': 0}
+        try:
+            async for result in _process_uploads(rag_id, owned):
+                counts[result['status']] += 1
+                if result['status'] == 'success':
+                    created.append(result)
+                yield json.dumps({'type': 'result', **result}, ensure_ascii=False) + "\n"
+        finally:
+            for file in owned:
+                await file.close()
+
+        yield json.dumps({
+            'type': 'summary',
+            'rag_id': rag_id,
+            'files_processed': sum(counts.values()),
+            'succeeded': counts['success'],
+            'duplicates': counts['duplicate'],
+            'failed': counts['error'],
+            'indexing_scheduled': index and bool(created)
+        }) + "\n"
+
+    # Runs after the last line is sent, with the documents created by then
+    async def index_created():
+        if index and created:
+            await _index_uploaded_documents(rag_id, created)
+
+    return StreamingResponse(
+        ndjson(),
+        status_code=status.HTTP_201_CREATED,
+        media_type="application/x-ndjson",
+        background=BackgroundTask(index_created)
+    )
 
 
 @router.get("/{rag_id}/files", response_model=List[UploadedFile])
-def get_rag_files(rag_id: int):
+async def get_rag_files(rag_id: int):
     """Get all uploaded files for a RAG"""
-    rag = rag_queries.get_rag_by_id(rag_id)
+    rag = await rag_queries.get_rag_by_id(rag_id)
     if not rag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"RAG {rag_id} not found"
         )
 
-    files = rag_queries.get_uploaded_files_by_rag(rag_id)
+    files = await rag_queries.get_uploaded_files_by_rag(rag_id)
     return files
 
 
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) inclusive of a single `bytes=` range, None to send the
+    whole file (no header, malformed or multi-range: RFC 9110 lets us ignore it)
+
+    Raises:
+        ValueError: Range not satisfiable (416)
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            suffix = int(last)
+            start, end = max(size - suffix, 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise ValueError(f"Range start {start} beyond file size {size}")
+    if start < 0 or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _iter_blob_range(fileobj: BinaryIO, start: int, length: int) -> Iterator[bytes]:
+    with fileobj:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@router.get("/{rag_id}/files/{file_id}/download")
+async def download_rag_file(rag_id: int, file_id: int, request: Request):
+    """
+    Download an uploaded file
+    Whole files are sent with FileResponse (sendfile / pathsend when the
+    server supports it); a single `Range: bytes=` range gets a 206
+    """
+    uploaded = await rag_queries.get_uploaded_file(file_id)
+    if not uploaded or uploaded['rag_id'] != rag_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"File {file_id} not found in RAG {rag_id}"
+        )
+
+    media_type = uploaded['mime_type'] or "application/octet-stream"
+    headers = {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(uploaded['filename'])}"}
+
+    # Row not migrated out of BYTEA yet
+    if uploaded['blob_sha256'] is None:
+        content = await rag_queries.get_uploaded_file_content(file_id)
+        return Response(content=content, media_type=media_type, headers=headers)
+
+    sha256 = uploaded['blob_sha256']
+    etag = f'"{sha256}"'  # Content-addressed: the digest is a strong validator
+    headers.update({"ETag": etag, "Accept-Ranges": "bytes"})
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    store = get_blob_store()
+    try:
+        size = store.size(sha256)
+        try:
+            byte_range = _parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+
+        path = store.local_path(sha256)
+        if byte_range is None:
+            if path is not None:
+                return FileResponse(path, media_type=media_type, headers=headers)
+            byte_range = (0, size - 1)
+            status_code = status.HTTP_200_OK
+        else:
+            status_code = status.HTTP_206_PARTIAL_CONTENT
+            headers["Content-Range"] = f"bytes {byte_range[0]}-{byte_range[1]}/{size}"
+
+        start, end = byte_range
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            _iter_blob_range(store.open(sha256), start, end - start + 1),
+            status_code=status_code,
+            media_type=media_type,
+            headers=headers
+        )
+    except BlobNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Content of file {file_id} is missing from the blob store"
+        )
+
+
 # ==================== DOCUMENTS IN RAG ====================
 
-@router.get("/{rag_id}/documents")
-def get_rag_documents(rag_id: int, limit: int = 100, offset: int = 0):
-    """Get all documents in a RAG"""
-    rag = rag_queries.get_rag_by_id(rag_id)
+@router.get("/{rag_id}/documents", response_model=List[DocumentListItem])
+async def get_rag_documents(
+    rag_id: int,
+    response: Response,
+    limit: int = 100,
+    offset: int = 0,
+    view: ListView = Query(ListView.FULL, description="summary: omit content, add content_length"),
+    cursor: Optional[str] = Query(None, description="Opaque X-Next-Cursor value of the previous page")
+):
+    """Get all documents in a RAG (most recently updated first)"""
+    after = decode_cursor(cursor)
+    rag = await rag_queries.get_rag_by_id(rag_id)
     if not rag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"RAG {rag_id} not found"
         )
 
-    documents = doc_queries.get_documents_by_rag(rag_id, limit=limit, offset=offset)
+    documents = await doc_queries.get_documents_by_rag(
+        rag_id, limit=limit, offset=offset, summary=view == ListView.SUMMARY, after=after
+    )
+    set_next_cursor(response, documents, limit, "updated_at")
     return documents
 
 
 @router.post("/{rag_id}/documents", status_code=status.HTTP_201_CREATED)
-def create_rag_document(rag_id: int, document: dict):
+async def create_rag_document(rag_id: int, document: dict):
     """Create a new document in a RAG collection"""
-    rag = rag_queries.get_rag_by_id(rag_id)
+    rag = await rag_queries.get_rag_by_id(rag_id)
     if not rag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -260,7 +707,7 @@ def create_rag_document(rag_id: int, document: dict):
         )
 
     try:
-        doc = doc_queries.create_document_for_rag(
+        doc = await doc_queries.create_document_for_rag(
             rag_id=rag_id,
             title=document.get('title'),
             content=document.get('content'),
@@ -278,14 +725,44 @@ def create_rag_document(rag_id: int, document: dict):
 
 # ==================== INDEXING WITH HAYSTACK ====================
 
+async def _index_rag_document(rag_id: int, document: Dict[str, Any]) -> Dict[str, Any]:
+    """Chunk, embed and store a RAG document (replacing its old chunks), then mark it indexed"""
+    # If document was already indexed, delete old chunks first
+    if document.get('is_indexed', False):
+        deleted_count = await run_in_threadpool(HaystackService.delete_document_from_index, document['id'])
+        print(f"Deleted {deleted_count} old chunks for document {document['id']}")
+
+    # Index using Haystack
+    result = await run_in_threadpool(
+        HaystackService.index_document,
+        document_id=document['id'],
+        title=document['title'],
+        content=document['content'],
+        metadata={
+            'rag_id': rag_id,
+            'content_type': document['content_type'],
+            'status': document['status']
+        }
+    )
+
+    # Update document metadata in database
+    await doc_queries.update_document(
+        document_id=document['id'],
+        is_indexed=True,
+        chunks_count=result['chunks_created']
+    )
+
+    return result
+
+
 @router.post("/{rag_id}/documents/{document_id}/index")
-def index_document(rag_id: int, document_id: int):
+async def index_document(rag_id: int, document_id: int):
     """
     Index a document using Haystack: chunk content and generate embeddings
     If document was already indexed, deletes old chunks and re-indexes
     """
     # Verify document belongs to RAG
-    document = doc_queries.get_document_by_id(document_id)
+    document = await doc_queries.get_document_by_id(document_id)
     if not document:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -299,31 +776,7 @@ def index_document(rag_id: int, document_id: int):
         )
 
     try:
-        # If document was already indexed, delete old chunks first
-        if document.get('is_indexed', False):
-            deleted_count = HaystackService.delete_document_from_index(document_id)
-            print(f"Deleted {deleted_count} old chunks for document {document_id}")
-
-        # Index using Haystack
-        result = HaystackService.index_document(
-            document_id=document_id,
-            title=document['title'],
-            content=document['content'],
-            metadata={
-                'rag_id': rag_id,
-                'content_type': document['content_type'],
-                'status': document['status']
-            }
-        )
-
-        # Update document metadata in database
-        doc_queries.update_document(
-            document_id=document_id,
-            is_indexed=True,
-            chunks_count=result['chunks_created']
-        )
-
-        return result
+        return await _index_rag_document(rag_id, document)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -332,51 +785,30 @@ def index_document(rag_id: int, document_id: int):
 
 
 @router.post("/{rag_id}/index-all")
-def index_all_rag_documents(rag_id: int):
+async def index_all_rag_documents(rag_id: int):
     """
     Index all documents in a RAG using Haystack
     Deletes existing chunks and re-indexes all documents
     """
-    rag = rag_queries.get_rag_by_id(rag_id)
+    rag = await rag_queries.get_rag_by_id(rag_id)
     if not rag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"RAG {rag_id} not found"
         )
 
-    documents = doc_queries.get_documents_by_rag(rag_id, limit=1000)
+    documents = await doc_queries.get_documents_by_rag(rag_id, limit=1000)
 
     results = []
     for doc in documents:
         try:
-            # If document was already indexed, delete old chunks first
-            if doc.get('is_indexed', False):
-                deleted_count = HaystackService.delete_document_from_index(doc['id'])
-                print(f"Deleted {deleted_count} old chunks for document {doc['id']}")
-
-            # Index document
-            result = HaystackService.index_document(
-                document_id=doc['id'],
-                title=doc['title'],
-                content=doc['content'],
-                metadata={
-                    'rag_id': rag_id,
-                    'content_type': doc['content_type'],
-                    'status': doc['status']
-                }
-            )
-
-            # Update document
-            doc_queries.update_document(
-                document_id=doc['id'],
-                is_indexed=True,
-                chunks_count=result['chunks_created']
-            )
+            result = await _index_rag_document(rag_id, doc)
 
             results.append({
                 'document_id': doc['id'],
                 'status': 'success',
-                'chunks_created': result['chunks_created']
+                'chunks_created': result['chunks_created'],
+                'embeddings_reused': result['embeddings_reused']
             })
         except Exception as e:
             results.append({
@@ -400,11 +832,11 @@ def index_all_rag_documents(rag_id: int):
 # ==================== SEARCH ====================
 
 @router.post("/{rag_id}/search")
-def search_rag(rag_id: int, query: str, top_k: int = 5):
+async def search_rag(rag_id: int, query: str, top_k: int = 5):
     """
     Semantic search within a RAG collection using Haystack
     """
-    rag = rag_queries.get_rag_by_id(rag_id)
+    rag = await rag_queries.get_rag_by_id(rag_id)
     if not rag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -412,7 +844,8 @@ def search_rag(rag_id: int, query: str, top_k: int = 5):
         )
 
     try:
-        results = HaystackService.search_documents(
+        results = await run_in_threadpool(
+            HaystackService.search_documents,
             query=query,
             rag_id=rag_id,
             top_k=top_k
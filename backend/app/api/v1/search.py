@@ -0,0 +1,40 @@
+"""
+Search API endpoints
+Full-text (keyword) search over documents and workflows
+"""
+from fastapi import APIRouter, Query
+from typing import List, Optional
+from app.schemas.document import DocumentStatus
+from app.schemas.search import SearchScope, SearchResponse
+from app.db.async_queries import search as search_queries
+from app.db.queries.search import SEARCH_SCOPES
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=500, description='Keywords: "exact phrase", or, -excluded'),
+    scope: Optional[List[SearchScope]] = Query(None, description="documents and/or workflows (default: both)"),
+    project_id: Optional[int] = None,
+    rag_id: Optional[int] = Query(None, description="Documents of this RAG only"),
+    status_filter: Optional[DocumentStatus] = Query(None, alias="status", description="Documents with this status only"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000)
+):
+    """
+    Recherche plein texte (configuration french: pluriels, accords et mots
+    vides gérés), résultats triés par pertinence (ts_rank), titres et noms
+    pesant plus que le contenu, avec extraits surlignés (ts_headline).
+    Filtrer par RAG ou par statut ne renvoie que des documents.
+    """
+    results = await search_queries.search(
+        q,
+        scopes=tuple(s.value for s in scope) if scope else SEARCH_SCOPES,
+        project_id=project_id,
+        rag_id=rag_id,
+        status=status_filter.value if status_filter else None,
+        limit=limit,
+        offset=offset
+    )
+    return SearchResponse(query=q, results=results)
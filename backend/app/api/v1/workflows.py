@@ -1,40 +1,26 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List
-from app.schemas.workflow import Workflow, WorkflowCreate, WorkflowUpdate, WorkflowWithDetails
-from app.db.queries import workflows as workflow_queries
-from app.db.queries import projects as project_queries
+from fastapi import APIRouter, HTTPException, status, Query, Response
+from typing import List, Optional
+from app.schemas.common import ListView
+from app.schemas.workflow import (
+    Workflow, WorkflowCreate, WorkflowUpdate, WorkflowWithDetails, WorkflowListItem, WorkflowStep, WorkflowStepQuery
+)
+from app.db.async_queries import workflows as workflow_queries
+from app.db.async_queries import projects as project_queries
+from app.db.pagination import decode_cursor, set_next_cursor
+from app.db.queries.workflows import DuplicateWorkflow, InvalidStepFilter, WorkflowProjectNotFound
 
 router = APIRouter()
 
 
 @router.post("/", response_model=Workflow, status_code=status.HTTP_201_CREATED)
-def create_workflow(workflow: WorkflowCreate):
-    """Crée un nouveau workflow"""
-    # Vérifier que le projet existe
-    project = project_queries.get_project_by_id(workflow.project_id)
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Project {workflow.project_id} not found"
-        )
-
-    # Vérifier si le workflow existe déjà (par hash)
-    existing = workflow_queries.get_workflow_by_hash(
-        workflow.project_id,
-        workflow.workflow_hash
-    )
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Workflow with hash {workflow.workflow_hash} already exists"
-        )
-
+async def create_workflow(workflow: WorkflowCreate):
+    """Crée un nouveau workflow (projet et unicité du hash vérifiés par l'INSERT lui-même)"""
     try:
         # Convertir les states et actions en dict
         states = [state.model_dump() for state in workflow.states] if workflow.states else []
         actions = [action.model_dump() for action in workflow.actions] if workflow.actions else []
 
-        db_workflow = workflow_queries.create_workflow(
+        db_workflow = await workflow_queries.create_workflow(
             project_id=workflow.project_id,
             name=workflow.name,
             raw_data=workflow.raw_data,
@@ -47,6 +33,16 @@ def create_workflow(workflow: WorkflowCreate):
             actions=actions
         )
         return db_workflow
+    except WorkflowProjectNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project {workflow.project_id} not found"
+        )
+    except DuplicateWorkflow:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Workflow with hash {workflow.workflow_hash} already exists"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -54,11 +50,20 @@ def create_workflow(workflow: WorkflowCreate):
         )
 
 
-@router.get("/project/{project_id}", response_model=List[Workflow])
-def get_workflows_by_project(project_id: int, skip: int = 0, limit: int = 100):
-    """Récupère tous les workflows d'un projet"""
+@router.get("/project/{project_id}", response_model=List[WorkflowListItem])
+async def get_workflows_by_project(
+    project_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    view: ListView = Query(ListView.FULL, description="summary: omit raw_data, add raw_data_size"),
+    cursor: Optional[str] = Query(None, description="Opaque X-Next-Cursor value of the previous page")
+):
+    """Récupère tous les workflows d'un projet (plus récents d'abord)"""
+    after = decode_cursor(cursor)
+
     # Vérifier que le projet existe
-    project = project_queries.get_project_by_id(project_id)
+    project = await project_queries.get_project_by_id(project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -66,11 +71,14 @@ def get_workflows_by_project(project_id: int, skip: int = 0, limit: int = 100):
         )
 
     try:
-        workflows = workflow_queries.get_workflows_by_project(
+        workflows = await workflow_queries.get_workflows_by_project(
             project_id=project_id,
             skip=skip,
-            limit=limit
+            limit=limit,
+            summary=view == ListView.SUMMARY,
+            after=after
         )
+        set_next_cursor(response, workflows, limit, "created_at")
         return workflows
     except Exception as e:
         raise HTTPException(
@@ -79,13 +87,44 @@ def get_workflows_by_project(project_id: int, skip: int = 0, limit: int = 100):
         )
 
 
+@router.post("/steps/search", response_model=List[WorkflowStep])
+async def search_workflow_steps(
+    query: WorkflowStepQuery,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Opaque X-Next-Cursor value of the previous page")
+):
+    """
+    Étapes capturées (actions ou états) dont les données contiennent un JSON
+    (`contains`, opérateur @>) et/ou vérifient un jsonpath (`path`, opérateur
+    @?), plus récentes d'abord, avec l'id de leur workflow. Servi par les index
+    GIN jsonb_path_ops: les jsonpath sélectifs sont les égalités sur un chemin,
+    ex. '$.target.selector ? (@ == "#submit")'.
+    """
+    after = decode_cursor(cursor)
+    try:
+        steps = await workflow_queries.search_steps(
+            kind=query.kind.value,
+            contains=query.contains,
+            path=query.path,
+            step_type=query.step_type,
+            project_id=query.project_id,
+            limit=limit,
+            after=after
+        )
+    except InvalidStepFilter as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    set_next_cursor(response, steps, limit, "timestamp")
+    return steps
+
+
 @router.get("/{workflow_id}", response_model=WorkflowWithDetails)
-def get_workflow(
+async def get_workflow(
     workflow_id: int,
     include_details: bool = Query(True, description="Include states and actions")
 ):
     """Récupère un workflow par son ID"""
-    workflow = workflow_queries.get_workflow_by_id(workflow_id, include_details=include_details)
+    workflow = await workflow_queries.get_workflow_by_id(workflow_id, include_details=include_details)
     if not workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -95,43 +134,42 @@ def get_workflow(
 
 
 @router.put("/{workflow_id}", response_model=Workflow)
-def update_workflow(workflow_id: int, workflow: WorkflowUpdate):
+async def update_workflow(workflow_id: int, workflow: WorkflowUpdate):
     """Met à jour un workflow"""
-    db_workflow = workflow_queries.get_workflow_by_id(workflow_id)
-    if not db_workflow:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Workflow {workflow_id} not found"
-        )
-
     try:
-        updated_workflow = workflow_queries.update_workflow(
+        updated_workflow = await workflow_queries.update_workflow(
             workflow_id=workflow_id,
             name=workflow.name,
             description=workflow.description
         )
-        return updated_workflow
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error updating workflow: {str(e)}"
         )
 
-
-@router.delete("/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_workflow(workflow_id: int):
-    """Supprime un workflow"""
-    db_workflow = workflow_queries.get_workflow_by_id(workflow_id)
-    if not db_workflow:
+    # UPDATE ... RETURNING sans ligne: le workflow n'existe pas
+    if not updated_workflow:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Workflow {workflow_id} not found"
         )
+    return updated_workflow
+
 
+@router.delete("/{workflow_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_workflow(workflow_id: int):
+    """Supprime un workflow"""
     try:
-        workflow_queries.delete_workflow(workflow_id)
+        deleted = await workflow_queries.delete_workflow(workflow_id)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting workflow: {str(e)}"
         )
+
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Workflow {workflow_id} not found"
+        )
@@ -5,6 +5,15 @@ from typing import List
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 20
+    DB_POOL_ACQUIRE_TIMEOUT_SECONDS: float = 10.0  # Wait for a free connection before failing
+    DB_POOL_HEALTHCHECK_IDLE_SECONDS: float = 30.0  # Ping connections idle longer than this on checkout
+    DB_ASYNC_POOL_MIN_SIZE: int = 2  # psycopg 3 pool used by the async routers
+    DB_ASYNC_POOL_MAX_SIZE: int = 20
+    DB_SLOW_QUERY_MS: float = 200.0  # Statements slower than this are logged (normalized SQL)
+    DB_QUERY_DEBUG_HEADERS: bool = False  # X-DB-Query-Count / -Time-Ms / X-DB-Slow-Queries on responses
+    DB_N_PLUS_ONE_THRESHOLD: int = 10  # Same statement this many times in one request is logged (0 = off)
 
     # API
     PROJECT_NAME: str = "Workflow Manager"
@@ -16,21 +25,87 @@ class Settings(BaseSettings):
     DEFAULT_LLM_PROVIDER: str = "ollama"
     OLLAMA_BASE_URL: str = "http://ollama:11434"
     OLLAMA_MODEL: str = "qwen3:4b"
+    OLLAMA_KEEP_ALIVE: str = "30m"  # Sent with warm-up calls
+    OLLAMA_RESIDENCY_ENABLED: bool = True  # Keep the model loaded while there is chat traffic
+    OLLAMA_RESIDENCY_CHECK_SECONDS: int = 60
+    OLLAMA_WARM_TRAFFIC_WINDOW_SECONDS: int = 3600  # Stop keeping warm after this much idle time
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"
+    OPENAI_BASE_URL: str = "https://api.openai.com/v1"
     ANTHROPIC_API_KEY: str = ""
     ANTHROPIC_MODEL: str = "claude-sonnet-4-20250514"
+    ANTHROPIC_BASE_URL: str = "https://api.anthropic.com/v1/"  # OpenAI SDK compatible endpoint
 
     # LM Studio (OpenAI-compatible API)
     LM_STUDIO_BASE_URL: str = "http://localhost:1235/v1"
     LM_STUDIO_MODEL: str = "qwen:4b"  # Default model name for LM Studio
 
+    # LLM router
+    LLM_PROVIDERS: str = ""  # Comma-separated: ollama,lm_studio,openai,anthropic (empty = DEFAULT_LLM_PROVIDER)
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_LATENCY_WINDOW: int = 50  # Rolling window (requests) for p50/p95 and error rate
+    LLM_MAX_ERROR_RATE: float = 0.5  # Provider is cooled down above this error rate
+    LLM_PROVIDER_COOLDOWN_SECONDS: float = 30.0
+    LLM_MAX_TOKENS: int = 1000
+    LLM_TEMPERATURE: float = 0.7
+    LLM_STREAM_USAGE: bool = True  # Ask for token usage in streamed responses (stream_options)
+
     # RAG
     EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
     RAG_TOP_K_DEFAULT: int = 5
     RAG_MIN_SCORE_THRESHOLD: float = 0.3  # Minimum relevance score for retrieved documents
+    EMBEDDING_BATCH_SIZE: int = 32
+    CONTEXT_COMPRESSION_ENABLED: bool = False  # Default for chat requests without compress_context
+    CONTEXT_COMPRESSION_TOP_SENTENCES: int = 8  # Sentences kept across all retrieved chunks
+    CONTEXT_COMPRESSION_NEIGHBORS: int = 1  # Sentences kept on each side of a selected one
+
+    # Chat sessions
+    CHAT_SUMMARY_TRIGGER_TOKENS: int = 1500  # Unsummarized history size that triggers compression
+    CHAT_RECENT_MESSAGES: int = 6  # Turns always kept verbatim after compression
+    CHAT_SUMMARY_MAX_TOKENS: int = 300
+    CHAT_SUMMARY_CONCURRENCY: int = 2  # Sessions summarized in parallel (off the history writer thread)
+    CHAT_HISTORY_BATCH_SIZE: int = 100
+    CHAT_HISTORY_FLUSH_INTERVAL_MS: int = 200
+    CHAT_HISTORY_RETRY_MAX_SECONDS: float = 30.0  # Longest wait between writes while the database is down
+
+    # Batch chat (evaluation runs)
+    CHAT_BATCH_MAX_QUESTIONS: int = 1000
+    CHAT_BATCH_CONCURRENCY: int = 4  # Default concurrent LLM generations per batch
+    CHAT_BATCH_MAX_CONCURRENCY: int = 32
+    CHAT_BATCH_RETRIEVAL_CONCURRENCY: int = 8
+
+    # Performance
+    SEARCH_MAX_CANDIDATES: int = 10000  # Matches ranked per table by /search (0 = all; frequent terms)
+    STATS_BATCH_MAX_IDS: int = 500  # Ids per /projects/stats or /rags/stats request
+    REQUEST_COALESCING_ENABLED: bool = True  # Share in-flight identical chat/search computations
+    ANSWER_CACHE_ENABLED: bool = True  # Reuse answers to near-identical RAG questions
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # Default cosine threshold (per-RAG override)
+    ANSWER_CACHE_MAX_ENTRIES_PER_RAG: int = 500
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+
+    # Document versions
+    DOCUMENT_VERSION_SNAPSHOT_INTERVAL: int = 20  # Full copy every N versions, deltas in between
+    DOCUMENT_VERSION_CACHE_SIZE: int = 256  # Rebuilt version contents kept in memory
+    DOCUMENT_VERSION_KEEP_LAST: int = 0  # Compaction keeps at most N versions per document (0 = all)
+    DOCUMENT_VERSION_MAX_AGE_DAYS: int = 0  # Compaction drops versions older than this (0 = never)
+    DOCUMENT_VERSION_COMPACTION_INTERVAL_SECONDS: int = 0  # Background compaction period (0 = disabled)
+
+    # Workflow steps (states / actions, partitioned by month of capture)
+    WORKFLOW_STEP_PARTITIONS_AHEAD: int = 3  # Monthly partitions created in advance
+    WORKFLOW_STEP_RETENTION_MONTHS: int = 0  # Drop step partitions older than this (0 = keep all)
+    WORKFLOW_STEP_ARCHIVE_PATH: str = ""  # Gzipped CSV copies of dropped partitions (empty = no archive)
+    WORKFLOW_STEP_MAINTENANCE_INTERVAL_SECONDS: int = 86400  # Partition creation / retention period (0 = disabled)
+
+    # Uploaded files
+    BLOB_STORE_BACKEND: str = "local"  # Content-addressed store for uploaded file contents
+    BLOB_STORE_PATH: str = "/data/blobs"
+    BLOB_GC_GRACE_SECONDS: int = 3600  # Unreferenced blobs younger than this survive GC (in-flight uploads)
+    UPLOAD_MAX_FILE_BYTES: int = 100 * 1024 * 1024
+    UPLOAD_STREAMING_THRESHOLD_BYTES: int = 1024 * 1024  # Larger files are ingested in pieces (flat memory)
+    UPLOAD_CONCURRENCY: int = 4  # Files read, decoded and stored concurrently per request
+    UPLOAD_INSERT_BATCH_SIZE: int = 50  # Max files per multi-row insert
 
     # Security
     SECRET_KEY: str = "change-me-in-production"
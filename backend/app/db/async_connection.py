@@ -0,0 +1,102 @@
+"""
+Connexions asynchrones (psycopg 3 + psycopg_pool)
+Utilisées par les routers async def; le code sync (services, threads de fond)
+garde le pool psycopg2 de app.db.connection
+"""
+from typing import Optional
+from contextlib import asynccontextmanager
+import asyncio
+import time
+
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from app.config import settings
+from app import metrics
+from app.db.instrumentation import InstrumentedAsyncCursor
+
+# Pool de connexions async
+pool: Optional[AsyncConnectionPool] = None
+_pool_lock = asyncio.Lock()
+
+_wait_ms = metrics.histogram("db_async_pool.wait_ms", "Time spent waiting for an async pooled connection")
+_acquire_failures = metrics.counter("db_async_pool.acquire_failures", "Async checkouts that timed out")
+
+
+def _stat(name: str) -> Optional[int]:
+    return pool.get_stats().get(name) if pool is not None else None
+
+
+def _in_use() -> Optional[int]:
+    if pool is None:
+        return None
+    stats = pool.get_stats()
+    return stats.get("pool_size", 0) - stats.get("pool_available", 0)
+
+
+metrics.gauge("db_async_pool.size", lambda: _stat("pool_size"), "Open async connections")
+metrics.gauge("db_async_pool.idle", lambda: _stat("pool_available"), "Async connections idle in the pool")
+metrics.gauge("db_async_pool.in_use", _in_use, "Async connections checked out")
+metrics.gauge("db_async_pool.waiting", lambda: _stat("requests_waiting"), "Tasks waiting for an async connection")
+
+
+async def init_async_pool() -> AsyncConnectionPool:
+    """Ouvre le pool async (une seule fois)"""
+    global pool
+    async with _pool_lock:
+        if pool is None:
+            new_pool = AsyncConnectionPool(
+                conninfo=settings.DATABASE_URL,
+                min_size=settings.DB_ASYNC_POOL_MIN_SIZE,
+                max_size=settings.DB_ASYNC_POOL_MAX_SIZE,
+                timeout=settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                kwargs={"row_factory": dict_row, "cursor_factory": InstrumentedAsyncCursor},
+                open=False
+            )
+            await new_pool.open()
+            pool = new_pool
+    return pool
+
+
+async def close_async_pool():
+    """Ferme le pool async"""
+    global pool
+    async with _pool_lock:
+        if pool is not None:
+            await pool.close()
+            pool = None
+
+
+@asynccontextmanager
+async def get_async_db():
+    """Context manager async: connexion du pool, commit / rollback en sortie"""
+    db_pool = pool if pool is not None else await init_async_pool()
+
+    start = time.perf_counter()
+    try:
+        conn = await db_pool.getconn()
+    except PoolTimeout:
+        _acquire_failures.inc()
+        raise
+    finally:
+        _wait_ms.observe((time.perf_counter() - start) * 1000)
+
+    try:
+        yield conn
+        await conn.commit()
+    except BaseException:
+        try:
+            await conn.rollback()
+        except Exception:
+            pass  # Connexion cassée: le pool la remplace
+        raise
+    finally:
+        await db_pool.putconn(conn)
+
+
+@asynccontextmanager
+async def get_async_cursor():
+    """Context manager async pour cursor (lignes en dict)"""
+    async with get_async_db() as conn:
+        async with conn.cursor() as cursor:
+            yield cursor
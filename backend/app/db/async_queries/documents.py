@@ -0,0 +1,449 @@
+"""
+Document and Document Version SQL queries (async version of app.db.queries.documents, psycopg 3)
+"""
+from typing import Dict, Any, List, Optional
+from app.db.async_connection import get_async_cursor
+from app.db.pagination import Keyset, page_query
+from app.db.async_queries.rags import bump_index_version
+from app.db.queries.documents import (
+    VERSION_COLUMNS, VERSION_SUMMARY_COLUMNS, VERSION_STORAGE_REPORT_SQL,
+    PROJECT_DOCUMENT_STATS_SQL, EMPTY_PROJECT_DOCUMENT_STATS, document_columns, storage_report, version_with_content
+)
+from app.db.versioning import (
+    CHAIN_HEAD_SQL, CHAIN_SQL, INSERT_VERSION_SQL, build_version, reconstruct, replay, get_version_cache
+)
+from psycopg.types.json import Jsonb
+
+
+# ==================== DOCUMENT CRUD ====================
+
+async def create_document(
+    project_id: int,
+    title: str,
+    content: str,
+    content_type: str = "markdown",
+    workflow_id: Optional[int] = None,
+    status: str = "draft",
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Create a new document"""
+    async with get_async_cursor() as cursor:
+        # Insert document
+        await cursor.execute(
+            """
+            INSERT INTO documents (
+                project_id, workflow_id, title, content,
+                content_type, status, metadata
+            )
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING id, project_id, rag_id, workflow_id, title, content,
+                      content_type, status, is_indexed, metadata, version,
+                      created_at, updated_at, validated_at, last_indexed_at, chunks_count
+            """,
+            (
+                project_id, workflow_id, title, content,
+                content_type, status, Jsonb(metadata) if metadata else None
+            )
+        )
+        document = await cursor.fetchone()
+
+        # Create initial version in same transaction
+        await insert_version(cursor, document['id'], 1, content, "Initial version")
+
+    get_version_cache().put(document['id'], 1, content)
+    return document
+
+
+async def get_document_by_id(document_id: int) -> Optional[Dict[str, Any]]:
+    """Get a document by ID"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT id, project_id, rag_id, workflow_id, title, content,
+                   content_type, status, is_indexed, metadata, version,
+                   created_at, updated_at, validated_at, last_indexed_at, chunks_count
+            FROM documents
+            WHERE id = %s
+            """,
+            (document_id,)
+        )
+        return await cursor.fetchone()
+
+
+async def get_documents_by_project(
+    project_id: int,
+    status: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    summary: bool = False,
+    after: Optional[Keyset] = None
+) -> List[Dict[str, Any]]:
+    """Get all documents for a project with optional status filter (summary: no content, after: keyset cursor)"""
+    conditions, params = ["project_id = %s"], [project_id]
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    query, params = page_query(
+        f"SELECT {document_columns(summary)} FROM documents",
+        conditions, params, "updated_at", limit, offset, after
+    )
+    async with get_async_cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+async def get_documents(
+    status: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    summary: bool = False,
+    after: Optional[Keyset] = None
+) -> List[Dict[str, Any]]:
+    """Get all documents with optional filters (summary: no content, after: keyset cursor)"""
+    conditions, params = [], []
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    query, params = page_query(
+        f"SELECT {document_columns(summary)} FROM documents",
+        conditions, params, "updated_at", limit, offset, after
+    )
+    async with get_async_cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+async def update_document(
+    document_id: int,
+    title: Optional[str] = None,
+    content: Optional[str] = None,
+    content_type: Optional[str] = None,
+    status: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+    create_version: bool = True,
+    change_summary: Optional[str] = None,
+    is_indexed: Optional[bool] = None,
+    chunks_count: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Update a document and optionally create a new version (None if the
+    document does not exist). One UPDATE ... RETURNING: no prior read, and
+    the version number is incremented by the statement itself.
+    """
+
+    # Build update query dynamically
+    update_fields = []
+    params = []
+
+    if title is not None:
+        update_fields.append("title = %s")
+        params.append(title)
+
+    if content is not None:
+        update_fields.append("content = %s")
+        params.append(content)
+
+    if content_type is not None:
+        update_fields.append("content_type = %s")
+        params.append(content_type)
+
+    if status is not None:
+        update_fields.append("status = %s")
+        params.append(status)
+
+        # Set validated_at if status changes to validated
+        if status == "validated":
+            update_fields.append("validated_at = NOW()")
+
+    if metadata is not None:
+        update_fields.append("metadata = %s")
+        params.append(Jsonb(metadata))
+
+    if is_indexed is not None:
+        update_fields.append("is_indexed = %s")
+        params.append(is_indexed)
+        if is_indexed:
+            update_fields.append("last_indexed_at = NOW()")
+
+    if chunks_count is not None:
+        update_fields.append("chunks_count = %s")
+        params.append(chunks_count)
+
+    # Always update updated_at
+    update_fields.append("updated_at = NOW()")
+
+    # If content changed, increment version and create version record
+    if content is not None and create_version:
+        update_fields.append("version = version + 1")
+
+    params.append(document_id)
+
+    async with get_async_cursor() as cursor:
+        query = f"""
+            UPDATE documents
+            SET {', '.join(update_fields)}
+            WHERE id = %s
+            RETURNING id, project_id, rag_id, workflow_id, title, content,
+                      content_type, status, is_indexed, metadata, version,
+                      created_at, updated_at, validated_at, last_indexed_at, chunks_count
+        """
+        await cursor.execute(query, params)
+        updated_doc = await cursor.fetchone()
+        if updated_doc is None:
+            return None
+
+        # Re-indexing changes what the RAG answers: invalidate its answer cache
+        if is_indexed is not None:
+            await bump_index_version(cursor, updated_doc['rag_id'])
+
+        # Create version if content changed (in same transaction)
+        if content is not None and create_version:
+            await insert_version(
+                cursor,
+                document_id,
+                updated_doc['version'],
+                content,
+                change_summary or f"Updated to version {updated_doc['version']}"
+            )
+
+    if content is not None and create_version:
+        get_version_cache().put(document_id, updated_doc['version'], content)
+    return updated_doc
+
+
+async def delete_document(document_id: int) -> bool:
+    """Delete a document (cascade deletes versions and chunks)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            "DELETE FROM documents WHERE id = %s RETURNING id, rag_id, is_indexed",
+            (document_id,)
+        )
+        result = await cursor.fetchone()
+        if result and result['is_indexed']:
+            await bump_index_version(cursor, result['rag_id'])
+    if result:
+        get_version_cache().discard(document_id)
+    return result is not None
+
+
+async def validate_document(document_id: int) -> Optional[Dict[str, Any]]:
+    """Change document status to validated"""
+    return await update_document(
+        document_id=document_id,
+        status="validated",
+        create_version=False
+    )
+
+
+async def publish_document(document_id: int) -> Optional[Dict[str, Any]]:
+    """Change document status to published"""
+    return await update_document(
+        document_id=document_id,
+        status="published",
+        create_version=False
+    )
+
+
+async def get_document_stats_by_project(project_id: int) -> Dict[str, Any]:
+    """Get document statistics for a project (single project_stats row)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(PROJECT_DOCUMENT_STATS_SQL, (project_id,))
+        result = await cursor.fetchone()
+        return result if result else dict(EMPTY_PROJECT_DOCUMENT_STATS)
+
+
+# ==================== DOCUMENT VERSIONS ====================
+
+async def insert_version(
+    cursor,
+    document_id: int,
+    version_number: int,
+    content: str,
+    change_summary: Optional[str]
+) -> None:
+    """
+    Store a version, as a delta against the previous one unless a snapshot is due
+
+    The caller puts the content in the version cache once its transaction
+    commits (a rolled back version must not be served from the cache).
+    """
+    previous, chain_length = None, 0
+    if version_number > 1:
+        await cursor.execute(CHAIN_HEAD_SQL, (document_id, version_number))
+        head = await cursor.fetchone()
+        if head['previous'] is not None and head['last_snapshot'] is not None:
+            previous = await get_version_content(cursor, document_id, head['previous'])
+            chain_length = head['previous'] - head['last_snapshot'] + 1
+
+    row = build_version(content, previous, chain_length)
+    await cursor.execute(
+        INSERT_VERSION_SQL,
+        (
+            document_id, version_number, change_summary,
+            row['storage'], row['content'], row['delta'], row['content_length']
+        )
+    )
+
+
+async def get_version_content(cursor, document_id: int, version_number: int) -> Optional[str]:
+    """Content of a version: from the cache, else rebuilt from its snapshot and deltas"""
+    cache = get_version_cache()
+    content = cache.get(document_id, version_number)
+    if content is None:
+        await cursor.execute(CHAIN_SQL, {'document_id': document_id, 'version_number': version_number})
+        rows = await cursor.fetchall()
+        if not rows or rows[-1]['version_number'] != version_number:
+            return None
+        content = reconstruct(rows)
+        cache.put(document_id, version_number, content)
+    return content
+
+
+async def create_document_version(
+    document_id: int,
+    content: str,
+    version_number: int,
+    change_summary: Optional[str] = None
+) -> Dict[str, Any]:
+    """Create a new document version"""
+    async with get_async_cursor() as cursor:
+        await insert_version(cursor, document_id, version_number, content, change_summary)
+        await cursor.execute(
+            """
+            SELECT id, document_id, version_number, change_summary, created_at
+            FROM document_versions
+            WHERE document_id = %s AND version_number = %s
+            """,
+            (document_id, version_number)
+        )
+        version = await cursor.fetchone()
+
+    get_version_cache().put(document_id, version_number, content)
+    return version_with_content(version, content)
+
+
+async def get_document_versions(document_id: int, summary: bool = False) -> List[Dict[str, Any]]:
+    """Get all versions of a document, newest first (summary: no content, nothing rebuilt)"""
+    async with get_async_cursor() as cursor:
+        if summary:
+            await cursor.execute(
+                f"""
+                SELECT {VERSION_SUMMARY_COLUMNS}
+                FROM document_versions
+                WHERE document_id = %s
+                ORDER BY version_number DESC
+                """,
+                (document_id,)
+            )
+            return await cursor.fetchall()
+
+        # One pass over the whole chain, oldest first
+        await cursor.execute(
+            f"""
+            SELECT {VERSION_COLUMNS}
+            FROM document_versions
+            WHERE document_id = %s
+            ORDER BY version_number
+            """,
+            (document_id,)
+        )
+        versions = [version_with_content(row, content) for row, content in replay(await cursor.fetchall())]
+        versions.reverse()
+        return versions
+
+
+async def get_version_by_number(document_id: int, version_number: int) -> Optional[Dict[str, Any]]:
+    """Get a specific version of a document"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT id, document_id, version_number, change_summary, created_at
+            FROM document_versions
+            WHERE document_id = %s AND version_number = %s
+            """,
+            (document_id, version_number)
+        )
+        result = await cursor.fetchone()
+        if not result:
+            return None
+        return version_with_content(result, await get_version_content(cursor, document_id, version_number))
+
+
+async def get_document_with_versions(document_id: int, summary: bool = False) -> Optional[Dict[str, Any]]:
+    """Get a document with all its versions (summary: versions without content)"""
+    document = await get_document_by_id(document_id)
+    if not document:
+        return None
+
+    document['versions'] = await get_document_versions(document_id, summary=summary)
+    return document
+
+
+async def get_version_storage_report(document_id: Optional[int] = None) -> Dict[str, Any]:
+    """Version storage: logical size (sum of version sizes) vs bytes actually stored"""
+    async with get_async_cursor() as cursor:
+        if document_id is None:
+            await cursor.execute(VERSION_STORAGE_REPORT_SQL)
+        else:
+            await cursor.execute(VERSION_STORAGE_REPORT_SQL + " WHERE document_id = %s", (document_id,))
+        return storage_report(await cursor.fetchone())
+
+
+# ==================== RAG-SPECIFIC FUNCTIONS ====================
+
+async def create_document_for_rag(
+    rag_id: int,
+    title: str,
+    content: str,
+    content_type: str = "markdown",
+    status: str = "draft",
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Create a document for a RAG (not a project)"""
+    async with get_async_cursor() as cursor:
+        # Insert document
+        await cursor.execute(
+            """
+            INSERT INTO documents (
+                rag_id, title, content,
+                content_type, status, metadata
+            )
+            VALUES (%s, %s, %s, %s, %s, %s)
+            RETURNING id, project_id, rag_id, workflow_id, title, content,
+                      content_type, status, is_indexed, metadata, version,
+                      created_at, updated_at, validated_at, last_indexed_at, chunks_count
+            """,
+            (
+                rag_id, title, content,
+                content_type, status, Jsonb(metadata) if metadata else None
+            )
+        )
+        document = await cursor.fetchone()
+
+        # Create initial version in same transaction
+        await insert_version(cursor, document['id'], 1, content, "Initial version")
+
+    get_version_cache().put(document['id'], 1, content)
+    return document
+
+
+async def get_documents_by_rag(
+    rag_id: int,
+    limit: int = 100,
+    offset: int = 0,
+    status: Optional[str] = None,
+    summary: bool = False,
+    after: Optional[Keyset] = None
+) -> List[Dict[str, Any]]:
+    """Get all documents for a RAG with optional filters (summary: no content, after: keyset cursor)"""
+    conditions, params = ["rag_id = %s"], [rag_id]
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    query, params = page_query(
+        f"SELECT {document_columns(summary)} FROM documents",
+        conditions, params, "updated_at", limit, offset, after
+    )
+    async with get_async_cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
\ No newline at end of file
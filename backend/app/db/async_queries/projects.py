@@ -0,0 +1,108 @@
+"""
+Requêtes projets (version async de app.db.queries.projects)
+"""
+from typing import Optional, List, Dict, Any
+from app.db.async_connection import get_async_cursor
+from app.db.pagination import Keyset, page_query
+from app.db.queries.projects import PROJECT_STATS_SQL, PROJECT_STATS_BATCH_SQL
+
+
+async def create_project(name: str, description: Optional[str] = None) -> Dict[str, Any]:
+    """Crée un nouveau projet"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            """
+            INSERT INTO projects (name, description)
+            VALUES (%s, %s)
+            RETURNING id, name, description, created_at, updated_at
+            """,
+            (name, description)
+        )
+        return await cursor.fetchone()
+
+
+async def get_project_by_id(project_id: int) -> Optional[Dict[str, Any]]:
+    """Récupère un projet par son ID"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT id, name, description, created_at, updated_at
+            FROM projects
+            WHERE id = %s
+            """,
+            (project_id,)
+        )
+        return await cursor.fetchone()
+
+
+async def get_all_projects(skip: int = 0, limit: int = 100, after: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+    """Récupère tous les projets avec pagination (offset, ou curseur keyset `after`)"""
+    query, params = page_query(
+        "SELECT id, name, description, created_at, updated_at FROM projects",
+        [], [], "created_at", limit, skip, after
+    )
+    async with get_async_cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+async def update_project(project_id: int, name: Optional[str] = None, description: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Met à jour un projet"""
+    updates = []
+    params = []
+
+    if name is not None:
+        updates.append("name = %s")
+        params.append(name)
+    if description is not None:
+        updates.append("description = %s")
+        params.append(description)
+
+    if not updates:
+        return await get_project_by_id(project_id)
+
+    updates.append("updated_at = NOW()")
+    params.append(project_id)
+
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            f"""
+            UPDATE projects
+            SET {', '.join(updates)}
+            WHERE id = %s
+            RETURNING id, name, description, created_at, updated_at
+            """,
+            params
+        )
+        return await cursor.fetchone()
+
+
+async def delete_project(project_id: int) -> bool:
+    """Supprime un projet"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            "DELETE FROM projects WHERE id = %s RETURNING id",
+            (project_id,)
+        )
+        return await cursor.fetchone() is not None
+
+
+async def count_projects() -> int:
+    """Compte le nombre total de projets"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute("SELECT COUNT(*) as count FROM projects")
+        return (await cursor.fetchone())['count']
+
+
+async def get_project_stats(project_id: int) -> Optional[Dict[str, Any]]:
+    """Statistiques d'un projet (une seule ligne); None si le projet n'existe pas"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(PROJECT_STATS_SQL, (project_id,))
+        return await cursor.fetchone()
+
+
+async def get_project_stats_batch(project_ids: List[int]) -> List[Dict[str, Any]]:
+    """Statistiques de plusieurs projets, dans l'ordre demandé (found=False pour un id inconnu)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(PROJECT_STATS_BATCH_SQL, (list(project_ids),))
+        return await cursor.fetchall()
@@ -0,0 +1,306 @@
+"""
+RAG and uploaded file SQL queries (async version of app.db.queries.rags, psycopg 3)
+"""
+from typing import AsyncIterator, Callable, Dict, Any, Iterable, List, Optional
+from contextlib import asynccontextmanager
+from psycopg import AsyncCursor
+from app.db.async_connection import get_async_cursor
+from app.db.pagination import Keyset, page_query
+from psycopg.types.json import Jsonb
+from app.db.queries.rags import (
+    UPLOADED_FILE_COLUMNS, RAG_STATS_SQL, RAG_STATS_BATCH_SQL, FIND_UPLOADS_BY_DIGESTS_SQL, INSERT_UPLOADED_DOCUMENTS_SQL,
+    INSERT_STREAMED_UPLOAD_SQL, COPY_DOCUMENT_SQL, COPY_VERSION_SQL, UPLOAD_LOCK_SQL, streamed_upload_rows
+)
+from app.db.streaming import copy_row
+from starlette.concurrency import iterate_in_threadpool
+from app.db.versioning import SNAPSHOT, get_version_cache
+import json
+
+
+# ==================== RAG CRUD ====================
+
+async def create_rag(
+    name: str,
+    description: Optional[str] = None,
+    semantic_cache_threshold: Optional[float] = None
+) -> Dict[str, Any]:
+    """Create a new RAG collection"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            """
+            INSERT INTO rags (name, description, semantic_cache_threshold)
+            VALUES (%s, %s, %s)
+            RETURNING id, name, description, index_version, semantic_cache_threshold,
+                   created_at, updated_at
+            """,
+            (name, description, semantic_cache_threshold)
+        )
+        return await cursor.fetchone()
+
+
+async def get_rag_by_id(rag_id: int) -> Optional[Dict[str, Any]]:
+    """Get a RAG by ID"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT id, name, description, index_version, semantic_cache_threshold,
+                   created_at, updated_at
+            FROM rags
+            WHERE id = %s
+            """,
+            (rag_id,)
+        )
+        return await cursor.fetchone()
+
+
+async def get_all_rags(skip: int = 0, limit: int = 100, after: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+    """Get all RAGs with pagination (offset, or keyset cursor `after`)"""
+    query, params = page_query(
+        """SELECT id, name, description, index_version, semantic_cache_threshold,
+                  created_at, updated_at
+           FROM rags""",
+        [], [], "created_at", limit, skip, after
+    )
+    async with get_async_cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+async def update_rag(
+    rag_id: int,
+    name: Optional[str] = None,
+    description: Optional[str] = None,
+    semantic_cache_threshold: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """Update a RAG"""
+    updates = []
+    params = []
+
+    if name is not None:
+        updates.append("name = %s")
+        params.append(name)
+    if description is not None:
+        updates.append("description = %s")
+        params.append(description)
+    if semantic_cache_threshold is not None:
+        updates.append("semantic_cache_threshold = %s")
+        params.append(semantic_cache_threshold)
+
+    if not updates:
+        return await get_rag_by_id(rag_id)
+
+    updates.append("updated_at = NOW()")
+    params.append(rag_id)
+
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            f"""
+            UPDATE rags
+            SET {', '.join(updates)}
+            WHERE id = %s
+            RETURNING id, name, description, index_version, semantic_cache_threshold,
+                   created_at, updated_at
+            """,
+            params
+        )
+        return await cursor.fetchone()
+
+
+async def bump_index_version(cursor, rag_id: Optional[int]) -> None:
+    """
+    Invalidate cached answers of a RAG whose vector index changed
+    (runs on the caller's cursor, in its transaction)
+    """
+    if rag_id is None:
+        return
+    await cursor.execute(
+        "UPDATE rags SET index_version = index_version + 1 WHERE id = %s",
+        (rag_id,)
+    )
+
+
+async def delete_rag(rag_id: int) -> bool:
+    """Delete a RAG (cascade deletes documents, files)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            "DELETE FROM rags WHERE id = %s RETURNING id",
+            (rag_id,)
+        )
+        return await cursor.fetchone() is not None
+
+
+async def get_rag_stats(rag_id: int) -> Optional[Dict[str, Any]]:
+    """Get statistics for a RAG (single rag_stats row); None if the RAG does not exist"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(RAG_STATS_SQL, (rag_id,))
+        return await cursor.fetchone()
+
+
+async def get_rag_stats_batch(rag_ids: List[int]) -> List[Dict[str, Any]]:
+    """Stats rows of several RAGs, in the requested order (found=False for unknown ids)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(RAG_STATS_BATCH_SQL, (list(rag_ids),))
+        return await cursor.fetchall()
+
+
+# ==================== UPLOADED FILES ====================
+
+async def create_uploaded_file(
+    rag_id: int,
+    filename: str,
+    file_type: str,
+    file_size: int,
+    blob_sha256: str,
+    mime_type: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Store an uploaded file's metadata (content is in the blob store under blob_sha256)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            f"""
+            INSERT INTO uploaded_files
+            (rag_id, filename, file_type, file_size, blob_sha256, mime_type, metadata)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING {UPLOADED_FILE_COLUMNS}
+            """,
+            (
+                rag_id,
+                filename,
+                file_type,
+                file_size,
+                blob_sha256,
+                mime_type,
+                Jsonb(metadata) if metadata else None
+            )
+        )
+        return await cursor.fetchone()
+
+
+async def get_uploaded_files_by_rag(rag_id: int) -> List[Dict[str, Any]]:
+    """Get all uploaded files for a RAG (without binary content)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            f"""
+            SELECT {UPLOADED_FILE_COLUMNS}
+            FROM uploaded_files
+            WHERE rag_id = %s
+            ORDER BY uploaded_at DESC
+            """,
+            (rag_id,)
+        )
+        return await cursor.fetchall()
+
+
+async def get_uploaded_file(file_id: int) -> Optional[Dict[str, Any]]:
+    """Get an uploaded file's metadata (blob_sha256 is None for rows not yet migrated out of BYTEA)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            f"SELECT {UPLOADED_FILE_COLUMNS} FROM uploaded_files WHERE id = %s",
+            (file_id,)
+        )
+        return await cursor.fetchone()
+
+
+async def get_uploaded_file_content(file_id: int) -> Optional[bytes]:
+    """Get the legacy BYTEA content of an uploaded file (None once moved to the blob store)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            "SELECT file_content FROM uploaded_files WHERE id = %s",
+            (file_id,)
+        )
+        result = await cursor.fetchone()
+        return result['file_content'] if result else None
+
+
+@asynccontextmanager
+async def upload_transaction(rag_id: int) -> AsyncIterator[AsyncCursor]:
+    """Transaction holding the RAG's upload lock until commit (see queries.rags.upload_transaction)"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(UPLOAD_LOCK_SQL, (rag_id,))
+        yield cursor
+
+
+@asynccontextmanager
+async def _reuse_cursor(cursor: Optional[AsyncCursor]) -> AsyncIterator[AsyncCursor]:
+    """The caller's cursor inside a savepoint, or a new cursor and transaction"""
+    if cursor is None:
+        async with get_async_cursor() as cursor:
+            yield cursor
+        return
+    async with cursor.connection.transaction():
+        yield cursor
+
+
+async def find_uploaded_files_by_digests(
+    rag_id: int,
+    digests: List[str],
+    cursor: Optional[AsyncCursor] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Earlier uploads with the same contents, by blob_sha256 (this RAG first)"""
+    if not digests:
+        return {}
+    async with _reuse_cursor(cursor) as cursor:
+        await cursor.execute(FIND_UPLOADS_BY_DIGESTS_SQL, (list(digests), rag_id))
+        return {row['blob_sha256']: row for row in await cursor.fetchall()}
+
+
+async def create_uploaded_documents(
+    rag_id: int,
+    files: List[Dict[str, Any]],
+    cursor: Optional[AsyncCursor] = None
+) -> List[Dict[str, Any]]:
+    """Insert a batch of uploads (file rows, documents, initial versions) in one statement"""
+    if not files:
+        return []
+    owns_transaction = cursor is None
+    rows = [{**file, 'position': position} for position, file in enumerate(files)]
+    async with _reuse_cursor(cursor) as cursor:
+        await cursor.execute(
+            INSERT_UPLOADED_DOCUMENTS_SQL,
+            {'rag_id': rag_id, 'files': json.dumps(rows), 'storage': SNAPSHOT}
+        )
+        created = [{'file_id': row['file_id'], 'document_id': row['document_id']} for row in await cursor.fetchall()]
+
+    # Only once committed: with the caller's cursor, the caller fills the cache after its commit
+    if owns_transaction:
+        cache = get_version_cache()
+        for file, row in zip(files, created):
+            cache.put(row['document_id'], 1, file['content'])
+    return created
+
+
+async def create_uploaded_document_streamed(
+    rag_id: int,
+    file: Dict[str, Any],
+    texts: Callable[[], Iterable[str]],
+    cursor: Optional[AsyncCursor] = None
+) -> Dict[str, Any]:
+    """
+    Insert a large upload without holding its text (document and initial
+    version written with COPY; `texts` is read in the threadpool, twice)
+    """
+    async with _reuse_cursor(cursor) as cursor:
+        await cursor.execute(
+            INSERT_STREAMED_UPLOAD_SQL,
+            (
+                rag_id, file['filename'], file['file_type'], file['file_size'], file['blob_sha256'],
+                file['mime_type'], Jsonb({'original_filename': file['filename']})
+            )
+        )
+        ids = await cursor.fetchone()
+        rows = streamed_upload_rows(rag_id, file, ids)
+        for sql, values in ((COPY_DOCUMENT_SQL, rows['document']), (COPY_VERSION_SQL, rows['version'])):
+            async with cursor.copy(sql) as copy:
+                async for data in iterate_in_threadpool(copy_row(values, texts())):
+                    await copy.write(data)
+        return ids
+
+
+async def delete_uploaded_file(file_id: int) -> bool:
+    """Delete an uploaded file"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            "DELETE FROM uploaded_files WHERE id = %s RETURNING id",
+            (file_id,)
+        )
+        return await cursor.fetchone() is not None
@@ -0,0 +1,24 @@
+"""
+Full-text search SQL queries (async version of app.db.queries.search, psycopg 3)
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from app.db.async_connection import get_async_cursor
+from app.db.queries.search import SEARCH_SCOPES, search_query
+
+
+async def search(
+    query: str,
+    scopes: Tuple[str, ...] = SEARCH_SCOPES,
+    project_id: Optional[int] = None,
+    rag_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """Documents and workflows matching `query`, best rank first, with highlighted excerpts"""
+    sql, params = search_query(query, scopes, project_id, rag_id, status, limit, offset)
+    if not sql:
+        return []
+    async with get_async_cursor() as cursor:
+        await cursor.execute(sql, params)
+        return await cursor.fetchall()
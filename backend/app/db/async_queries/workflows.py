@@ -0,0 +1,198 @@
+"""
+Requêtes workflows (version async de app.db.queries.workflows)
+"""
+from typing import Optional, List, Dict, Any, Union
+import psycopg.errors
+from psycopg.types.json import Jsonb
+from app.db.async_connection import get_async_cursor
+from app.db.pagination import Keyset, page_query
+from app.db.queries.workflows import (
+    CREATE_WORKFLOW_SQL, INSERT_STATES_SQL, INSERT_ACTIONS_SQL, WORKFLOW_COLUMNS, WORKFLOW_SUMMARY_COLUMNS,
+    DuplicateWorkflow, InvalidStepFilter, WorkflowProjectNotFound, json_batches, step_search_query
+)
+
+
+async def create_workflow(
+    project_id: int,
+    name: str,
+    raw_data: Dict[str, Any],
+    workflow_hash: str,
+    description: Optional[str] = None,
+    url: Optional[str] = None,
+    domain: Optional[str] = None,
+    duration_ms: Optional[int] = None,
+    states: Optional[List[Dict[str, Any]]] = None,
+    actions: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Crée un nouveau workflow avec ses états et actions
+
+    Raises:
+        WorkflowProjectNotFound: le projet n'existe pas
+        DuplicateWorkflow: le projet a déjà un workflow de ce hash
+    """
+    async with get_async_cursor() as cursor:
+        # Insérer le workflow (vérification du projet et du hash comprises)
+        await cursor.execute(
+            CREATE_WORKFLOW_SQL,
+            (project_id, name, description, Jsonb(raw_data), workflow_hash, url, domain, duration_ms)
+        )
+        workflow = await cursor.fetchone()
+        if not workflow.pop('project_found'):
+            raise WorkflowProjectNotFound(project_id)
+        if workflow['id'] is None:
+            raise DuplicateWorkflow(workflow_hash)
+
+        # Insérer les états et actions par lots (INSERT multi-lignes)
+        for batch in json_batches(states or []):
+            await cursor.execute(INSERT_STATES_SQL, (workflow['id'], workflow['created_at'], batch))
+
+        for batch in json_batches(actions or []):
+            await cursor.execute(INSERT_ACTIONS_SQL, (workflow['id'], workflow['created_at'], batch))
+
+        return workflow
+
+
+async def get_workflow_by_id(workflow_id: int, include_details: bool = False) -> Optional[Dict[str, Any]]:
+    """Récupère un workflow par son ID"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT id, project_id, name, description, raw_data, workflow_hash, url, domain, duration_ms, created_at, updated_at
+            FROM workflows
+            WHERE id = %s
+            """,
+            (workflow_id,)
+        )
+        workflow = await cursor.fetchone()
+        if not workflow:
+            return None
+
+        if include_details:
+            # captured_at = created_at du workflow: une seule partition lue par table
+            # Récupérer les états
+            await cursor.execute(
+                """
+                SELECT state_type, state_data, sequence_order, timestamp
+                FROM workflow_states
+                WHERE workflow_id = %s AND captured_at = %s
+                ORDER BY sequence_order
+                """,
+                (workflow_id, workflow['created_at'])
+            )
+            workflow['states'] = await cursor.fetchall()
+
+            # Récupérer les actions
+            await cursor.execute(
+                """
+                SELECT action_type, action_data, sequence_order, timestamp
+                FROM workflow_actions
+                WHERE workflow_id = %s AND captured_at = %s
+                ORDER BY sequence_order
+                """,
+                (workflow_id, workflow['created_at'])
+            )
+            workflow['actions'] = await cursor.fetchall()
+
+        return workflow
+
+
+async def get_workflows_by_project(
+    project_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    summary: bool = False,
+    after: Optional[Keyset] = None
+) -> List[Dict[str, Any]]:
+    """Récupère tous les workflows d'un projet (summary: sans raw_data, after: curseur keyset)"""
+    query, params = page_query(
+        f"SELECT {WORKFLOW_SUMMARY_COLUMNS if summary else WORKFLOW_COLUMNS} FROM workflows",
+        ["project_id = %s"], [project_id], "created_at", limit, skip, after
+    )
+    async with get_async_cursor() as cursor:
+        await cursor.execute(query, params)
+        return await cursor.fetchall()
+
+
+async def get_workflow_by_hash(project_id: int, workflow_hash: str) -> Optional[Dict[str, Any]]:
+    """Vérifie si un workflow existe déjà par son hash"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            """
+            SELECT id, project_id, name, description, raw_data, workflow_hash, url, domain, duration_ms, created_at, updated_at
+            FROM workflows
+            WHERE project_id = %s AND workflow_hash = %s
+            """,
+            (project_id, workflow_hash)
+        )
+        return await cursor.fetchone()
+
+
+async def update_workflow(workflow_id: int, name: Optional[str] = None, description: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Met à jour un workflow"""
+    updates = []
+    params = []
+
+    if name is not None:
+        updates.append("name = %s")
+        params.append(name)
+    if description is not None:
+        updates.append("description = %s")
+        params.append(description)
+
+    if not updates:
+        return await get_workflow_by_id(workflow_id)
+
+    updates.append("updated_at = NOW()")
+    params.append(workflow_id)
+
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            f"""
+            UPDATE workflows
+            SET {', '.join(updates)}
+            WHERE id = %s
+            RETURNING id, project_id, name, description, raw_data, workflow_hash, url, domain, duration_ms, created_at, updated_at
+            """,
+            params
+        )
+        return await cursor.fetchone()
+
+
+async def delete_workflow(workflow_id: int) -> bool:
+    """Supprime un workflow"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            "DELETE FROM workflows WHERE id = %s RETURNING id",
+            (workflow_id,)
+        )
+        return await cursor.fetchone() is not None
+
+
+async def count_workflows_by_project(project_id: int) -> int:
+    """Compte le nombre de workflows d'un projet"""
+    async with get_async_cursor() as cursor:
+        await cursor.execute(
+            "SELECT COUNT(*) as count FROM workflows WHERE project_id = %s",
+            (project_id,)
+        )
+        return (await cursor.fetchone())['count']
+
+
+async def search_steps(
+    kind: str,
+    contains: Optional[Union[Dict[str, Any], List[Any]]] = None,
+    path: Optional[str] = None,
+    step_type: Optional[str] = None,
+    project_id: Optional[int] = None,
+    limit: int = 100,
+    after: Optional[Keyset] = None
+) -> List[Dict[str, Any]]:
+    """Étapes dont les données correspondent au filtre JSON (voir step_search_query)"""
+    query, params = step_search_query(kind, contains, path, step_type, project_id, limit, after)
+    async with get_async_cursor() as cursor:
+        try:
+            await cursor.execute(query, params)
+        except psycopg.errors.SyntaxError as e:
+            raise InvalidStepFilter(f"Invalid jsonpath: {e.diag.message_primary or e}") from e
+        return await cursor.fetchall()
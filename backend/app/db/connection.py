@@ -1,30 +1,230 @@
 import psycopg2
-from psycopg2.pool import SimpleConnectionPool
-from psycopg2.extras import RealDictCursor
+from psycopg2.pool import PoolError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+from collections import deque
 from contextlib import contextmanager
+import threading
+import time
 from app.config import settings
+from app import metrics
+from app.db.instrumentation import InstrumentedCursor
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Pool de connexions
 pool = None
+_pool_lock = threading.Lock()
+
+
+class PoolTimeout(PoolError):
+    """Aucune connexion libérée avant la fin du délai d'attente"""
+
+
+class ThreadSafeConnectionPool:
+    """
+    Pool de connexions partagé entre les threads des endpoints sync
+
+    - getconn() bloque jusqu'à `timeout` secondes quand les `maxconn`
+      connexions sont prises, puis lève PoolTimeout
+    - une connexion restée inactive plus de `healthcheck_idle_seconds` est
+      vérifiée (SELECT 1) avant d'être rendue, et remplacée si elle est cassée
+    - putconn() annule une transaction restée ouverte et jette les connexions
+      fermées ou dans un état inconnu
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int,
+        maxconn: int,
+        timeout: float,
+        healthcheck_idle_seconds: float
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool bounds: min={minconn}, max={maxconn}")
+
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle_seconds = healthcheck_idle_seconds
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (connexion, instant de remise dans le pool)
+        self._size = 0  # connexions ouvertes (ou en cours d'ouverture)
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._wait_ms = metrics.histogram("db_pool.wait_ms", "Time spent waiting for a pooled connection")
+        self._acquire_failures = metrics.counter(
+            "db_pool.acquire_failures", "Checkouts that failed (timeout or connection error)"
+        )
+        self._acquire_timeouts = metrics.counter("db_pool.acquire_timeouts", "Checkouts that timed out")
+        self._broken = metrics.counter("db_pool.broken_connections", "Connections discarded as unusable")
+        self._created = metrics.counter("db_pool.connections_created", "Connections opened")
+        metrics.gauge("db_pool.in_use", lambda: self._in_use, "Connections checked out")
+        metrics.gauge("db_pool.idle", lambda: len(self._idle), "Connections idle in the pool")
+        metrics.gauge("db_pool.size", lambda: self._size, "Open connections")
+        metrics.gauge("db_pool.waiting", lambda: self._waiting, "Threads waiting for a connection")
+        metrics.gauge("db_pool.max_size", lambda: self.maxconn, "Pool capacity")
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        self._created.inc()
+        return conn
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.healthcheck_idle_seconds:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout: float = None):
+        """Emprunte une connexion (bloque au plus `timeout` secondes si le pool est plein)"""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    # LIFO: la connexion la plus récemment utilisée est la plus sûre
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    conn, idle_since = None, None
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._acquire_timeouts.inc()
+                    self._acquire_failures.inc()
+                    self._wait_ms.observe((time.monotonic() - start) * 1000)
+                    raise PoolTimeout(
+                        f"No database connection available after {timeout:.1f}s "
+                        f"({self._in_use}/{self.maxconn} in use)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+
+        self._wait_ms.observe((time.monotonic() - start) * 1000)
+
+        # Ouverture / vérification hors du verrou
+        try:
+            if conn is not None and not self._is_healthy(conn, idle_since):
+                logger.warning("Discarding broken pooled database connection")
+                self._broken.inc()
+                self._close_quietly(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            self._acquire_failures.inc()
+            raise
+
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        """Rend une connexion au pool"""
+        discard = close or conn.closed
+        if not discard:
+            status = conn.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                discard = True
+            elif status != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+
+        if discard and not close:
+            self._broken.inc()
+
+        with self._cond:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    def closeall(self):
+        """Ferme les connexions inactives; celles empruntées seront fermées à leur retour"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'min_size': self.minconn,
+                'max_size': self.maxconn
+            }
 
 
 def init_pool():
     """Initialise le pool de connexions"""
     global pool
-    if pool is None:
-        pool = SimpleConnectionPool(
-            minconn=1,
-            maxconn=20,
-            dsn=settings.DATABASE_URL
-        )
+    with _pool_lock:
+        if pool is None:
+            pool = ThreadSafeConnectionPool(
+                dsn=settings.DATABASE_URL,
+                minconn=settings.DB_POOL_MIN_SIZE,
+                maxconn=settings.DB_POOL_MAX_SIZE,
+                timeout=settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                healthcheck_idle_seconds=settings.DB_POOL_HEALTHCHECK_IDLE_SECONDS
+            )
 
 
 def close_pool():
     """Ferme le pool de connexions"""
     global pool
-    if pool is not None:
-        pool.closeall()
-        pool = None
+    with _pool_lock:
+        if pool is not None:
+            pool.closeall()
+            pool = None
 
 
 @contextmanager
@@ -33,22 +233,26 @@ def get_db():
     if pool is None:
         init_pool()
 
-    conn = pool.getconn()
+    db_pool = pool
+    conn = db_pool.getconn()
     try:
         yield conn
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass  # Connexion cassée: putconn la jette
         raise
     finally:
-        pool.putconn(conn)
+        db_pool.putconn(conn)
 
 
 @contextmanager
 def get_cursor():
-    """Context manager pour cursor avec RealDictCursor"""
+    """Context manager pour cursor avec RealDictCursor (instrumenté: app.db.instrumentation)"""
     with get_db() as conn:
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        cursor = conn.cursor(cursor_factory=InstrumentedCursor)
         try:
             yield cursor
         finally:
@@ -0,0 +1,255 @@
+"""
+Instrumentation des requêtes SQL
+
+Les curseurs des deux pools (psycopg2 et psycopg 3) chronomètrent chaque
+requête et l'enregistrent:
+- dans les métriques du process (db.queries, db.query_ms, db.slow_queries);
+- dans le journal quand elle dépasse DB_SLOW_QUERY_MS (SQL normalisé:
+  littéraux et paramètres remplacés par ?);
+- dans les statistiques de la requête HTTP en cours (contextvar), que
+  QueryStatsMiddleware publie en en-têtes X-DB-* (DB_QUERY_DEBUG_HEADERS)
+  et dont il signale les instructions répétées (N+1).
+
+Pour les tests, assert_max_queries() borne le nombre de requêtes d'un bloc.
+"""
+from typing import Any, Dict, Iterator, List, Optional
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import re
+import threading
+import time
+
+from psycopg import AsyncCursor
+from psycopg2.extras import RealDictCursor
+
+from app.config import settings
+from app import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Query-Time-Ms"
+SLOW_QUERY_HEADER = "X-DB-Slow-Queries"
+QUERY_HEADERS = [QUERY_COUNT_HEADER, QUERY_TIME_HEADER, SLOW_QUERY_HEADER]
+
+# Longueur maximale du SQL normalisé (journal, statistiques)
+MAX_STATEMENT_CHARS = 500
+
+_queries = metrics.counter("db.queries", "SQL statements executed")
+_query_ms = metrics.histogram("db.query_ms", "SQL statement duration")
+_slow_queries = metrics.counter("db.slow_queries", "SQL statements slower than DB_SLOW_QUERY_MS")
+_request_queries = metrics.histogram("db.request_queries", "SQL statements per HTTP request")
+_request_query_ms = metrics.histogram("db.request_query_ms", "Time spent in SQL per HTTP request")
+_n_plus_one = metrics.counter("db.n_plus_one_requests", "Requests repeating a statement DB_N_PLUS_ONE_THRESHOLD times")
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL sans valeurs: littéraux et paramètres -> ?, listes de ? réduites, espaces compactés"""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _VALUE_LIST.sub("?, ...", sql)
+    sql = _WHITESPACE.sub(" ", sql).strip()
+    return sql[:MAX_STATEMENT_CHARS]
+
+
+class QueryStats:
+    """Requêtes d'un périmètre (requête HTTP, bloc de test): nombre, durée, lentes, répétitions"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slow: List[Dict[str, Any]] = []
+        self.statements: StatementCounter = StatementCounter()
+        self._lock = threading.Lock()
+
+    def add(self, statement: str, duration_ms: float, slow: bool) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            self.statements[statement] += 1
+            if slow:
+                self.slow.append({'sql': statement, 'duration_ms': round(duration_ms, 1)})
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+        """Instructions exécutées au moins `threshold` fois (candidates N+1)"""
+        if threshold <= 0:
+            return []
+        with self._lock:
+            return [
+                {'sql': statement, 'count': count}
+                for statement, count in self.statements.most_common()
+                if count >= threshold
+            ]
+
+
+# Statistiques de la requête HTTP en cours (None hors requête: threads de fond)
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("db_query_stats", default=None)
+
+# Blocs assert_max_queries() actifs: voient toutes les requêtes du process
+_listeners: List[QueryStats] = []
+_listeners_lock = threading.Lock()
+
+
+def _statement_text(query: Any, context: Any) -> str:
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    try:
+        return query.as_string(context)  # psycopg2.sql / psycopg.sql
+    except Exception:
+        return str(query)
+
+
+def record_query(query: Any, duration_ms: float, context: Any = None) -> None:
+    """Enregistre une requête exécutée (appelé par les curseurs instrumentés)"""
+    slow = duration_ms >= settings.DB_SLOW_QUERY_MS
+    _queries.inc()
+    _query_ms.observe(duration_ms)
+
+    stats = _current_stats.get()
+    with _listeners_lock:
+        listeners = list(_listeners)
+    if stats is None and not listeners and not slow:
+        return
+
+    statement = normalize_sql(_statement_text(query, context))
+    if slow:
+        _slow_queries.inc()
+        logger.warning(f"Slow query ({duration_ms:.0f}ms): {statement}")
+    if stats is not None:
+        stats.add(statement, duration_ms, slow)
+    for listener in listeners:
+        listener.add(statement, duration_ms, slow)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Compte les requêtes du contexte courant (tâches et threadpool qu'il lance compris)"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Helper de test: échoue si le bloc exécute plus de `max_queries` requêtes
+
+    Compte toutes les requêtes du process pendant le bloc (TestClient exécute
+    l'application dans un autre thread), jobs de fond compris.
+
+        with assert_max_queries(2):
+            client.put(f"/api/v1/projects/{project_id}", json={"name": "x"})
+    """
+    stats = QueryStats()
+    with _listeners_lock:
+        _listeners.append(stats)
+    try:
+        yield stats
+    finally:
+        with _listeners_lock:
+            _listeners.remove(stats)
+    if stats.count > max_queries:
+        statements = "\n".join(
+            f"  {count}x {statement}" for statement, count in stats.statements.most_common()
+        )
+        raise AssertionError(f"{stats.count} queries executed, expected at most {max_queries}:\n{statements}")
+
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor (psycopg2) chronométrant execute / executemany / copy_expert"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record_query(query, (time.perf_counter() - start) * 1000, self)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            record_query(query, (time.perf_counter() - start) * 1000, self)
+
+    def copy_expert(self, sql, file, size=8192):
+        start = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            record_query(sql, (time.perf_counter() - start) * 1000, self)
+
+
+class InstrumentedAsyncCursor(AsyncCursor):
+    """AsyncCursor (psycopg 3) chronométrant execute / executemany"""
+
+    async def execute(self, query, params=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            record_query(query, (time.perf_counter() - start) * 1000, self)
+
+    async def executemany(self, query, params_seq, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await super().executemany(query, params_seq, **kwargs)
+        finally:
+            record_query(query, (time.perf_counter() - start) * 1000, self)
+
+
+class QueryStatsMiddleware:
+    """
+    Middleware ASGI: statistiques SQL par requête HTTP
+
+    En-têtes X-DB-* (si DB_QUERY_DEBUG_HEADERS) avec les requêtes faites
+    avant l'envoi de la réponse; métriques et détection N+1 une fois la
+    réponse terminée (corps en streaming compris).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start" and settings.DB_QUERY_DEBUG_HEADERS:
+                    headers = list(message.get("headers", []))
+                    headers += [
+                        (QUERY_COUNT_HEADER.lower().encode(), str(stats.count).encode()),
+                        (QUERY_TIME_HEADER.lower().encode(), f"{stats.total_ms:.1f}".encode()),
+                        (SLOW_QUERY_HEADER.lower().encode(), str(len(stats.slow)).encode()),
+                    ]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                _request_queries.observe(stats.count)
+                _request_query_ms.observe(stats.total_ms)
+                repeated = stats.repeated(settings.DB_N_PLUS_ONE_THRESHOLD)
+                if repeated:
+                    _n_plus_one.inc()
+                    logger.warning(
+                        f"Possible N+1 on {scope.get('method')} {scope.get('path')}: "
+                        + "; ".join(f"{item['count']}x {item['sql']}" for item in repeated)
+                    )
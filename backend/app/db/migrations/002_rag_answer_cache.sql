@@ -0,0 +1,3 @@
+-- Semantic answer cache: RAG index version and per-RAG similarity threshold
+ALTER TABLE rags ADD COLUMN IF NOT EXISTS index_version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE rags ADD COLUMN IF NOT EXISTS semantic_cache_threshold REAL;
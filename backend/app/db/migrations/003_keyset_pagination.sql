@@ -0,0 +1,23 @@
+-- Keyset (cursor) pagination: non-null sort columns and composite (sort DESC, id DESC) indexes.
+-- The (filter, sort, id) indexes replace the single-column filter indexes.
+UPDATE projects SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE projects ALTER COLUMN created_at SET NOT NULL;
+UPDATE rags SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE rags ALTER COLUMN created_at SET NOT NULL;
+UPDATE workflows SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE workflows ALTER COLUMN created_at SET NOT NULL;
+UPDATE documents SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE documents ALTER COLUMN updated_at SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_rags_created ON rags(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_workflows_project_created ON workflows(project_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_project_updated ON documents(project_id, updated_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_rag_updated ON documents(rag_id, updated_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_status_updated ON documents(status, updated_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_updated ON documents(updated_at DESC, id DESC);
+
+DROP INDEX IF EXISTS idx_workflows_project;
+DROP INDEX IF EXISTS idx_documents_project;
+DROP INDEX IF EXISTS idx_documents_rag;
+DROP INDEX IF EXISTS idx_documents_status;
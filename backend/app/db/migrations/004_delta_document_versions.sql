@@ -0,0 +1,17 @@
+-- Document versions stored as periodic snapshots + deltas.
+-- Existing rows stay full snapshots; the version compaction job re-encodes them.
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS storage VARCHAR(10) NOT NULL DEFAULT 'snapshot';
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS delta JSONB;
+ALTER TABLE document_versions ADD COLUMN IF NOT EXISTS content_length INTEGER;
+UPDATE document_versions SET content_length = octet_length(content) WHERE content_length IS NULL;
+ALTER TABLE document_versions ALTER COLUMN content_length SET NOT NULL;
+ALTER TABLE document_versions ALTER COLUMN content DROP NOT NULL;
+
+ALTER TABLE document_versions DROP CONSTRAINT IF EXISTS version_storage_payload;
+ALTER TABLE document_versions ADD CONSTRAINT version_storage_payload CHECK (
+    (storage = 'snapshot' AND content IS NOT NULL) OR
+    (storage = 'delta' AND delta IS NOT NULL)
+);
+
+CREATE INDEX IF NOT EXISTS idx_versions_document_number ON document_versions(document_id, version_number);
+DROP INDEX IF EXISTS idx_versions_document;
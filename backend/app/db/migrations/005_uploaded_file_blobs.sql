@@ -0,0 +1,12 @@
+-- Uploaded file contents move from uploaded_files.file_content (BYTEA) to the
+-- content-addressed blob store. New rows only store blob_sha256; existing rows
+-- are moved with `python -m app.services.blob_store migrate` (then VACUUM FULL
+-- uploaded_files to give the space back).
+ALTER TABLE uploaded_files ADD COLUMN IF NOT EXISTS blob_sha256 CHAR(64);
+ALTER TABLE uploaded_files ALTER COLUMN file_content DROP NOT NULL;
+
+ALTER TABLE uploaded_files DROP CONSTRAINT IF EXISTS uploaded_file_has_content;
+ALTER TABLE uploaded_files ADD CONSTRAINT uploaded_file_has_content
+    CHECK (blob_sha256 IS NOT NULL OR file_content IS NOT NULL);
+
+CREATE INDEX IF NOT EXISTS idx_uploaded_files_blob ON uploaded_files(blob_sha256);
@@ -0,0 +1,16 @@
+-- Upload deduplication: an upload whose content (blob_sha256) was already
+-- sent is matched to the document created from the earlier file, through
+-- documents.metadata->>'uploaded_file_id'.
+CREATE INDEX IF NOT EXISTS idx_documents_uploaded_file ON documents((metadata->>'uploaded_file_id'));
+
+-- Chunks are tagged with the SHA-256 of their document's content, so
+-- indexing a document whose content is already indexed copies the existing
+-- chunk embeddings. haystack_documents is created by Haystack on first use:
+-- HaystackService creates the same index then if it is missing here.
+DO $$
+BEGIN
+    IF to_regclass('haystack_documents') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_haystack_documents_content_sha256
+            ON haystack_documents((meta->>'content_sha256'));
+    END IF;
+END $$;
@@ -0,0 +1,222 @@
+-- Statistics tables: one row per RAG and per project, kept up to date by
+-- statement-level triggers (transition tables: one UPDATE per statement and
+-- per RAG / project, whatever the number of rows). Stats endpoints read a
+-- single row instead of aggregating documents / files / workflows.
+-- Re-running this file recomputes every row from the base tables.
+CREATE TABLE IF NOT EXISTS rag_stats (
+    rag_id INTEGER PRIMARY KEY REFERENCES rags(id) ON DELETE CASCADE,
+    document_count INTEGER NOT NULL DEFAULT 0,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    indexed_documents INTEGER NOT NULL DEFAULT 0,
+    total_chunks BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS project_stats (
+    project_id INTEGER PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    total_documents INTEGER NOT NULL DEFAULT 0,
+    draft_count INTEGER NOT NULL DEFAULT 0,
+    validated_count INTEGER NOT NULL DEFAULT 0,
+    published_count INTEGER NOT NULL DEFAULT 0,
+    indexed_count INTEGER NOT NULL DEFAULT 0,
+    total_chunks BIGINT NOT NULL DEFAULT 0,
+    workflow_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- A stats row is created with its RAG / project (deleted with it by cascade)
+CREATE OR REPLACE FUNCTION rag_stats_create() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO rag_stats (rag_id) SELECT id FROM new_rows ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION project_stats_create() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO project_stats (project_id) SELECT id FROM new_rows ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Documents: +1 per new row, -1 per old row (an UPDATE is both), summed per
+-- RAG / project. Groups whose counters do not change are skipped, so
+-- content-only edits do not touch the stats rows.
+DO $$
+BEGIN
+    IF to_regtype('documents_stats_delta') IS NULL THEN
+        CREATE TYPE documents_stats_delta AS (
+            rag_id INTEGER, project_id INTEGER, n INTEGER, status TEXT, is_indexed BOOLEAN, chunks BIGINT
+        );
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION documents_stats_add(deltas documents_stats_delta[]) RETURNS void AS $$
+    UPDATE rag_stats s SET
+        document_count = s.document_count + d.documents,
+        indexed_documents = s.indexed_documents + d.indexed,
+        total_chunks = s.total_chunks + d.chunks
+    FROM (
+        SELECT rag_id,
+               sum(n) AS documents,
+               coalesce(sum(n) FILTER (WHERE is_indexed), 0) AS indexed,
+               sum(n * chunks) AS chunks
+        FROM unnest(deltas)
+        WHERE rag_id IS NOT NULL
+        GROUP BY rag_id
+    ) d
+    WHERE s.rag_id = d.rag_id
+      AND (d.documents <> 0 OR d.indexed <> 0 OR d.chunks <> 0);
+
+    UPDATE project_stats s SET
+        total_documents = s.total_documents + d.documents,
+        draft_count = s.draft_count + d.draft,
+        validated_count = s.validated_count + d.validated,
+        published_count = s.published_count + d.published,
+        indexed_count = s.indexed_count + d.indexed,
+        total_chunks = s.total_chunks + d.chunks
+    FROM (
+        SELECT project_id,
+               sum(n) AS documents,
+               coalesce(sum(n) FILTER (WHERE status = 'draft'), 0) AS draft,
+               coalesce(sum(n) FILTER (WHERE status = 'validated'), 0) AS validated,
+               coalesce(sum(n) FILTER (WHERE status = 'published'), 0) AS published,
+               coalesce(sum(n) FILTER (WHERE is_indexed), 0) AS indexed,
+               sum(n * chunks) AS chunks
+        FROM unnest(deltas)
+        WHERE project_id IS NOT NULL
+        GROUP BY project_id
+    ) d
+    WHERE s.project_id = d.project_id
+      AND (d.documents <> 0 OR d.draft <> 0 OR d.validated <> 0 OR d.published <> 0
+           OR d.indexed <> 0 OR d.chunks <> 0);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION documents_stats_apply() RETURNS trigger AS $$
+DECLARE
+    deltas documents_stats_delta[] := '{}';
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        deltas := deltas || ARRAY(
+            SELECT ROW(rag_id, project_id, 1, status, coalesce(is_indexed, false), coalesce(chunks_count, 0))::documents_stats_delta
+            FROM new_rows
+        );
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        deltas := deltas || ARRAY(
+            SELECT ROW(rag_id, project_id, -1, status, coalesce(is_indexed, false), coalesce(chunks_count, 0))::documents_stats_delta
+            FROM old_rows
+        );
+    END IF;
+    PERFORM documents_stats_add(deltas);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION uploaded_files_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE rag_stats s SET file_count = s.file_count + d.n
+        FROM (SELECT rag_id, count(*) AS n FROM new_rows GROUP BY rag_id) d
+        WHERE s.rag_id = d.rag_id;
+    ELSE
+        UPDATE rag_stats s SET file_count = s.file_count - d.n
+        FROM (SELECT rag_id, count(*) AS n FROM old_rows GROUP BY rag_id) d
+        WHERE s.rag_id = d.rag_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION workflows_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE project_stats s SET workflow_count = s.workflow_count + d.n
+        FROM (SELECT project_id, count(*) AS n FROM new_rows GROUP BY project_id) d
+        WHERE s.project_id = d.project_id;
+    ELSE
+        UPDATE project_stats s SET workflow_count = s.workflow_count - d.n
+        FROM (SELECT project_id, count(*) AS n FROM old_rows GROUP BY project_id) d
+        WHERE s.project_id = d.project_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables require one trigger per event
+CREATE OR REPLACE TRIGGER rags_stats_insert AFTER INSERT ON rags
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rag_stats_create();
+CREATE OR REPLACE TRIGGER projects_stats_insert AFTER INSERT ON projects
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION project_stats_create();
+
+CREATE OR REPLACE TRIGGER documents_stats_insert AFTER INSERT ON documents
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION documents_stats_apply();
+CREATE OR REPLACE TRIGGER documents_stats_update AFTER UPDATE ON documents
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION documents_stats_apply();
+CREATE OR REPLACE TRIGGER documents_stats_delete AFTER DELETE ON documents
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION documents_stats_apply();
+
+CREATE OR REPLACE TRIGGER uploaded_files_stats_insert AFTER INSERT ON uploaded_files
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION uploaded_files_stats_apply();
+CREATE OR REPLACE TRIGGER uploaded_files_stats_delete AFTER DELETE ON uploaded_files
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION uploaded_files_stats_apply();
+
+CREATE OR REPLACE TRIGGER workflows_stats_insert AFTER INSERT ON workflows
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION workflows_stats_apply();
+CREATE OR REPLACE TRIGGER workflows_stats_delete AFTER DELETE ON workflows
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION workflows_stats_apply();
+
+-- Backfill / recompute (the lock keeps concurrent writes from slipping
+-- between the counts and the upsert)
+BEGIN;
+LOCK TABLE documents, uploaded_files, workflows IN SHARE MODE;
+
+INSERT INTO rag_stats (rag_id, document_count, file_count, indexed_documents, total_chunks)
+SELECT r.id,
+       coalesce(d.document_count, 0), coalesce(f.file_count, 0),
+       coalesce(d.indexed_documents, 0), coalesce(d.total_chunks, 0)
+FROM rags r
+LEFT JOIN (
+    SELECT rag_id, count(*) AS document_count,
+           count(*) FILTER (WHERE is_indexed) AS indexed_documents,
+           coalesce(sum(chunks_count), 0) AS total_chunks
+    FROM documents WHERE rag_id IS NOT NULL GROUP BY rag_id
+) d ON d.rag_id = r.id
+LEFT JOIN (
+    SELECT rag_id, count(*) AS file_count FROM uploaded_files GROUP BY rag_id
+) f ON f.rag_id = r.id
+ON CONFLICT (rag_id) DO UPDATE SET
+    document_count = EXCLUDED.document_count,
+    file_count = EXCLUDED.file_count,
+    indexed_documents = EXCLUDED.indexed_documents,
+    total_chunks = EXCLUDED.total_chunks;
+
+INSERT INTO project_stats (
+    project_id, total_documents, draft_count, validated_count, published_count,
+    indexed_count, total_chunks, workflow_count
+)
+SELECT p.id,
+       coalesce(d.total_documents, 0), coalesce(d.draft_count, 0), coalesce(d.validated_count, 0),
+       coalesce(d.published_count, 0), coalesce(d.indexed_count, 0), coalesce(d.total_chunks, 0),
+       coalesce(w.workflow_count, 0)
+FROM projects p
+LEFT JOIN (
+    SELECT project_id, count(*) AS total_documents,
+           count(*) FILTER (WHERE status = 'draft') AS draft_count,
+           count(*) FILTER (WHERE status = 'validated') AS validated_count,
+           count(*) FILTER (WHERE status = 'published') AS published_count,
+           count(*) FILTER (WHERE is_indexed) AS indexed_count,
+           coalesce(sum(chunks_count), 0) AS total_chunks
+    FROM documents WHERE project_id IS NOT NULL GROUP BY project_id
+) d ON d.project_id = p.id
+LEFT JOIN (
+    SELECT project_id, count(*) AS workflow_count FROM workflows GROUP BY project_id
+) w ON w.project_id = p.id
+ON CONFLICT (project_id) DO UPDATE SET
+    total_documents = EXCLUDED.total_documents,
+    draft_count = EXCLUDED.draft_count,
+    validated_count = EXCLUDED.validated_count,
+    published_count = EXCLUDED.published_count,
+    indexed_count = EXCLUDED.indexed_count,
+    total_chunks = EXCLUDED.total_chunks,
+    workflow_count = EXCLUDED.workflow_count;
+
+COMMIT;
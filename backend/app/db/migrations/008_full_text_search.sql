@@ -0,0 +1,20 @@
+-- Full-text search: generated tsvector columns (french configuration) with GIN indexes.
+-- Weights: A = title / name, B = body / description, C = url / domain.
+-- Only the first 200000 characters of a document body are indexed (a tsvector
+-- is capped at 1MB; queries/search.py highlights the same prefix).
+-- Adding a stored generated column rewrites the table: run outside peak hours.
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', title), 'A') ||
+        setweight(to_tsvector('french', left(content, 200000)), 'B')
+    ) STORED;
+
+ALTER TABLE workflows ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', name), 'A') ||
+        setweight(to_tsvector('french', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('french', coalesce(url, '') || ' ' || coalesce(domain, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_documents_search ON documents USING gin(search_vector);
+CREATE INDEX IF NOT EXISTS idx_workflows_search ON workflows USING gin(search_vector);
@@ -0,0 +1,6 @@
+-- Step queries (POST /workflows/steps/search): JSON containment (@>) and
+-- jsonpath (@?) filters on action_data / state_data are served by
+-- jsonb_path_ops GIN indexes (smaller and faster than jsonb_ops for @>).
+CREATE INDEX IF NOT EXISTS idx_actions_data ON workflow_actions USING gin(action_data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_states_data ON workflow_states USING gin(state_data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_actions_type ON workflow_actions(action_type);
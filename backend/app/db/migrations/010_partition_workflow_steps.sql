@@ -0,0 +1,102 @@
+-- workflow_states / workflow_actions partitioned by month of capture.
+-- captured_at is the created_at of the step's workflow: every step of a
+-- workflow lives in one partition, which get_workflow_by_id reads alone
+-- (WHERE workflow_id = ... AND captured_at = ...). Retention detaches and
+-- drops whole months (app/services/step_partitions.py) instead of deleting rows.
+-- Rows of a month without partition land in the DEFAULT partition until
+-- create_workflow_step_partitions() creates that month.
+--
+-- The conversion copies every step row in one transaction: on large
+-- databases, run it during a maintenance window.
+
+-- Month partitions [from_month, to_month] of both tables (existing ones are
+-- skipped). Rows of a new month already in the default partition move to it.
+CREATE OR REPLACE FUNCTION create_workflow_step_partitions(from_month DATE, to_month DATE) RETURNS INTEGER AS $$
+DECLARE
+    parent TEXT;
+    month DATE;
+    partition TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['workflow_states', 'workflow_actions'] LOOP
+        month := date_trunc('month', from_month)::date;
+        WHILE month <= to_month LOOP
+            partition := format('%s_p%s', parent, to_char(month, 'YYYY_MM'));
+            IF to_regclass(partition) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition, parent);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE captured_at >= %L AND captured_at < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    parent || '_default', month, (month + interval '1 month')::date, partition
+                );
+                EXECUTE format(
+                    'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    parent, partition, month, (month + interval '1 month')::date
+                );
+                created := created + 1;
+            END IF;
+            month := (month + interval '1 month')::date;
+        END LOOP;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = 'workflow_states'::regclass) = 'p' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE workflow_states RENAME TO workflow_states_unpartitioned;
+    ALTER TABLE workflow_actions RENAME TO workflow_actions_unpartitioned;
+
+    CREATE TABLE workflow_states (
+        id INTEGER NOT NULL DEFAULT nextval('workflow_states_id_seq'),
+        workflow_id INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+        state_type VARCHAR(20) NOT NULL,
+        state_data JSONB NOT NULL,
+        sequence_order INTEGER NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        captured_at TIMESTAMP NOT NULL
+    ) PARTITION BY RANGE (captured_at);
+    CREATE TABLE workflow_states_default PARTITION OF workflow_states DEFAULT;
+
+    CREATE TABLE workflow_actions (
+        id INTEGER NOT NULL DEFAULT nextval('workflow_actions_id_seq'),
+        workflow_id INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+        action_type VARCHAR(50) NOT NULL,
+        action_data JSONB NOT NULL,
+        sequence_order INTEGER NOT NULL,
+        timestamp TIMESTAMP NOT NULL,
+        captured_at TIMESTAMP NOT NULL
+    ) PARTITION BY RANGE (captured_at);
+    CREATE TABLE workflow_actions_default PARTITION OF workflow_actions DEFAULT;
+
+    PERFORM create_workflow_step_partitions(
+        (SELECT coalesce(min(created_at), now()) FROM workflows)::date,
+        (now() + interval '3 months')::date
+    );
+
+    INSERT INTO workflow_states (id, workflow_id, state_type, state_data, sequence_order, timestamp, captured_at)
+    SELECT s.id, s.workflow_id, s.state_type, s.state_data, s.sequence_order, s.timestamp, w.created_at
+    FROM workflow_states_unpartitioned s JOIN workflows w ON w.id = s.workflow_id;
+
+    INSERT INTO workflow_actions (id, workflow_id, action_type, action_data, sequence_order, timestamp, captured_at)
+    SELECT a.id, a.workflow_id, a.action_type, a.action_data, a.sequence_order, a.timestamp, w.created_at
+    FROM workflow_actions_unpartitioned a JOIN workflows w ON w.id = a.workflow_id;
+
+    ALTER SEQUENCE workflow_states_id_seq OWNED BY workflow_states.id;
+    ALTER SEQUENCE workflow_actions_id_seq OWNED BY workflow_actions.id;
+    DROP TABLE workflow_states_unpartitioned;
+    DROP TABLE workflow_actions_unpartitioned;
+
+    -- Indexes once the data is in (names are free again); created on every partition
+    ALTER TABLE workflow_states ADD PRIMARY KEY (id, captured_at);
+    ALTER TABLE workflow_actions ADD PRIMARY KEY (id, captured_at);
+    CREATE INDEX idx_states_workflow ON workflow_states(workflow_id);
+    CREATE INDEX idx_states_data ON workflow_states USING gin(state_data jsonb_path_ops);
+    CREATE INDEX idx_actions_workflow ON workflow_actions(workflow_id);
+    CREATE INDEX idx_actions_data ON workflow_actions USING gin(action_data jsonb_path_ops);
+    CREATE INDEX idx_actions_type ON workflow_actions(action_type);
+END $$;
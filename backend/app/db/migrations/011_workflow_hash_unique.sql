@@ -0,0 +1,28 @@
+-- One workflow per (project_id, workflow_hash): create_workflow inserts with
+-- ON CONFLICT DO NOTHING instead of checking the hash first. Duplicates left
+-- by concurrent captures are merged into the oldest workflow (documents are
+-- re-pointed to it) before the constraint is added.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'workflows_project_hash_key') THEN
+        RETURN;
+    END IF;
+
+    CREATE TEMP TABLE workflow_duplicates ON COMMIT DROP AS
+    SELECT id, keep_id
+    FROM (
+        SELECT id, min(id) OVER (PARTITION BY project_id, workflow_hash) AS keep_id
+        FROM workflows
+    ) w
+    WHERE id <> keep_id;
+
+    UPDATE documents d SET workflow_id = dup.keep_id
+    FROM workflow_duplicates dup
+    WHERE d.workflow_id = dup.id;
+
+    DELETE FROM workflows w USING workflow_duplicates dup WHERE w.id = dup.id;
+
+    ALTER TABLE workflows ADD CONSTRAINT workflows_project_hash_key UNIQUE (project_id, workflow_hash);
+    -- Served by the constraint's index
+    DROP INDEX IF EXISTS idx_workflows_hash;
+END $$;
@@ -0,0 +1,90 @@
+"""
+Pagination par curseur (keyset)
+
+Les listes sont triées par (colonne de tri DESC, id DESC). Le curseur encode
+la position de la dernière ligne d'une page; la page suivante reprend par
+`WHERE (colonne, id) < (%s, %s)`, servi par un index composite: la page N
+coûte autant que la page 1, et les insertions concurrentes ne décalent plus
+les pages (pas de doublons ni de trous comme avec OFFSET).
+"""
+from typing import Optional, Tuple, List, Dict, Any
+from datetime import datetime
+import base64
+import json
+
+# Position dans une liste: (valeur de la colonne de tri, id)
+Keyset = Tuple[datetime, int]
+
+# En-tête de réponse portant le curseur de la page suivante (absent en fin de liste)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible (tronqué, modifié ou venant d'une autre version)"""
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Curseur opaque (base64 url-safe) pour la position (sort_value, row_id)"""
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Keyset]:
+    """Décode un curseur reçu du client (None si absent)"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid pagination cursor: {cursor!r}") from e
+
+
+def next_cursor(rows: List[Dict[str, Any]], limit: int, sort_column: str) -> Optional[str]:
+    """Curseur de la page suivante, None si la page n'est pas pleine (fin de liste)"""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last[sort_column], last["id"])
+
+
+def set_next_cursor(response, rows: List[Dict[str, Any]], limit: int, sort_column: str) -> None:
+    """Ajoute l'en-tête X-Next-Cursor à la réponse quand une page suivante peut exister"""
+    cursor = next_cursor(rows, limit, sort_column)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+def keyset_condition(sort_column: str) -> str:
+    """Condition SQL 'après le curseur' (paramètres: valeur de tri, id)"""
+    return f"({sort_column}, id) < (%s, %s)"
+
+
+def keyset_order(sort_column: str) -> str:
+    """Tri stable correspondant aux index composites (colonne DESC, id DESC)"""
+    return f"ORDER BY {sort_column} DESC, id DESC"
+
+
+def page_query(
+    select: str,
+    conditions: List[str],
+    params: List[Any],
+    sort_column: str,
+    limit: int,
+    offset: int = 0,
+    after: Optional[Keyset] = None
+) -> Tuple[str, List[Any]]:
+    """
+    Complète `select` (SELECT ... FROM ...) avec filtres, tri stable et limite.
+    Avec `after`, la page démarre après le curseur et `offset` est ignoré.
+    """
+    conditions = list(conditions)
+    params = list(params)
+    if after is not None:
+        conditions.append(keyset_condition(sort_column))
+        params.extend(after)
+        offset = 0
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"{select}{where} {keyset_order(sort_column)} LIMIT %s OFFSET %s"
+    return sql, params + [limit, offset]
@@ -0,0 +1,172 @@
+"""
+Chat session and chat message SQL queries using pure SQL with psycopg2
+"""
+from typing import Dict, Any, List, Optional
+from psycopg2.extras import execute_values
+from app.db.connection import get_cursor
+
+
+# ==================== SESSIONS ====================
+
+def create_session(rag_id: Optional[int] = None, title: Optional[str] = None) -> Dict[str, Any]:
+    """Create a new chat session"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO chat_sessions (rag_id, title)
+            VALUES (%s, %s)
+            RETURNING id, rag_id, title, summary, summarized_until_id, created_at, updated_at
+            """,
+            (rag_id, title)
+        )
+        return dict(cursor.fetchone())
+
+
+def get_session_by_id(session_id: int) -> Optional[Dict[str, Any]]:
+    """Get a chat session by ID"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id, rag_id, title, summary, summarized_until_id, created_at, updated_at
+            FROM chat_sessions
+            WHERE id = %s
+            """,
+            (session_id,)
+        )
+        result = cursor.fetchone()
+        return dict(result) if result else None
+
+
+def get_session_context(session_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get a session with the messages not yet folded into its summary,
+    in a single round trip
+    """
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT s.id, s.rag_id, s.title, s.summary, s.summarized_until_id,
+                   s.created_at, s.updated_at,
+                   COALESCE(
+                       json_agg(
+                           json_build_object(
+                               'id', m.id, 'role', m.role, 'content', m.content,
+                               'token_count', m.token_count
+                           ) ORDER BY m.id
+                       ) FILTER (WHERE m.id IS NOT NULL),
+                       '[]'
+                   ) AS messages
+            FROM chat_sessions s
+            LEFT JOIN chat_messages m
+                   ON m.session_id = s.id AND m.id > s.summarized_until_id
+            WHERE s.id = %s
+            GROUP BY s.id
+            """,
+            (session_id,)
+        )
+        result = cursor.fetchone()
+        return dict(result) if result else None
+
+
+def update_session_summary(session_id: int, summary: str, summarized_until_id: int) -> bool:
+    """Replace the running summary and move the summarized watermark forward"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE chat_sessions
+            SET summary = %s, summarized_until_id = %s, updated_at = NOW()
+            WHERE id = %s AND summarized_until_id < %s
+            RETURNING id
+            """,
+            (summary, summarized_until_id, session_id, summarized_until_id)
+        )
+        return cursor.fetchone() is not None
+
+
+def delete_session(session_id: int) -> bool:
+    """Delete a chat session (cascade deletes messages)"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM chat_sessions WHERE id = %s RETURNING id",
+            (session_id,)
+        )
+        return cursor.fetchone() is not None
+
+
+# ==================== MESSAGES ====================
+
+def add_messages(messages: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert a batch of messages (possibly for several sessions) in one statement
+
+    Ids are drawn first and set on the dicts ('id') before the insert
+    commits, in batch order: whoever sees the rows can match them to the
+    in-memory turns. They are removed again if the insert fails.
+
+    Args:
+        messages: dicts with session_id, role, content, token_count
+
+    Returns:
+        Touched session ids
+    """
+    if not messages:
+        return []
+
+    try:
+        with get_cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT nextval(pg_get_serial_sequence('chat_messages', 'id')) AS id
+                FROM generate_series(1, %s)
+                ORDER BY 1
+                """,
+                (len(messages),)
+            )
+            for message, row in zip(messages, cursor.fetchall()):
+                message['id'] = row['id']
+
+            execute_values(
+                cursor,
+                """
+                INSERT INTO chat_messages (id, session_id, role, content, token_count)
+                SELECT v.id, v.session_id, v.role, v.content, v.token_count
+                FROM (VALUES %s) AS v(id, session_id, role, content, token_count)
+                JOIN chat_sessions s ON s.id = v.session_id
+                """,
+                [
+                    (m['id'], m['session_id'], m['role'], m['content'], m['token_count'])
+                    for m in messages
+                ],
+                template="(%s::int, %s::int, %s, %s, %s::int)",
+                page_size=500
+            )
+            session_ids = sorted({m['session_id'] for m in messages})
+            cursor.execute(
+                "UPDATE chat_sessions SET updated_at = NOW() WHERE id = ANY(%s)",
+                (session_ids,)
+            )
+            return session_ids
+    except Exception:
+        for message in messages:
+            message.pop('id', None)
+        raise
+
+
+def get_session_messages(session_id: int, limit: int = 200) -> List[Dict[str, Any]]:
+    """Get the most recent messages of a session, oldest first"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id, session_id, role, content, token_count, created_at
+            FROM (
+                SELECT id, session_id, role, content, token_count, created_at
+                FROM chat_messages
+                WHERE session_id = %s
+                ORDER BY id DESC
+                LIMIT %s
+            ) recent
+            ORDER BY id
+            """,
+            (session_id, limit)
+        )
+        return [dict(row) for row in cursor.fetchall()]
@@ -2,9 +2,102 @@
 Document and Document Version SQL queries using pure SQL with psycopg2
 """
 from typing import Dict, Any, List, Optional
+from app.config import settings
 from app.db.connection import get_cursor
+from app.db.pagination import Keyset, page_query
+from app.db.queries.rags import bump_index_version
+from app.db.versioning import (
+    SNAPSHOT, CHAIN_HEAD_SQL, CHAIN_SQL, INSERT_VERSION_SQL, build_version, reconstruct, replay, get_version_cache
+)
+from datetime import datetime, timedelta
 import json
 
+DOCUMENT_COLUMNS = """id, project_id, rag_id, workflow_id, title, content,
+                   content_type, status, is_indexed, metadata, version,
+                   created_at, updated_at, validated_at, last_indexed_at, chunks_count"""
+
+# List views: everything but the body, plus its size (octet_length reads the
+# stored length without decompressing TOASTed content)
+DOCUMENT_SUMMARY_COLUMNS = """id, project_id, rag_id, workflow_id, title,
+                   octet_length(content) AS content_length,
+                   content_type, status, is_indexed, metadata, version,
+                   created_at, updated_at, validated_at, last_indexed_at, chunks_count"""
+
+# Versions are stored as snapshots or deltas (app.db.versioning): full reads
+# need the storage columns to rebuild the content
+VERSION_COLUMNS = "id, document_id, version_number, storage, content, delta, change_summary, created_at"
+
+VERSION_SUMMARY_COLUMNS = (
+    "id, document_id, content_length, storage, version_number, change_summary, created_at"
+)
+
+VERSION_STORAGE_REPORT_SQL = """
+    SELECT count(*) AS versions,
+           count(*) FILTER (WHERE storage = 'snapshot') AS snapshots,
+           count(*) FILTER (WHERE storage = 'delta') AS deltas,
+           COALESCE(sum(content_length), 0) AS logical_bytes,
+           COALESCE(sum(COALESCE(pg_column_size(content), 0) + COALESCE(pg_column_size(delta), 0)), 0)
+               AS stored_bytes
+    FROM document_versions
+"""
+
+# Documents worth compacting: more snapshots than the interval requires
+# (e.g. versions written before delta storage) or versions past retention
+COMPACTION_CANDIDATES_SQL = """
+    SELECT document_id
+    FROM document_versions
+    GROUP BY document_id
+    HAVING count(*) FILTER (WHERE storage = 'snapshot') > (count(*) - 1) / %(interval)s + 1
+        OR (%(keep_last)s > 0 AND count(*) > %(keep_last)s)
+        OR (%(max_age_days)s > 0 AND count(*) > 1
+            AND min(created_at) < NOW() - make_interval(days => %(max_age_days)s))
+    ORDER BY document_id
+"""
+
+# Statistiques documents d'un projet: une ligne de project_stats, tenue à jour
+# par des triggers (voir migrations/007_stats_tables.sql)
+PROJECT_DOCUMENT_STATS_SQL = """
+    SELECT total_documents, draft_count, validated_count, published_count, indexed_count, total_chunks
+    FROM project_stats
+    WHERE project_id = %s
+"""
+
+EMPTY_PROJECT_DOCUMENT_STATS = {
+    'total_documents': 0,
+    'draft_count': 0,
+    'validated_count': 0,
+    'published_count': 0,
+    'indexed_count': 0,
+    'total_chunks': 0
+}
+
+
+def version_with_content(row: Dict[str, Any], content: Optional[str]) -> Dict[str, Any]:
+    """Public shape of a version (storage columns replaced by the rebuilt content)"""
+    return {
+        'id': row['id'],
+        'document_id': row['document_id'],
+        'content': content,
+        'version_number': row['version_number'],
+        'change_summary': row['change_summary'],
+        'created_at': row['created_at']
+    }
+
+
+def storage_report(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Add savings to a VERSION_STORAGE_REPORT_SQL row"""
+    report = dict(row)
+    report['saved_bytes'] = report['logical_bytes'] - report['stored_bytes']
+    report['compression_ratio'] = (
+        round(report['logical_bytes'] / report['stored_bytes'], 2) if report['stored_bytes'] else None
+    )
+    return report
+
+
+def document_columns(summary: bool = False) -> str:
+    """Select list for documents (summary: without content)"""
+    return DOCUMENT_SUMMARY_COLUMNS if summary else DOCUMENT_COLUMNS
+
 
 # ==================== DOCUMENT CRUD ====================
 
@@ -39,17 +132,10 @@ def create_document(
         document = dict(cursor.fetchone())
 
         # Create initial version in same transaction
-        cursor.execute(
-            """
-            INSERT INTO document_versions (
-                document_id, content, version_number, change_summary
-            )
-            VALUES (%s, %s, %s, %s)
-            """,
-            (document['id'], content, 1, "Initial version")
-        )
+        insert_version(cursor, document['id'], 1, content, "Initial version")
 
-        return document
+    get_version_cache().put(document['id'], 1, content)
+    return document
 
 
 def get_document_by_id(document_id: int) -> Optional[Dict[str, Any]]:
@@ -73,71 +159,42 @@ def get_documents_by_project(
     project_id: int,
     status: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    summary: bool = False,
+    after: Optional[Keyset] = None
 ) -> List[Dict[str, Any]]:
-    """Get all documents for a project with optional status filter"""
+    """Get all documents for a project with optional status filter (summary: no content, after: keyset cursor)"""
+    conditions, params = ["project_id = %s"], [project_id]
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    query, params = page_query(
+        f"SELECT {document_columns(summary)} FROM documents",
+        conditions, params, "updated_at", limit, offset, after
+    )
     with get_cursor() as cursor:
-        if status:
-            cursor.execute(
-                """
-                SELECT id, project_id, rag_id, workflow_id, title, content,
-                       content_type, status, is_indexed, metadata, version,
-                       created_at, updated_at, validated_at, last_indexed_at, chunks_count
-                FROM documents
-                WHERE project_id = %s AND status = %s
-                ORDER BY updated_at DESC
-                LIMIT %s OFFSET %s
-                """,
-                (project_id, status, limit, offset)
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT id, project_id, rag_id, workflow_id, title, content,
-                       content_type, status, is_indexed, metadata, version,
-                       created_at, updated_at, validated_at, last_indexed_at, chunks_count
-                FROM documents
-                WHERE project_id = %s
-                ORDER BY updated_at DESC
-                LIMIT %s OFFSET %s
-                """,
-                (project_id, limit, offset)
-            )
+        cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
 
 def get_documents(
     status: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    summary: bool = False,
+    after: Optional[Keyset] = None
 ) -> List[Dict[str, Any]]:
-    """Get all documents with optional filters"""
+    """Get all documents with optional filters (summary: no content, after: keyset cursor)"""
+    conditions, params = [], []
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    query, params = page_query(
+        f"SELECT {document_columns(summary)} FROM documents",
+        conditions, params, "updated_at", limit, offset, after
+    )
     with get_cursor() as cursor:
-        if status:
-            cursor.execute(
-                """
-                SELECT id, project_id, rag_id, workflow_id, title, content,
-                       content_type, status, is_indexed, metadata, version,
-                       created_at, updated_at, validated_at, last_indexed_at, chunks_count
-                FROM documents
-                WHERE status = %s
-                ORDER BY updated_at DESC
-                LIMIT %s OFFSET %s
-                """,
-                (status, limit, offset)
-            )
-        else:
-            cursor.execute(
-                """
-                SELECT id, project_id, rag_id, workflow_id, title, content,
-                       content_type, status, is_indexed, metadata, version,
-                       created_at, updated_at, validated_at, last_indexed_at, chunks_count
-                FROM documents
-                ORDER BY updated_at DESC
-                LIMIT %s OFFSET %s
-                """,
-                (limit, offset)
-            )
+        cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
 
@@ -153,12 +210,11 @@ def update_document(
     is_indexed: Optional[bool] = None,
     chunks_count: Optional[int] = None
 ) -> Optional[Dict[str, Any]]:
-    """Update a document and optionally create a new version"""
-
-    # Get current document
-    current_doc = get_document_by_id(document_id)
-    if not current_doc:
-        return None
+    """
+    Update a document and optionally create a new version (None if the
+    document does not exist). One UPDATE ... RETURNING: no prior read, and
+    the version number is incremented by the statement itself.
+    """
 
     # Build update query dynamically
     update_fields = []
@@ -201,14 +257,9 @@ def update_document(
     # Always update updated_at
     update_fields.append("updated_at = NOW()")
 
-    if not update_fields:
-        return current_doc
-
     # If content changed, increment version and create version record
     if content is not None and create_version:
-        new_version = current_doc['version'] + 1
-        update_fields.append("version = %s")
-        params.append(new_version)
+        update_fields.append("version = version + 1")
 
     params.append(document_id)
 
@@ -222,25 +273,27 @@ def update_document(
                       created_at, updated_at, validated_at, last_indexed_at, chunks_count
         """
         cursor.execute(query, params)
-        updated_doc = dict(cursor.fetchone())
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        updated_doc = dict(row)
+
+        # Re-indexing changes what the RAG answers: invalidate its answer cache
+        if is_indexed is not None:
+            bump_index_version(cursor, updated_doc['rag_id'])
 
         # Create version if content changed (in same transaction)
         if content is not None and create_version:
-            cursor.execute(
-                """
-                INSERT INTO document_versions (
-                    document_id, content, version_number, change_summary
-                )
-                VALUES (%s, %s, %s, %s)
-                """,
-                (
-                    document_id,
-                    content,
-                    updated_doc['version'],
-                    change_summary or f"Updated to version {updated_doc['version']}"
-                )
+            insert_version(
+                cursor,
+                document_id,
+                updated_doc['version'],
+                content,
+                change_summary or f"Updated to version {updated_doc['version']}"
             )
 
+    if content is not None and create_version:
+        get_version_cache().put(document_id, updated_doc['version'], content)
     return updated_doc
 
 
@@ -248,11 +301,15 @@ def delete_document(document_id: int) -> bool:
     """Delete a document (cascade deletes versions and chunks)"""
     with get_cursor() as cursor:
         cursor.execute(
-            "DELETE FROM documents WHERE id = %s RETURNING id",
+            "DELETE FROM documents WHERE id = %s RETURNING id, rag_id, is_indexed",
             (document_id,)
         )
         result = cursor.fetchone()
-        return result is not None
+        if result and result['is_indexed']:
+            bump_index_version(cursor, result['rag_id'])
+    if result:
+        get_version_cache().discard(document_id)
+    return result is not None
 
 
 def validate_document(document_id: int) -> Optional[Dict[str, Any]]:
@@ -274,27 +331,60 @@ def publish_document(document_id: int) -> Optional[Dict[str, Any]]:
 
 
 def get_document_stats_by_project(project_id: int) -> Dict[str, Any]:
-    """Get document statistics for a project"""
+    """Get document statistics for a project (project_stats row, maintained by triggers)"""
     with get_cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT
-                COUNT(*) as total_documents,
-                COUNT(*) FILTER (WHERE status = 'draft') as draft_count,
-                COUNT(*) FILTER (WHERE status = 'validated') as validated_count,
-                COUNT(*) FILTER (WHERE status = 'published') as published_count,
-                COUNT(*) FILTER (WHERE is_indexed = true) as indexed_count,
-                SUM(chunks_count) as total_chunks
-            FROM documents
-            WHERE project_id = %s
-            """,
-            (project_id,)
-        )
-        return dict(cursor.fetchone())
+        cursor.execute(PROJECT_DOCUMENT_STATS_SQL, (project_id,))
+        result = cursor.fetchone()
+        return dict(result) if result else dict(EMPTY_PROJECT_DOCUMENT_STATS)
 
 
 # ==================== DOCUMENT VERSIONS ====================
 
+def insert_version(
+    cursor,
+    document_id: int,
+    version_number: int,
+    content: str,
+    change_summary: Optional[str]
+) -> None:
+    """
+    Store a version, as a delta against the previous one unless a snapshot is due
+
+    The caller puts the content in the version cache once its transaction
+    commits (a rolled back version must not be served from the cache).
+    """
+    previous, chain_length = None, 0
+    if version_number > 1:
+        cursor.execute(CHAIN_HEAD_SQL, (document_id, version_number))
+        head = cursor.fetchone()
+        if head['previous'] is not None and head['last_snapshot'] is not None:
+            previous = get_version_content(cursor, document_id, head['previous'])
+            chain_length = head['previous'] - head['last_snapshot'] + 1
+
+    row = build_version(content, previous, chain_length)
+    cursor.execute(
+        INSERT_VERSION_SQL,
+        (
+            document_id, version_number, change_summary,
+            row['storage'], row['content'], row['delta'], row['content_length']
+        )
+    )
+
+
+def get_version_content(cursor, document_id: int, version_number: int) -> Optional[str]:
+    """Content of a version: from the cache, else rebuilt from its snapshot and deltas"""
+    cache = get_version_cache()
+    content = cache.get(document_id, version_number)
+    if content is None:
+        cursor.execute(CHAIN_SQL, {'document_id': document_id, 'version_number': version_number})
+        rows = cursor.fetchall()
+        if not rows or rows[-1]['version_number'] != version_number:
+            return None
+        content = reconstruct(rows)
+        cache.put(document_id, version_number, content)
+    return content
+
+
 def create_document_version(
     document_id: int,
     content: str,
@@ -303,32 +393,49 @@ def create_document_version(
 ) -> Dict[str, Any]:
     """Create a new document version"""
     with get_cursor() as cursor:
+        insert_version(cursor, document_id, version_number, content, change_summary)
         cursor.execute(
             """
-            INSERT INTO document_versions (
-                document_id, content, version_number, change_summary
-            )
-            VALUES (%s, %s, %s, %s)
-            RETURNING id, document_id, content, version_number, change_summary, created_at
+            SELECT id, document_id, version_number, change_summary, created_at
+            FROM document_versions
+            WHERE document_id = %s AND version_number = %s
             """,
-            (document_id, content, version_number, change_summary)
+            (document_id, version_number)
         )
-        return dict(cursor.fetchone())
+        version = cursor.fetchone()
+
+    get_version_cache().put(document_id, version_number, content)
+    return version_with_content(version, content)
 
 
-def get_document_versions(document_id: int) -> List[Dict[str, Any]]:
-    """Get all versions of a document"""
+def get_document_versions(document_id: int, summary: bool = False) -> List[Dict[str, Any]]:
+    """Get all versions of a document, newest first (summary: no content, nothing rebuilt)"""
     with get_cursor() as cursor:
+        if summary:
+            cursor.execute(
+                f"""
+                SELECT {VERSION_SUMMARY_COLUMNS}
+                FROM document_versions
+                WHERE document_id = %s
+                ORDER BY version_number DESC
+                """,
+                (document_id,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+        # One pass over the whole chain, oldest first
         cursor.execute(
-            """
-            SELECT id, document_id, content, version_number, change_summary, created_at
+            f"""
+            SELECT {VERSION_COLUMNS}
             FROM document_versions
             WHERE document_id = %s
-            ORDER BY version_number DESC
+            ORDER BY version_number
             """,
             (document_id,)
         )
-        return [dict(row) for row in cursor.fetchall()]
+        versions = [version_with_content(row, content) for row, content in replay(cursor.fetchall())]
+        versions.reverse()
+        return versions
 
 
 def get_version_by_number(document_id: int, version_number: int) -> Optional[Dict[str, Any]]:
@@ -336,26 +443,123 @@ def get_version_by_number(document_id: int, version_number: int) -> Optional[Dic
     with get_cursor() as cursor:
         cursor.execute(
             """
-            SELECT id, document_id, content, version_number, change_summary, created_at
+            SELECT id, document_id, version_number, change_summary, created_at
             FROM document_versions
             WHERE document_id = %s AND version_number = %s
             """,
             (document_id, version_number)
         )
         result = cursor.fetchone()
-        return dict(result) if result else None
+        if not result:
+            return None
+        return version_with_content(result, get_version_content(cursor, document_id, version_number))
 
 
-def get_document_with_versions(document_id: int) -> Optional[Dict[str, Any]]:
-    """Get a document with all its versions"""
+def get_document_with_versions(document_id: int, summary: bool = False) -> Optional[Dict[str, Any]]:
+    """Get a document with all its versions (summary: versions without content)"""
     document = get_document_by_id(document_id)
     if not document:
         return None
 
-    document['versions'] = get_document_versions(document_id)
+    document['versions'] = get_document_versions(document_id, summary=summary)
     return document
 
 
+def get_version_storage_report(document_id: Optional[int] = None) -> Dict[str, Any]:
+    """Version storage: logical size (sum of version sizes) vs bytes actually stored"""
+    with get_cursor() as cursor:
+        if document_id is None:
+            cursor.execute(VERSION_STORAGE_REPORT_SQL)
+        else:
+            cursor.execute(VERSION_STORAGE_REPORT_SQL + " WHERE document_id = %s", (document_id,))
+        return storage_report(cursor.fetchone())
+
+
+def get_compaction_candidates(keep_last: int = 0, max_age_days: int = 0) -> List[int]:
+    """Ids of documents whose versions can be re-encoded or pruned"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            COMPACTION_CANDIDATES_SQL,
+            {
+                'interval': settings.DOCUMENT_VERSION_SNAPSHOT_INTERVAL,
+                'keep_last': keep_last,
+                'max_age_days': max_age_days
+            }
+        )
+        return [row['document_id'] for row in cursor.fetchall()]
+
+
+def compact_document_versions(document_id: int, keep_last: int = 0, max_age_days: int = 0) -> Dict[str, Any]:
+    """
+    Prune versions past retention and re-encode the rest as snapshot + deltas
+
+    Args:
+        document_id: Document to compact
+        keep_last: Keep at most this many versions (0 = no limit)
+        max_age_days: Drop versions older than this (0 = no limit)
+
+    The latest version is always kept; the oldest kept version becomes a
+    snapshot so the remaining chain stays readable.
+
+    Returns:
+        {document_id, pruned, rewritten, bytes_before, bytes_after}
+    """
+    with get_cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT {VERSION_COLUMNS},
+                   COALESCE(pg_column_size(content), 0) + COALESCE(pg_column_size(delta), 0) AS stored_bytes
+            FROM document_versions
+            WHERE document_id = %s
+            ORDER BY version_number
+            FOR UPDATE
+            """,
+            (document_id,)
+        )
+        rows = cursor.fetchall()
+        result = {'document_id': document_id, 'pruned': 0, 'rewritten': 0, 'bytes_before': 0, 'bytes_after': 0}
+        if not rows:
+            return result
+        result['bytes_before'] = sum(row['stored_bytes'] for row in rows)
+
+        # Retention: versions are created in order, so the kept ones are a suffix
+        first_kept = len(rows) - 1
+        cutoff = datetime.now() - timedelta(days=max_age_days) if max_age_days > 0 else None
+        while first_kept > 0:
+            candidate = first_kept - 1
+            if keep_last > 0 and len(rows) - candidate > keep_last:
+                break
+            if cutoff is not None and rows[candidate]['created_at'] < cutoff:
+                break
+            first_kept = candidate
+
+        chain = list(replay(rows))
+        previous, chain_length = None, 0
+        for row, content in chain[first_kept:]:
+            encoded = build_version(content, previous, chain_length)
+            chain_length = 1 if encoded['storage'] == SNAPSHOT else chain_length + 1
+            previous = content
+            if encoded['storage'] != row['storage']:
+                cursor.execute(
+                    "UPDATE document_versions SET storage = %s, content = %s, delta = %s::jsonb WHERE id = %s",
+                    (encoded['storage'], encoded['content'], encoded['delta'], row['id'])
+                )
+                result['rewritten'] += 1
+
+        if first_kept > 0:
+            cursor.execute(
+                "DELETE FROM document_versions WHERE document_id = %s AND version_number < %s",
+                (document_id, rows[first_kept]['version_number'])
+            )
+            result['pruned'] = first_kept
+
+        cursor.execute(VERSION_STORAGE_REPORT_SQL + " WHERE document_id = %s", (document_id,))
+        result['bytes_after'] = cursor.fetchone()['stored_bytes']
+
+    get_version_cache().discard(document_id)
+    return result
+
+
 # ==================== RAG-SPECIFIC FUNCTIONS ====================
 
 def create_document_for_rag(
@@ -388,42 +592,29 @@ def create_document_for_rag(
         document = dict(cursor.fetchone())
 
         # Create initial version in same transaction
-        cursor.execute(
-            """
-            INSERT INTO document_versions (
-                document_id, content, version_number, change_summary
-            )
-            VALUES (%s, %s, %s, %s)
-            """,
-            (document['id'], content, 1, "Initial version")
-        )
+        insert_version(cursor, document['id'], 1, content, "Initial version")
 
-        return document
+    get_version_cache().put(document['id'], 1, content)
+    return document
 
 
 def get_documents_by_rag(
     rag_id: int,
     limit: int = 100,
     offset: int = 0,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    summary: bool = False,
+    after: Optional[Keyset] = None
 ) -> List[Dict[str, Any]]:
-    """Get all documents for a RAG with optional filters"""
+    """Get all documents for a RAG with optional filters (summary: no content, after: keyset cursor)"""
+    conditions, params = ["rag_id = %s"], [rag_id]
+    if status:
+        conditions.append("status = %s")
+        params.append(status)
+    query, params = page_query(
+        f"SELECT {document_columns(summary)} FROM documents",
+        conditions, params, "updated_at", limit, offset, after
+    )
     with get_cursor() as cursor:
-        base_query = """
-            SELECT id, project_id, rag_id, workflow_id, title, content,
-                   content_type, status, is_indexed, metadata, version,
-                   created_at, updated_at, validated_at, last_indexed_at, chunks_count
-            FROM documents
-            WHERE rag_id = %s
-        """
-        params = [rag_id]
-
-        if status:
-            base_query += " AND status = %s"
-            params.append(status)
-
-        base_query += " ORDER BY updated_at DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-
-        cursor.execute(base_query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        cursor.execute(query, params)
+        return [dict(row) for row in cursor.fetchall()]
\ No newline at end of file
@@ -1,5 +1,26 @@
 from typing import Optional, List, Dict, Any
 from app.db.connection import get_cursor
+from app.db.pagination import Keyset, page_query
+
+# Statistiques d'un projet: une ligne de project_stats, tenue à jour par des
+# triggers (voir migrations/007_stats_tables.sql)
+PROJECT_STATS_SQL = """
+    SELECT project_id, workflow_count, total_documents, draft_count, validated_count,
+           published_count, indexed_count, total_chunks
+    FROM project_stats
+    WHERE project_id = %s
+"""
+
+# Statistiques de plusieurs projets en une requête, dans l'ordre demandé
+# (found = false pour un id sans projet)
+PROJECT_STATS_BATCH_SQL = """
+    SELECT ids.project_id, s.project_id IS NOT NULL AS found,
+           s.workflow_count, s.total_documents, s.draft_count, s.validated_count,
+           s.published_count, s.indexed_count, s.total_chunks
+    FROM unnest(%s::int[]) WITH ORDINALITY AS ids(project_id, position)
+    LEFT JOIN project_stats s ON s.project_id = ids.project_id
+    ORDER BY ids.position
+"""
 
 
 def create_project(name: str, description: Optional[str] = None) -> Dict[str, Any]:
@@ -31,18 +52,14 @@ def get_project_by_id(project_id: int) -> Optional[Dict[str, Any]]:
         return dict(result) if result else None
 
 
-def get_all_projects(skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-    """Récupère tous les projets avec pagination"""
+def get_all_projects(skip: int = 0, limit: int = 100, after: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+    """Récupère tous les projets avec pagination (offset, ou curseur keyset `after`)"""
+    query, params = page_query(
+        "SELECT id, name, description, created_at, updated_at FROM projects",
+        [], [], "created_at", limit, skip, after
+    )
     with get_cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT id, name, description, created_at, updated_at
-            FROM projects
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
-            """,
-            (limit, skip)
-        )
+        cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
 
@@ -93,3 +110,18 @@ def count_projects() -> int:
     with get_cursor() as cursor:
         cursor.execute("SELECT COUNT(*) as count FROM projects")
         return cursor.fetchone()['count']
+
+
+def get_project_stats(project_id: int) -> Optional[Dict[str, Any]]:
+    """Statistiques d'un projet (une seule ligne); None si le projet n'existe pas"""
+    with get_cursor() as cursor:
+        cursor.execute(PROJECT_STATS_SQL, (project_id,))
+        result = cursor.fetchone()
+        return dict(result) if result else None
+
+
+def get_project_stats_batch(project_ids: List[int]) -> List[Dict[str, Any]]:
+    """Statistiques de plusieurs projets, dans l'ordre demandé (found=False pour un id inconnu)"""
+    with get_cursor() as cursor:
+        cursor.execute(PROJECT_STATS_BATCH_SQL, (list(project_ids),))
+        return [dict(row) for row in cursor.fetchall()]
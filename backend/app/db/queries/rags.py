@@ -1,20 +1,137 @@
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional
+from contextlib import contextmanager
 from app.db.connection import get_cursor
+from app.db.pagination import Keyset, page_query
+from app.db.streaming import IterReader, copy_row
+from app.db.versioning import SNAPSHOT, get_version_cache
 import json
 
 
+UPLOADED_FILE_COLUMNS = (
+    "id, rag_id, filename, file_type, file_size, blob_sha256, mime_type, uploaded_at, metadata"
+)
+
+# Statistiques d'une RAG: une ligne de rag_stats, tenue à jour par des triggers
+# (voir migrations/007_stats_tables.sql)
+RAG_STATS_SQL = """
+    SELECT document_count, file_count, indexed_documents, total_chunks
+    FROM rag_stats
+    WHERE rag_id = %s
+"""
+
+# Statistiques de plusieurs RAG en une requête, dans l'ordre demandé
+# (found = false pour un id sans RAG)
+RAG_STATS_BATCH_SQL = """
+    SELECT ids.rag_id, s.rag_id IS NOT NULL AS found,
+           s.document_count, s.file_count, s.indexed_documents, s.total_chunks
+    FROM unnest(%s::int[]) WITH ORDINALITY AS ids(rag_id, position)
+    LEFT JOIN rag_stats s ON s.rag_id = ids.rag_id
+    ORDER BY ids.position
+"""
+
+# Verrou des uploads d'une RAG, tenu jusqu'à la fin de la transaction:
+# recherche des digests et insertions d'un lot ne s'entrelacent pas avec
+# celles d'un upload concurrent (sinon deux envois du même fichier ne
+# trouvent ni l'un ni l'autre de doublon et créent chacun leurs lignes).
+# Pas de contrainte unique (rag_id, blob_sha256): un fichier dont le document
+# a été supprimé peut être renvoyé.
+UPLOAD_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('uploaded_files'), %s)"
+
+# Fichiers déjà envoyés avec ces contenus (et leur document): un par digest,
+# dans la RAG demandée en priorité, sinon dans une autre RAG
+FIND_UPLOADS_BY_DIGESTS_SQL = """
+    SELECT DISTINCT ON (f.blob_sha256)
+           f.blob_sha256, f.id AS file_id, f.rag_id, f.filename, d.id AS document_id
+    FROM uploaded_files f
+    JOIN documents d
+      ON d.metadata->>'uploaded_file_id' = f.id::text AND d.rag_id = f.rag_id
+    WHERE f.blob_sha256 = ANY(%s::bpchar[])
+    ORDER BY f.blob_sha256, (f.rag_id = %s) DESC, f.id
+"""
+
+# Lot d'uploads en une requête: fichiers, documents et versions initiales
+# (snapshots). Les ids sont tirés des séquences d'abord, pour relier chaque
+# document à son fichier sans dépendre de l'ordre de RETURNING.
+INSERT_UPLOADED_DOCUMENTS_SQL = """
+    WITH input AS MATERIALIZED (
+        SELECT i.*,
+               nextval(pg_get_serial_sequence('uploaded_files', 'id')) AS file_id,
+               nextval(pg_get_serial_sequence('documents', 'id')) AS document_id
+        FROM jsonb_to_recordset(%(files)s::jsonb) AS i(
+            position integer, filename text, file_type text, file_size integer,
+            blob_sha256 text, mime_type text, content text, content_type text
+        )
+    ),
+    files AS (
+        INSERT INTO uploaded_files (id, rag_id, filename, file_type, file_size, blob_sha256, mime_type, metadata)
+        SELECT file_id, %(rag_id)s, filename, file_type, file_size, blob_sha256, mime_type,
+               jsonb_build_object('original_filename', filename)
+        FROM input
+    ),
+    docs AS (
+        INSERT INTO documents (id, rag_id, title, content, content_type, status, metadata)
+        SELECT document_id, %(rag_id)s, filename, content, content_type, 'draft',
+               jsonb_build_object('uploaded_file_id', file_id, 'source', 'file_upload',
+                                  'original_filename', filename)
+        FROM input
+    ),
+    versions AS (
+        INSERT INTO document_versions (document_id, version_number, change_summary, storage, content, content_length)
+        SELECT document_id, 1, 'Initial version', %(storage)s, content, octet_length(content)
+        FROM input
+    )
+    SELECT position, file_id, document_id FROM input ORDER BY position
+"""
+
+# Upload de gros fichier: le fichier, puis le document et sa version initiale
+# envoyés par COPY, le contenu en dernière colonne (app.db.streaming)
+INSERT_STREAMED_UPLOAD_SQL = """
+    INSERT INTO uploaded_files (rag_id, filename, file_type, file_size, blob_sha256, mime_type, metadata)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    RETURNING id AS file_id, nextval(pg_get_serial_sequence('documents', 'id')) AS document_id
+"""
+
+COPY_DOCUMENT_SQL = (
+    "COPY documents (id, rag_id, title, content_type, status, metadata, content) FROM STDIN"
+)
+
+COPY_VERSION_SQL = (
+    "COPY document_versions (document_id, version_number, change_summary, storage, content_length, content) "
+    "FROM STDIN"
+)
+
+
+def streamed_upload_rows(rag_id: int, file: Dict[str, Any], ids: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Colonnes (hors contenu) des lignes COPY d'un upload en flux"""
+    metadata = {
+        'uploaded_file_id': ids['file_id'],
+        'source': 'file_upload',
+        'original_filename': file['filename']
+    }
+    return {
+        'document': [ids['document_id'], rag_id, file['filename'], file['content_type'], 'draft', metadata],
+        # Contenu valide en UTF-8: sa taille encodée est celle du fichier
+        'version': [ids['document_id'], 1, 'Initial version', SNAPSHOT, file['file_size']]
+    }
+
+
 # ==================== RAG CRUD ====================
 
-def create_rag(name: str, description: Optional[str] = None) -> Dict[str, Any]:
+def create_rag(
+    name: str,
+    description: Optional[str] = None,
+    semantic_cache_threshold: Optional[float] = None
+) -> Dict[str, Any]:
     """Create a new RAG collection"""
     with get_cursor() as cursor:
         cursor.execute(
             """
-            INSERT INTO rags (name, description)
-            VALUES (%s, %s)
-            RETURNING id, name, description, created_at, updated_at
+            INSERT INTO rags (name, description, semantic_cache_threshold)
+            VALUES (%s, %s, %s)
+            RETURNING id, name, description, index_version, semantic_cache_threshold,
+                   created_at, updated_at
             """,
-            (name, description)
+            (name, description, semantic_cache_threshold)
         )
         return dict(cursor.fetchone())
 
@@ -24,7 +141,8 @@ def get_rag_by_id(rag_id: int) -> Optional[Dict[str, Any]]:
     with get_cursor() as cursor:
         cursor.execute(
             """
-            SELECT id, name, description, created_at, updated_at
+            SELECT id, name, description, index_version, semantic_cache_threshold,
+                   created_at, updated_at
             FROM rags
             WHERE id = %s
             """,
@@ -34,25 +152,24 @@ def get_rag_by_id(rag_id: int) -> Optional[Dict[str, Any]]:
         return dict(result) if result else None
 
 
-def get_all_rags(skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-    """Get all RAGs with pagination"""
+def get_all_rags(skip: int = 0, limit: int = 100, after: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+    """Get all RAGs with pagination (offset, or keyset cursor `after`)"""
+    query, params = page_query(
+        """SELECT id, name, description, index_version, semantic_cache_threshold,
+                  created_at, updated_at
+           FROM rags""",
+        [], [], "created_at", limit, skip, after
+    )
     with get_cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT id, name, description, created_at, updated_at
-            FROM rags
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
-            """,
-            (limit, skip)
-        )
+        cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
 
 def update_rag(
     rag_id: int,
     name: Optional[str] = None,
-    description: Optional[str] = None
+    description: Optional[str] = None,
+    semantic_cache_threshold: Optional[float] = None
 ) -> Optional[Dict[str, Any]]:
     """Update a RAG"""
     updates = []
@@ -64,6 +181,9 @@ def update_rag(
     if description is not None:
         updates.append("description = %s")
         params.append(description)
+    if semantic_cache_threshold is not None:
+        updates.append("semantic_cache_threshold = %s")
+        params.append(semantic_cache_threshold)
 
     if not updates:
         return get_rag_by_id(rag_id)
@@ -77,7 +197,8 @@ def update_rag(
             UPDATE rags
             SET {', '.join(updates)}
             WHERE id = %s
-            RETURNING id, name, description, created_at, updated_at
+            RETURNING id, name, description, index_version, semantic_cache_threshold,
+                   created_at, updated_at
             """,
             params
         )
@@ -85,6 +206,19 @@ def update_rag(
         return dict(result) if result else None
 
 
+def bump_index_version(cursor, rag_id: Optional[int]) -> None:
+    """
+    Invalidate cached answers of a RAG whose vector index changed
+    (runs on the caller's cursor, in its transaction)
+    """
+    if rag_id is None:
+        return
+    cursor.execute(
+        "UPDATE rags SET index_version = index_version + 1 WHERE id = %s",
+        (rag_id,)
+    )
+
+
 def delete_rag(rag_id: int) -> bool:
     """Delete a RAG (cascade deletes documents, files)"""
     with get_cursor() as cursor:
@@ -95,31 +229,19 @@ def delete_rag(rag_id: int) -> bool:
         return cursor.fetchone() is not None
 
 
-def get_rag_stats(rag_id: int) -> Dict[str, Any]:
-    """Get statistics for a RAG"""
+def get_rag_stats(rag_id: int) -> Optional[Dict[str, Any]]:
+    """Get statistics for a RAG (rag_stats row, maintained by triggers); None if the RAG does not exist"""
     with get_cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT
-                COUNT(DISTINCT d.id) as document_count,
-                COUNT(DISTINCT uf.id) as file_count,
-                COUNT(DISTINCT d.id) FILTER (WHERE d.is_indexed = true) as indexed_documents
-            FROM rags r
-            LEFT JOIN documents d ON d.rag_id = r.id
-            LEFT JOIN uploaded_files uf ON uf.rag_id = r.id
-            WHERE r.id = %s
-            GROUP BY r.id
-            """,
-            (rag_id,)
-        )
+        cursor.execute(RAG_STATS_SQL, (rag_id,))
         result = cursor.fetchone()
-        if result:
-            return dict(result)
-        return {
-            'document_count': 0,
-            'file_count': 0,
-            'indexed_documents': 0
-        }
+        return dict(result) if result else None
+
+
+def get_rag_stats_batch(rag_ids: List[int]) -> List[Dict[str, Any]]:
+    """Stats rows of several RAGs, in the requested order (found=False for unknown ids)"""
+    with get_cursor() as cursor:
+        cursor.execute(RAG_STATS_BATCH_SQL, (list(rag_ids),))
+        return [dict(row) for row in cursor.fetchall()]
 
 
 # ==================== UPLOADED FILES ====================
@@ -129,25 +251,25 @@ def create_uploaded_file(
     filename: str,
     file_type: str,
     file_size: int,
-    file_content: bytes,
+    blob_sha256: str,
     mime_type: Optional[str] = None,
     metadata: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
-    """Store an uploaded file"""
+    """Store an uploaded file's metadata (content is in the blob store under blob_sha256)"""
     with get_cursor() as cursor:
         cursor.execute(
-            """
+            f"""
             INSERT INTO uploaded_files
-            (rag_id, filename, file_type, file_size, file_content, mime_type, metadata)
+            (rag_id, filename, file_type, file_size, blob_sha256, mime_type, metadata)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING id, rag_id, filename, file_type, file_size, mime_type, uploaded_at, metadata
+            RETURNING {UPLOADED_FILE_COLUMNS}
             """,
             (
                 rag_id,
                 filename,
                 file_type,
                 file_size,
-                file_content,
+                blob_sha256,
                 mime_type,
                 json.dumps(metadata) if metadata else None
             )
@@ -159,8 +281,8 @@ def get_uploaded_files_by_rag(rag_id: int) -> List[Dict[str, Any]]:
     """Get all uploaded files for a RAG (without binary content)"""
     with get_cursor() as cursor:
         cursor.execute(
-            """
-            SELECT id, rag_id, filename, file_type, file_size, mime_type, uploaded_at, metadata
+            f"""
+            SELECT {UPLOADED_FILE_COLUMNS}
             FROM uploaded_files
             WHERE rag_id = %s
             ORDER BY uploaded_at DESC
@@ -170,15 +292,192 @@ def get_uploaded_files_by_rag(rag_id: int) -> List[Dict[str, Any]]:
         return [dict(row) for row in cursor.fetchall()]
 
 
+def get_uploaded_file(file_id: int) -> Optional[Dict[str, Any]]:
+    """Get an uploaded file's metadata (blob_sha256 is None for rows not yet migrated out of BYTEA)"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            f"SELECT {UPLOADED_FILE_COLUMNS} FROM uploaded_files WHERE id = %s",
+            (file_id,)
+        )
+        result = cursor.fetchone()
+        return dict(result) if result else None
+
+
 def get_uploaded_file_content(file_id: int) -> Optional[bytes]:
-    """Get the binary content of an uploaded file"""
+    """Get the legacy BYTEA content of an uploaded file (None once moved to the blob store)"""
     with get_cursor() as cursor:
         cursor.execute(
             "SELECT file_content FROM uploaded_files WHERE id = %s",
             (file_id,)
         )
         result = cursor.fetchone()
-        return result['file_content'] if result else None
+        return bytes(result['file_content']) if result and result['file_content'] is not None else None
+
+
+@contextmanager
+def upload_transaction(rag_id: int) -> Iterator[Any]:
+    """
+    Transaction for matching and inserting a RAG's uploads: the per-RAG
+    upload lock is held until it commits. Pass its cursor to
+    find_uploaded_files_by_digests and the create_uploaded_* functions.
+    """
+    with get_cursor() as cursor:
+        cursor.execute(UPLOAD_LOCK_SQL, (rag_id,))
+        yield cursor
+
+
+@contextmanager
+def _reuse_cursor(cursor: Optional[Any]) -> Iterator[Any]:
+    """
+    The caller's cursor inside a savepoint (a failure only undoes this
+    call), or a new cursor and transaction
+    """
+    if cursor is None:
+        with get_cursor() as cursor:
+            yield cursor
+        return
+    cursor.execute("SAVEPOINT upload_step")
+    try:
+        yield cursor
+    except BaseException:
+        cursor.execute("ROLLBACK TO SAVEPOINT upload_step")
+        raise
+    cursor.execute("RELEASE SAVEPOINT upload_step")
+
+
+def find_uploaded_files_by_digests(
+    rag_id: int,
+    digests: List[str],
+    cursor: Optional[Any] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Find earlier uploads with the same contents that still have their document
+
+    Returns:
+        blob_sha256 -> {file_id, rag_id, filename, document_id}, from `rag_id`
+        when it has one, else from another RAG; new contents are absent
+    """
+    if not digests:
+        return {}
+    with _reuse_cursor(cursor) as cursor:
+        cursor.execute(FIND_UPLOADS_BY_DIGESTS_SQL, (list(digests), rag_id))
+        return {row['blob_sha256']: dict(row) for row in cursor.fetchall()}
+
+
+def create_uploaded_documents(
+    rag_id: int,
+    files: List[Dict[str, Any]],
+    cursor: Optional[Any] = None
+) -> List[Dict[str, Any]]:
+    """
+    Insert a batch of uploads in one statement: each file row, its document
+    (status draft) and the document's initial version
+
+    Args:
+        files: {filename, file_type, file_size, blob_sha256, mime_type, content, content_type}
+
+    Returns:
+        {file_id, document_id} per file, in input order
+    """
+    if not files:
+        return []
+    owns_transaction = cursor is None
+    rows = [{**file, 'position': position} for position, file in enumerate(files)]
+    with _reuse_cursor(cursor) as cursor:
+        cursor.execute(
+            INSERT_UPLOADED_DOCUMENTS_SQL,
+            {'rag_id': rag_id, 'files': json.dumps(rows), 'storage': SNAPSHOT}
+        )
+        created = [{'file_id': row['file_id'], 'document_id': row['document_id']} for row in cursor.fetchall()]
+
+    # Only once committed: with the caller's cursor, the caller fills the cache after its commit
+    if owns_transaction:
+        cache = get_version_cache()
+        for file, row in zip(files, created):
+            cache.put(row['document_id'], 1, file['content'])
+    return created
+
+
+def create_uploaded_document_streamed(
+    rag_id: int,
+    file: Dict[str, Any],
+    texts: Callable[[], Iterable[str]],
+    cursor: Optional[Any] = None
+) -> Dict[str, Any]:
+    """
+    Insert a large upload without holding its text: the document and its
+    initial version are written with COPY, fed piece by piece
+
+    Args:
+        file: {filename, file_type, file_size, blob_sha256, mime_type, content_type}
+        texts: Returns a new iterator over the decoded content (read twice)
+
+    Returns:
+        {file_id, document_id}
+    """
+    with _reuse_cursor(cursor) as cursor:
+        cursor.execute(
+            INSERT_STREAMED_UPLOAD_SQL,
+            (
+                rag_id, file['filename'], file['file_type'], file['file_size'], file['blob_sha256'],
+                file['mime_type'], json.dumps({'original_filename': file['filename']})
+            )
+        )
+        ids = dict(cursor.fetchone())
+        rows = streamed_upload_rows(rag_id, file, ids)
+        cursor.copy_expert(COPY_DOCUMENT_SQL, IterReader(copy_row(rows['document'], texts())))
+        cursor.copy_expert(COPY_VERSION_SQL, IterReader(copy_row(rows['version'], texts())))
+        return ids
+
+
+def get_referenced_blob_digests() -> List[str]:
+    """Digests of every blob still referenced by an uploaded file"""
+    with get_cursor() as cursor:
+        cursor.execute("SELECT DISTINCT blob_sha256 FROM uploaded_files WHERE blob_sha256 IS NOT NULL")
+        return [row['blob_sha256'] for row in cursor.fetchall()]
+
+
+def migrate_uploaded_file_batch(store, batch_size: int, chunk_size: int) -> List[Dict[str, Any]]:
+    """
+    Move one batch of BYTEA uploaded files into `store` (one transaction)
+
+    Contents are streamed in `chunk_size` slices with substring(), so a
+    file is never held whole in memory.
+
+    Returns:
+        Blob store results of the migrated rows (empty when nothing is left)
+    """
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id, octet_length(file_content) AS size
+            FROM uploaded_files
+            WHERE blob_sha256 IS NULL AND file_content IS NOT NULL
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (batch_size,)
+        )
+        rows = cursor.fetchall()
+
+        def slices(file_id: int, size: int):
+            for offset in range(0, size, chunk_size):
+                cursor.execute(
+                    "SELECT substring(file_content FROM %s FOR %s) AS chunk FROM uploaded_files WHERE id = %s",
+                    (offset + 1, chunk_size, file_id)
+                )
+                yield bytes(cursor.fetchone()['chunk'])
+
+        migrated = []
+        for row in rows:
+            info = store.put(slices(row['id'], row['size']))
+            cursor.execute(
+                "UPDATE uploaded_files SET blob_sha256 = %s, file_content = NULL WHERE id = %s",
+                (info['sha256'], row['id'])
+            )
+            migrated.append(info)
+        return migrated
 
 
 def delete_uploaded_file(file_id: int) -> bool:
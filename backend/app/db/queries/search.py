@@ -0,0 +1,142 @@
+"""
+Full-text search SQL queries using pure SQL with psycopg2
+
+documents.search_vector and workflows.search_vector are generated tsvector
+columns with GIN indexes (migrations/008_full_text_search.sql). A search
+ranks the matching rows of each table, keeps the best `offset + limit` of
+each, merges them by rank, and only then builds highlights: ts_headline
+re-parses the text, so it runs on the returned page only.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from app.config import settings
+from app.db.connection import get_cursor
+
+# Text search configuration of the generated columns: queries must be parsed
+# with the same one (stemming, stop words)
+TEXT_SEARCH_CONFIG = "french"
+
+# Indexed prefix of document bodies, highlighted with the same bound
+INDEXED_CONTENT_CHARS = 200000
+
+SEARCH_SCOPES = ("documents", "workflows")
+
+HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+
+# Matching rows are ranked among the first SEARCH_MAX_CANDIDATES of each
+# table (LATERAL ... LIMIT): a very frequent term would otherwise rank a
+# large part of the table
+_DOCUMENT_BRANCH = """
+    SELECT 'document' AS type, d.id, d.project_id, d.rag_id, d.title, d.status, d.updated_at,
+           ts_rank(d.search_vector, q.query) AS rank,
+           d.content AS body
+    FROM q, LATERAL (
+        SELECT id, project_id, rag_id, title, status, updated_at, content, search_vector
+        FROM documents d
+        WHERE d.search_vector @@ q.query{conditions}
+        LIMIT %(candidates)s
+    ) d
+    ORDER BY rank DESC, d.id DESC
+    LIMIT %(window)s
+"""
+
+_WORKFLOW_BRANCH = """
+    SELECT 'workflow' AS type, w.id, w.project_id, NULL::integer AS rag_id, w.name AS title,
+           NULL::varchar AS status, w.updated_at,
+           ts_rank(w.search_vector, q.query) AS rank,
+           w.description AS body
+    FROM q, LATERAL (
+        SELECT id, project_id, name, updated_at, description, search_vector
+        FROM workflows w
+        WHERE w.search_vector @@ q.query{conditions}
+        LIMIT %(candidates)s
+    ) w
+    ORDER BY rank DESC, w.id DESC
+    LIMIT %(window)s
+"""
+
+def search_query(
+    query: str,
+    scopes: Tuple[str, ...] = SEARCH_SCOPES,
+    project_id: Optional[int] = None,
+    rag_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    SQL and parameters of a search
+
+    `query` uses the web search syntax (websearch_to_tsquery): words are
+    ANDed, "quoted phrases", `or`, and -excluded words. Workflows have no
+    RAG nor status: filtering on either leaves documents only. Past
+    SEARCH_MAX_CANDIDATES matches in a table, results are the best of the
+    first matches found, not of all of them.
+    """
+    params: Dict[str, Any] = {
+        'config': TEXT_SEARCH_CONFIG,
+        'query': query,
+        'window': offset + limit,
+        # LIMIT NULL: no bound
+        'candidates': settings.SEARCH_MAX_CANDIDATES or None,
+        'limit': limit,
+        'offset': offset,
+        'headline_options': HEADLINE_OPTIONS
+    }
+
+    document_conditions, workflow_conditions = [], []
+    if project_id is not None:
+        document_conditions.append("d.project_id = %(project_id)s")
+        workflow_conditions.append("w.project_id = %(project_id)s")
+        params['project_id'] = project_id
+    if rag_id is not None:
+        document_conditions.append("d.rag_id = %(rag_id)s")
+        params['rag_id'] = rag_id
+    if status is not None:
+        document_conditions.append("d.status = %(status)s")
+        params['status'] = status
+
+    branches = []
+    if "documents" in scopes:
+        branches.append(_DOCUMENT_BRANCH.format(
+            conditions="".join(f" AND {c}" for c in document_conditions)
+        ))
+    if "workflows" in scopes and rag_id is None and status is None:
+        branches.append(_WORKFLOW_BRANCH.format(
+            conditions="".join(f" AND {c}" for c in workflow_conditions)
+        ))
+    if not branches:
+        return "", params
+
+    hits = " UNION ALL ".join(f"({branch})" for branch in branches)
+    sql = f"""
+        WITH q AS (SELECT websearch_to_tsquery(%(config)s::regconfig, %(query)s) AS query),
+        hits AS (
+            SELECT * FROM ({hits}) ranked
+            ORDER BY rank DESC, type, id DESC
+            LIMIT %(limit)s OFFSET %(offset)s
+        )
+        SELECT type, id, project_id, rag_id, title, status, updated_at, rank,
+               ts_headline(%(config)s::regconfig, left(coalesce(body, ''), {INDEXED_CONTENT_CHARS}),
+                           q.query, %(headline_options)s) AS headline
+        FROM hits, q
+        ORDER BY rank DESC, type, id DESC
+    """
+    return sql, params
+
+
+def search(
+    query: str,
+    scopes: Tuple[str, ...] = SEARCH_SCOPES,
+    project_id: Optional[int] = None,
+    rag_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """Documents and workflows matching `query`, best rank first, with highlighted excerpts"""
+    sql, params = search_query(query, scopes, project_id, rag_id, status, limit, offset)
+    if not sql:
+        return []
+    with get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return [dict(row) for row in cursor.fetchall()]
@@ -1,6 +1,151 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, BinaryIO, Iterator, Tuple, Union
+from datetime import date, datetime
 import json
+import psycopg2.errors
+import psycopg2.sql
 from app.db.connection import get_cursor
+from app.db.pagination import Keyset, page_query
+
+WORKFLOW_COLUMNS = (
+    "id, project_id, name, description, raw_data, workflow_hash, url, domain, duration_ms, created_at, updated_at"
+)
+
+# Vues liste: sans raw_data, avec sa taille stockée (octets, éventuellement compressée)
+WORKFLOW_SUMMARY_COLUMNS = (
+    "id, project_id, name, description, pg_column_size(raw_data) AS raw_data_size, "
+    "workflow_hash, url, domain, duration_ms, created_at, updated_at"
+)
+
+# Lignes par INSERT multi-lignes (un seul document JSON sérialisé par lot)
+BULK_INSERT_BATCH_SIZE = 5000
+
+# Les états / actions d'un lot arrivent en un seul paramètre jsonb, dépliés par
+# jsonb_to_recordset: une requête par lot au lieu d'une par ligne
+INSERT_STATES_SQL = """
+    INSERT INTO workflow_states (workflow_id, captured_at, state_type, state_data, sequence_order, timestamp)
+    SELECT %s, %s, s.state_type, s.state_data, s.sequence_order, s."timestamp"
+    FROM jsonb_to_recordset(%s::jsonb)
+        AS s(state_type text, state_data jsonb, sequence_order integer, "timestamp" timestamptz)
+"""
+
+INSERT_ACTIONS_SQL = """
+    INSERT INTO workflow_actions (workflow_id, captured_at, action_type, action_data, sequence_order, timestamp)
+    SELECT %s, %s, a.action_type, a.action_data, a.sequence_order, a."timestamp"
+    FROM jsonb_to_recordset(%s::jsonb)
+        AS a(action_type text, action_data jsonb, sequence_order integer, "timestamp" timestamptz)
+"""
+
+# Création en une requête: le projet est vérifié par la CTE et les doublons
+# écartés par la contrainte unique (project_id, workflow_hash)
+# (migrations/011_workflow_hash_unique.sql). Une ligne toujours: project_found
+# et, si le workflow a été inséré, ses colonnes (NULL sinon)
+CREATE_WORKFLOW_SQL = f"""
+    WITH project AS (
+        SELECT id FROM projects WHERE id = %s
+    ),
+    inserted AS (
+        INSERT INTO workflows (project_id, name, description, raw_data, workflow_hash, url, domain, duration_ms)
+        SELECT project.id, %s, %s, %s, %s, %s, %s, %s FROM project
+        ON CONFLICT (project_id, workflow_hash) DO NOTHING
+        RETURNING {WORKFLOW_COLUMNS}
+    )
+    SELECT EXISTS (SELECT 1 FROM project) AS project_found, inserted.*
+    FROM (SELECT 1) AS one
+    LEFT JOIN inserted ON true
+"""
+
+# Recherche d'étapes (actions / états) par contenu JSON: type -> (table, colonne type, colonne données).
+# Les filtres @> et @? sont servis par les index GIN jsonb_path_ops (migrations/009_workflow_step_indexes.sql)
+STEP_TABLES = {
+    "action": ("workflow_actions", "action_type", "action_data"),
+    "state": ("workflow_states", "state_type", "state_data"),
+}
+
+
+class InvalidStepFilter(ValueError):
+    """Filtre d'étapes inutilisable (aucun filtre indexé, jsonpath invalide)"""
+
+
+class WorkflowProjectNotFound(LookupError):
+    """Le projet du workflow à créer n'existe pas"""
+
+
+class DuplicateWorkflow(ValueError):
+    """Un workflow de même hash existe déjà dans le projet"""
+
+
+# Partitions mensuelles des étapes (migrations/010_partition_workflow_steps.sql):
+# tables <parent>_pAAAA_MM, attachées ou détachées par la rétention
+STEP_PARTITIONS_SQL = r"""
+    SELECT c.relname AS name,
+           substring(c.relname from '^(workflow_(?:states|actions))_p') AS parent,
+           to_date(substring(c.relname from '_p([0-9]{4}_[0-9]{2})$'), 'YYYY_MM') AS month,
+           i.inhparent IS NOT NULL AS attached,
+           pg_total_relation_size(c.oid) AS size_bytes
+    FROM pg_class c
+    LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+    WHERE c.relkind = 'r'
+      AND c.relnamespace = 'public'::regnamespace
+      AND c.relname ~ '^workflow_(states|actions)_p[0-9]{4}_[0-9]{2}$'
+    ORDER BY month, name
+"""
+
+# Mois ayant des lignes dans les partitions par défaut (partition manquante)
+DEFAULT_PARTITION_MONTHS_SQL = """
+    SELECT DISTINCT date_trunc('month', captured_at)::date AS month FROM workflow_states_default
+    UNION
+    SELECT DISTINCT date_trunc('month', captured_at)::date FROM workflow_actions_default
+    ORDER BY month
+"""
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_batches(rows: List[Dict[str, Any]], batch_size: int = BULK_INSERT_BATCH_SIZE) -> Iterator[str]:
+    """Découpe des lignes en lots, chaque lot sérialisé en un seul document JSON"""
+    for start in range(0, len(rows), batch_size):
+        yield json.dumps(rows[start:start + batch_size], default=_json_default)
+
+
+def step_search_query(
+    kind: str,
+    contains: Optional[Union[Dict[str, Any], List[Any]]] = None,
+    path: Optional[str] = None,
+    step_type: Optional[str] = None,
+    project_id: Optional[int] = None,
+    limit: int = 100,
+    after: Optional[Keyset] = None
+) -> Tuple[str, List[Any]]:
+    """
+    Requête d'une page d'étapes (plus récentes d'abord) dont les données
+    contiennent `contains` (@>) et/ou vérifient le jsonpath `path` (@?).
+    L'un des deux est obligatoire: sans lui, la requête parcourrait la table.
+    """
+    table, type_column, data_column = STEP_TABLES[kind]
+    conditions, params = [], []
+    if contains is not None:
+        conditions.append(f"{data_column} @> %s::jsonb")
+        params.append(json.dumps(contains))
+    if path is not None:
+        conditions.append(f"{data_column} @? %s::jsonpath")
+        params.append(path)
+    if not conditions:
+        raise InvalidStepFilter("A step query needs a containment (contains) or jsonpath (path) filter")
+    if step_type is not None:
+        conditions.append(f"{type_column} = %s")
+        params.append(step_type)
+    if project_id is not None:
+        conditions.append("workflow_id IN (SELECT id FROM workflows WHERE project_id = %s)")
+        params.append(project_id)
+    return page_query(
+        f"SELECT id, workflow_id, '{kind}' AS kind, {type_column} AS step_type, {data_column} AS data, "
+        f"sequence_order, timestamp FROM {table}",
+        conditions, params, "timestamp", limit, 0, after
+    )
 
 
 def create_workflow(
@@ -15,42 +160,31 @@ def create_workflow(
     states: Optional[List[Dict[str, Any]]] = None,
     actions: Optional[List[Dict[str, Any]]] = None
 ) -> Dict[str, Any]:
-    """Crée un nouveau workflow avec ses états et actions"""
+    """
+    Crée un nouveau workflow avec ses états et actions
+
+    Raises:
+        WorkflowProjectNotFound: le projet n'existe pas
+        DuplicateWorkflow: le projet a déjà un workflow de ce hash
+    """
     with get_cursor() as cursor:
-        # Insérer le workflow
+        # Insérer le workflow (vérification du projet et du hash comprises)
         cursor.execute(
-            """
-            INSERT INTO workflows (project_id, name, description, raw_data, workflow_hash, url, domain, duration_ms)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING id, project_id, name, description, raw_data, workflow_hash, url, domain, duration_ms, created_at, updated_at
-            """,
+            CREATE_WORKFLOW_SQL,
             (project_id, name, description, json.dumps(raw_data), workflow_hash, url, domain, duration_ms)
         )
         workflow = dict(cursor.fetchone())
+        if not workflow.pop('project_found'):
+            raise WorkflowProjectNotFound(project_id)
+        if workflow['id'] is None:
+            raise DuplicateWorkflow(workflow_hash)
 
-        # Insérer les états si présents
-        if states:
-            for state in states:
-                cursor.execute(
-                    """
-                    INSERT INTO workflow_states (workflow_id, state_type, state_data, sequence_order, timestamp)
-                    VALUES (%s, %s, %s, %s, %s)
-                    """,
-                    (workflow['id'], state['state_type'], json.dumps(state['state_data']),
-                     state['sequence_order'], state['timestamp'])
-                )
-
-        # Insérer les actions si présentes
-        if actions:
-            for action in actions:
-                cursor.execute(
-                    """
-                    INSERT INTO workflow_actions (workflow_id, action_type, action_data, sequence_order, timestamp)
-                    VALUES (%s, %s, %s, %s, %s)
-                    """,
-                    (workflow['id'], action['action_type'], json.dumps(action['action_data']),
-                     action['sequence_order'], action['timestamp'])
-                )
+        # Insérer les états et actions par lots (INSERT multi-lignes)
+        for batch in json_batches(states or []):
+            cursor.execute(INSERT_STATES_SQL, (workflow['id'], workflow['created_at'], batch))
+
+        for batch in json_batches(actions or []):
+            cursor.execute(INSERT_ACTIONS_SQL, (workflow['id'], workflow['created_at'], batch))
 
         return workflow
 
@@ -73,15 +207,16 @@ def get_workflow_by_id(workflow_id: int, include_details: bool = False) -> Optio
         workflow = dict(result)
 
         if include_details:
+            # captured_at = created_at du workflow: une seule partition lue par table
             # Récupérer les états
             cursor.execute(
                 """
                 SELECT state_type, state_data, sequence_order, timestamp
                 FROM workflow_states
-                WHERE workflow_id = %s
+                WHERE workflow_id = %s AND captured_at = %s
                 ORDER BY sequence_order
                 """,
-                (workflow_id,)
+                (workflow_id, workflow['created_at'])
             )
             workflow['states'] = [dict(row) for row in cursor.fetchall()]
 
@@ -90,29 +225,30 @@ def get_workflow_by_id(workflow_id: int, include_details: bool = False) -> Optio
                 """
                 SELECT action_type, action_data, sequence_order, timestamp
                 FROM workflow_actions
-                WHERE workflow_id = %s
+                WHERE workflow_id = %s AND captured_at = %s
                 ORDER BY sequence_order
                 """,
-                (workflow_id,)
+                (workflow_id, workflow['created_at'])
             )
             workflow['actions'] = [dict(row) for row in cursor.fetchall()]
 
         return workflow
 
 
-def get_workflows_by_project(project_id: int, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
-    """Récupère tous les workflows d'un projet"""
+def get_workflows_by_project(
+    project_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    summary: bool = False,
+    after: Optional[Keyset] = None
+) -> List[Dict[str, Any]]:
+    """Récupère tous les workflows d'un projet (summary: sans raw_data, after: curseur keyset)"""
+    query, params = page_query(
+        f"SELECT {WORKFLOW_SUMMARY_COLUMNS if summary else WORKFLOW_COLUMNS} FROM workflows",
+        ["project_id = %s"], [project_id], "created_at", limit, skip, after
+    )
     with get_cursor() as cursor:
-        cursor.execute(
-            """
-            SELECT id, project_id, name, description, raw_data, workflow_hash, url, domain, duration_ms, created_at, updated_at
-            FROM workflows
-            WHERE project_id = %s
-            ORDER BY created_at DESC
-            LIMIT %s OFFSET %s
-            """,
-            (project_id, limit, skip)
-        )
+        cursor.execute(query, params)
         return [dict(row) for row in cursor.fetchall()]
 
 
@@ -181,3 +317,72 @@ def count_workflows_by_project(project_id: int) -> int:
             (project_id,)
         )
         return cursor.fetchone()['count']
+
+
+def search_steps(
+    kind: str,
+    contains: Optional[Union[Dict[str, Any], List[Any]]] = None,
+    path: Optional[str] = None,
+    step_type: Optional[str] = None,
+    project_id: Optional[int] = None,
+    limit: int = 100,
+    after: Optional[Keyset] = None
+) -> List[Dict[str, Any]]:
+    """Étapes dont les données correspondent au filtre JSON (voir step_search_query)"""
+    query, params = step_search_query(kind, contains, path, step_type, project_id, limit, after)
+    with get_cursor() as cursor:
+        try:
+            cursor.execute(query, params)
+        except psycopg2.errors.SyntaxError as e:
+            raise InvalidStepFilter(f"Invalid jsonpath: {e.pgerror.splitlines()[0] if e.pgerror else e}") from e
+        return [dict(row) for row in cursor.fetchall()]
+
+
+# ==================== PARTITIONS ====================
+
+def create_step_partitions(from_month: date, to_month: date) -> int:
+    """Crée les partitions mensuelles manquantes entre deux mois (inclus); renvoie le nombre créé"""
+    with get_cursor() as cursor:
+        cursor.execute("SELECT create_workflow_step_partitions(%s, %s) AS created", (from_month, to_month))
+        return cursor.fetchone()['created']
+
+
+def get_default_partition_months() -> List[date]:
+    """Mois dont des étapes attendent leur partition dans les partitions par défaut"""
+    with get_cursor() as cursor:
+        cursor.execute(DEFAULT_PARTITION_MONTHS_SQL)
+        return [row['month'] for row in cursor.fetchall()]
+
+
+def get_step_partitions() -> List[Dict[str, Any]]:
+    """Partitions mensuelles des étapes: {name, parent, month, attached, size_bytes}"""
+    with get_cursor() as cursor:
+        cursor.execute(STEP_PARTITIONS_SQL)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def detach_step_partition(parent: str, name: str) -> None:
+    """Détache une partition: ses lignes sortent des requêtes, la table reste"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            psycopg2.sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(
+                psycopg2.sql.Identifier(parent), psycopg2.sql.Identifier(name)
+            )
+        )
+
+
+def export_step_partition(name: str, fileobj: BinaryIO) -> None:
+    """Copie une partition (détachée) dans un fichier, en CSV avec en-tête"""
+    with get_cursor() as cursor:
+        cursor.copy_expert(
+            psycopg2.sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER)").format(
+                psycopg2.sql.Identifier(name)
+            ),
+            fileobj
+        )
+
+
+def drop_step_partition(name: str) -> None:
+    """Supprime une partition détachée"""
+    with get_cursor() as cursor:
+        cursor.execute(psycopg2.sql.SQL("DROP TABLE {}").format(psycopg2.sql.Identifier(name)))
@@ -6,22 +6,28 @@ CREATE TABLE IF NOT EXISTS projects (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     description TEXT,
-    created_at TIMESTAMP DEFAULT NOW(),
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
 CREATE INDEX idx_projects_name ON projects(name);
+-- Keyset pagination: ORDER BY created_at DESC, id DESC
+CREATE INDEX idx_projects_created ON projects(created_at DESC, id DESC);
 
 -- Table rags (RAG collections)
+-- index_version is bumped whenever the RAG's vector index changes (answer cache invalidation)
 CREATE TABLE IF NOT EXISTS rags (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     description TEXT,
-    created_at TIMESTAMP DEFAULT NOW(),
+    index_version INTEGER NOT NULL DEFAULT 0,
+    semantic_cache_threshold REAL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW()
 );
 
 CREATE INDEX idx_rags_name ON rags(name);
+CREATE INDEX idx_rags_created ON rags(created_at DESC, id DESC);
 
 -- Table uploaded_files (stores original uploaded files)
 CREATE TABLE IF NOT EXISTS uploaded_files (
@@ -30,14 +36,17 @@ CREATE TABLE IF NOT EXISTS uploaded_files (
     filename VARCHAR(255) NOT NULL,
     file_type VARCHAR(50) NOT NULL,
     file_size INTEGER NOT NULL,
-    file_content BYTEA NOT NULL,
+    file_content BYTEA,  -- Legacy: contents now live in the blob store (blob_sha256)
+    blob_sha256 CHAR(64),
     mime_type VARCHAR(100),
     uploaded_at TIMESTAMP DEFAULT NOW(),
-    metadata JSONB
+    metadata JSONB,
+    CONSTRAINT uploaded_file_has_content CHECK (blob_sha256 IS NOT NULL OR file_content IS NOT NULL)
 );
 
 CREATE INDEX idx_uploaded_files_rag ON uploaded_files(rag_id);
 CREATE INDEX idx_uploaded_files_type ON uploaded_files(file_type);
+CREATE INDEX idx_uploaded_files_blob ON uploaded_files(blob_sha256);
 
 -- Table workflows
 CREATE TABLE IF NOT EXISTS workflows (
@@ -50,37 +59,95 @@ CREATE TABLE IF NOT EXISTS workflows (
     url VARCHAR(500),
     domain VARCHAR(255),
     duration_ms INTEGER,
-    created_at TIMESTAMP DEFAULT NOW(),
-    updated_at TIMESTAMP DEFAULT NOW()
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW(),
+    -- One capture per project: create_workflow relies on it (ON CONFLICT)
+    CONSTRAINT workflows_project_hash_key UNIQUE (project_id, workflow_hash),
+    -- Full-text search (queries/search.py): name > description > url / domain
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', name), 'A') ||
+        setweight(to_tsvector('french', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('french', coalesce(url, '') || ' ' || coalesce(domain, '')), 'C')
+    ) STORED
 );
 
-CREATE INDEX idx_workflows_project ON workflows(project_id);
-CREATE INDEX idx_workflows_hash ON workflows(project_id, workflow_hash);
+-- Keyset pagination par projet (sert aussi les filtres / cascades sur project_id)
+CREATE INDEX idx_workflows_project_created ON workflows(project_id, created_at DESC, id DESC);
 CREATE INDEX idx_workflows_domain ON workflows(domain);
+CREATE INDEX idx_workflows_search ON workflows USING gin(search_vector);
 
--- Table workflow_states
+-- workflow_states / workflow_actions: partitioned by month of capture
+-- (captured_at = workflows.created_at, so a workflow's steps share one
+-- partition). Months without partition land in the DEFAULT partition;
+-- app/services/step_partitions.py creates months ahead and applies retention.
 CREATE TABLE IF NOT EXISTS workflow_states (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     workflow_id INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
     state_type VARCHAR(20) NOT NULL,
     state_data JSONB NOT NULL,
     sequence_order INTEGER NOT NULL,
-    timestamp TIMESTAMP NOT NULL
-);
+    timestamp TIMESTAMP NOT NULL,
+    captured_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, captured_at)
+) PARTITION BY RANGE (captured_at);
+
+CREATE TABLE IF NOT EXISTS workflow_states_default PARTITION OF workflow_states DEFAULT;
 
 CREATE INDEX idx_states_workflow ON workflow_states(workflow_id);
+-- Containment / jsonpath step queries (queries/workflows.py search_steps)
+CREATE INDEX idx_states_data ON workflow_states USING gin(state_data jsonb_path_ops);
 
--- Table workflow_actions
 CREATE TABLE IF NOT EXISTS workflow_actions (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     workflow_id INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
     action_type VARCHAR(50) NOT NULL,
     action_data JSONB NOT NULL,
     sequence_order INTEGER NOT NULL,
-    timestamp TIMESTAMP NOT NULL
-);
+    timestamp TIMESTAMP NOT NULL,
+    captured_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (id, captured_at)
+) PARTITION BY RANGE (captured_at);
+
+CREATE TABLE IF NOT EXISTS workflow_actions_default PARTITION OF workflow_actions DEFAULT;
 
 CREATE INDEX idx_actions_workflow ON workflow_actions(workflow_id);
+CREATE INDEX idx_actions_data ON workflow_actions USING gin(action_data jsonb_path_ops);
+CREATE INDEX idx_actions_type ON workflow_actions(action_type);
+
+-- Month partitions [from_month, to_month] of both tables (existing ones are
+-- skipped). Rows of a new month already in the default partition move to it.
+CREATE OR REPLACE FUNCTION create_workflow_step_partitions(from_month DATE, to_month DATE) RETURNS INTEGER AS $$
+DECLARE
+    parent TEXT;
+    month DATE;
+    partition TEXT;
+    created INTEGER := 0;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['workflow_states', 'workflow_actions'] LOOP
+        month := date_trunc('month', from_month)::date;
+        WHILE month <= to_month LOOP
+            partition := format('%s_p%s', parent, to_char(month, 'YYYY_MM'));
+            IF to_regclass(partition) IS NULL THEN
+                EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition, parent);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE captured_at >= %L AND captured_at < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM moved',
+                    parent || '_default', month, (month + interval '1 month')::date, partition
+                );
+                EXECUTE format(
+                    'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                    parent, partition, month, (month + interval '1 month')::date
+                );
+                created := created + 1;
+            END IF;
+            month := (month + interval '1 month')::date;
+        END LOOP;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_workflow_step_partitions(current_date, (current_date + interval '3 months')::date);
 
 -- Table documents
 CREATE TABLE IF NOT EXISTS documents (
@@ -96,33 +163,237 @@ CREATE TABLE IF NOT EXISTS documents (
     metadata JSONB,
     version INTEGER DEFAULT 1,
     created_at TIMESTAMP DEFAULT NOW(),
-    updated_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
     validated_at TIMESTAMP,
     last_indexed_at TIMESTAMP,
     chunks_count INTEGER DEFAULT 0,
+    -- Full-text search (queries/search.py): title > body; only the first
+    -- 200000 characters of the body are indexed (a tsvector is capped at 1MB)
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', title), 'A') ||
+        setweight(to_tsvector('french', left(content, 200000)), 'B')
+    ) STORED,
     CONSTRAINT doc_belongs_to_project_or_rag CHECK (
         (project_id IS NOT NULL AND rag_id IS NULL) OR
         (project_id IS NULL AND rag_id IS NOT NULL)
     )
 );
 
-CREATE INDEX idx_documents_project ON documents(project_id);
-CREATE INDEX idx_documents_rag ON documents(rag_id);
+-- Keyset pagination: ORDER BY updated_at DESC, id DESC, per filter column
+CREATE INDEX idx_documents_project_updated ON documents(project_id, updated_at DESC, id DESC);
+CREATE INDEX idx_documents_rag_updated ON documents(rag_id, updated_at DESC, id DESC);
+CREATE INDEX idx_documents_status_updated ON documents(status, updated_at DESC, id DESC);
+CREATE INDEX idx_documents_updated ON documents(updated_at DESC, id DESC);
 CREATE INDEX idx_documents_workflow ON documents(workflow_id);
-CREATE INDEX idx_documents_status ON documents(status);
 CREATE INDEX idx_documents_indexed ON documents(is_indexed);
+CREATE INDEX idx_documents_uploaded_file ON documents((metadata->>'uploaded_file_id'));
+CREATE INDEX idx_documents_search ON documents USING gin(search_vector);
 
 -- Table document_versions
+-- storage = 'snapshot': full content; 'delta': delta (JSON ops) against the previous version
 CREATE TABLE IF NOT EXISTS document_versions (
     id SERIAL PRIMARY KEY,
     document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
-    content TEXT NOT NULL,
+    content TEXT,
     version_number INTEGER NOT NULL,
     change_summary TEXT,
+    storage VARCHAR(10) NOT NULL DEFAULT 'snapshot',
+    delta JSONB,
+    content_length INTEGER NOT NULL,  -- Size of the full content in bytes
+    created_at TIMESTAMP DEFAULT NOW(),
+    CONSTRAINT version_storage_payload CHECK (
+        (storage = 'snapshot' AND content IS NOT NULL) OR
+        (storage = 'delta' AND delta IS NOT NULL)
+    )
+);
+
+CREATE INDEX idx_versions_document_number ON document_versions(document_id, version_number);
+
+-- Table chat_sessions (server-side conversation state)
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    id SERIAL PRIMARY KEY,
+    rag_id INTEGER REFERENCES rags(id) ON DELETE SET NULL,
+    title VARCHAR(255),
+    summary TEXT,
+    summarized_until_id INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT NOW(),
+    updated_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Table chat_messages (turns; ids <= summarized_until_id are folded into the session summary)
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id SERIAL PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES chat_sessions(id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,
+    content TEXT NOT NULL,
+    token_count INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT NOW()
 );
 
-CREATE INDEX idx_versions_document ON document_versions(document_id);
+CREATE INDEX idx_chat_messages_session ON chat_messages(session_id, id);
+
+-- Statistics: one row per RAG / project, maintained by statement-level triggers
+-- (stats endpoints read a single row)
+CREATE TABLE IF NOT EXISTS rag_stats (
+    rag_id INTEGER PRIMARY KEY REFERENCES rags(id) ON DELETE CASCADE,
+    document_count INTEGER NOT NULL DEFAULT 0,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    indexed_documents INTEGER NOT NULL DEFAULT 0,
+    total_chunks BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS project_stats (
+    project_id INTEGER PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    total_documents INTEGER NOT NULL DEFAULT 0,
+    draft_count INTEGER NOT NULL DEFAULT 0,
+    validated_count INTEGER NOT NULL DEFAULT 0,
+    published_count INTEGER NOT NULL DEFAULT 0,
+    indexed_count INTEGER NOT NULL DEFAULT 0,
+    total_chunks BIGINT NOT NULL DEFAULT 0,
+    workflow_count INTEGER NOT NULL DEFAULT 0
+);
+
+-- A stats row is created with its RAG / project (deleted with it by cascade)
+CREATE OR REPLACE FUNCTION rag_stats_create() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO rag_stats (rag_id) SELECT id FROM new_rows ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION project_stats_create() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO project_stats (project_id) SELECT id FROM new_rows ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Documents: +1 per new row, -1 per old row (an UPDATE is both), summed per
+-- RAG / project. Groups whose counters do not change are skipped, so
+-- content-only edits do not touch the stats rows.
+DO $$
+BEGIN
+    IF to_regtype('documents_stats_delta') IS NULL THEN
+        CREATE TYPE documents_stats_delta AS (
+            rag_id INTEGER, project_id INTEGER, n INTEGER, status TEXT, is_indexed BOOLEAN, chunks BIGINT
+        );
+    END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION documents_stats_add(deltas documents_stats_delta[]) RETURNS void AS $$
+    UPDATE rag_stats s SET
+        document_count = s.document_count + d.documents,
+        indexed_documents = s.indexed_documents + d.indexed,
+        total_chunks = s.total_chunks + d.chunks
+    FROM (
+        SELECT rag_id,
+               sum(n) AS documents,
+               coalesce(sum(n) FILTER (WHERE is_indexed), 0) AS indexed,
+               sum(n * chunks) AS chunks
+        FROM unnest(deltas)
+        WHERE rag_id IS NOT NULL
+        GROUP BY rag_id
+    ) d
+    WHERE s.rag_id = d.rag_id
+      AND (d.documents <> 0 OR d.indexed <> 0 OR d.chunks <> 0);
+
+    UPDATE project_stats s SET
+        total_documents = s.total_documents + d.documents,
+        draft_count = s.draft_count + d.draft,
+        validated_count = s.validated_count + d.validated,
+        published_count = s.published_count + d.published,
+        indexed_count = s.indexed_count + d.indexed,
+        total_chunks = s.total_chunks + d.chunks
+    FROM (
+        SELECT project_id,
+               sum(n) AS documents,
+               coalesce(sum(n) FILTER (WHERE status = 'draft'), 0) AS draft,
+               coalesce(sum(n) FILTER (WHERE status = 'validated'), 0) AS validated,
+               coalesce(sum(n) FILTER (WHERE status = 'published'), 0) AS published,
+               coalesce(sum(n) FILTER (WHERE is_indexed), 0) AS indexed,
+               sum(n * chunks) AS chunks
+        FROM unnest(deltas)
+        WHERE project_id IS NOT NULL
+        GROUP BY project_id
+    ) d
+    WHERE s.project_id = d.project_id
+      AND (d.documents <> 0 OR d.draft <> 0 OR d.validated <> 0 OR d.published <> 0
+           OR d.indexed <> 0 OR d.chunks <> 0);
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION documents_stats_apply() RETURNS trigger AS $$
+DECLARE
+    deltas documents_stats_delta[] := '{}';
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        deltas := deltas || ARRAY(
+            SELECT ROW(rag_id, project_id, 1, status, coalesce(is_indexed, false), coalesce(chunks_count, 0))::documents_stats_delta
+            FROM new_rows
+        );
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        deltas := deltas || ARRAY(
+            SELECT ROW(rag_id, project_id, -1, status, coalesce(is_indexed, false), coalesce(chunks_count, 0))::documents_stats_delta
+            FROM old_rows
+        );
+    END IF;
+    PERFORM documents_stats_add(deltas);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION uploaded_files_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE rag_stats s SET file_count = s.file_count + d.n
+        FROM (SELECT rag_id, count(*) AS n FROM new_rows GROUP BY rag_id) d
+        WHERE s.rag_id = d.rag_id;
+    ELSE
+        UPDATE rag_stats s SET file_count = s.file_count - d.n
+        FROM (SELECT rag_id, count(*) AS n FROM old_rows GROUP BY rag_id) d
+        WHERE s.rag_id = d.rag_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION workflows_stats_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE project_stats s SET workflow_count = s.workflow_count + d.n
+        FROM (SELECT project_id, count(*) AS n FROM new_rows GROUP BY project_id) d
+        WHERE s.project_id = d.project_id;
+    ELSE
+        UPDATE project_stats s SET workflow_count = s.workflow_count - d.n
+        FROM (SELECT project_id, count(*) AS n FROM old_rows GROUP BY project_id) d
+        WHERE s.project_id = d.project_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables require one trigger per event
+CREATE OR REPLACE TRIGGER rags_stats_insert AFTER INSERT ON rags
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION rag_stats_create();
+CREATE OR REPLACE TRIGGER projects_stats_insert AFTER INSERT ON projects
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION project_stats_create();
+
+CREATE OR REPLACE TRIGGER documents_stats_insert AFTER INSERT ON documents
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION documents_stats_apply();
+CREATE OR REPLACE TRIGGER documents_stats_update AFTER UPDATE ON documents
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION documents_stats_apply();
+CREATE OR REPLACE TRIGGER documents_stats_delete AFTER DELETE ON documents
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION documents_stats_apply();
+
+CREATE OR REPLACE TRIGGER uploaded_files_stats_insert AFTER INSERT ON uploaded_files
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION uploaded_files_stats_apply();
+CREATE OR REPLACE TRIGGER uploaded_files_stats_delete AFTER DELETE ON uploaded_files
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION uploaded_files_stats_apply();
+
+CREATE OR REPLACE TRIGGER workflows_stats_insert AFTER INSERT ON workflows
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION workflows_stats_apply();
+CREATE OR REPLACE TRIGGER workflows_stats_delete AFTER DELETE ON workflows
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION workflows_stats_apply();
 
 -- Note: Table document_chunks is managed by Haystack PgvectorDocumentStore
 -- Haystack will create its own table structure for storing documents and embeddings
@@ -0,0 +1,55 @@
+"""
+COPY en flux
+
+Une ligne dont la dernière colonne est un très gros texte est envoyée par
+`COPY ... FROM STDIN` morceau par morceau: le texte n'est jamais entier en
+mémoire (ni côté Python, ni dans un paramètre de requête).
+"""
+from typing import Any, Iterable, Iterator, List
+import json
+
+# Échappements du format texte de COPY
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\n": "\\n", "\r": "\\r", "\t": "\\t"})
+
+
+def copy_value(value: Any) -> str:
+    """Valeur au format texte de COPY (None -> \\N)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_row(values: List[Any], texts: Iterable[str]) -> Iterator[bytes]:
+    """
+    Une ligne COPY: `values` puis, en dernière colonne, le texte reçu en morceaux
+    """
+    yield ("\t".join(copy_value(value) for value in values) + "\t").encode("utf-8")
+    for text in texts:
+        yield text.translate(_COPY_ESCAPES).encode("utf-8")
+    yield b"\n"
+
+
+class IterReader:
+    """Objet fichier (read) au-dessus d'un itérateur de bytes, pour cursor.copy_expert de psycopg2"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._chunk = b""
+        self._position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._chunk[self._position:] + b"".join(self._chunks)
+            self._chunk, self._position = b"", 0
+            return data
+        # Au plus `size` octets du morceau courant (sans recopier le reste du morceau)
+        while self._position >= len(self._chunk):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b""
+            self._chunk, self._position = chunk, 0
+        data = self._chunk[self._position:self._position + size]
+        self._position += len(data)
+        return data
@@ -0,0 +1,225 @@
+"""
+Stockage des versions de documents en deltas
+
+Une version est stockée soit en entier ('snapshot'), soit sous forme de delta
+par rapport à la version précédente ('delta'). Une version sur
+DOCUMENT_VERSION_SNAPSHOT_INTERVAL est un snapshot, ce qui borne le nombre de
+deltas à appliquer pour reconstruire une version. Les versions reconstruites
+sont gardées dans un petit cache LRU (elles ne changent jamais).
+
+Format d'un delta: liste JSON d'opérations appliquées à la version de base,
+dans l'ordre:
+    n > 0   copier n caractères de la base
+    n < 0   sauter -n caractères de la base
+    "texte" insérer le texte
+"""
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union
+from collections import OrderedDict
+from difflib import SequenceMatcher
+import json
+import threading
+
+from app.config import settings
+from app import metrics
+
+SNAPSHOT = "snapshot"
+DELTA = "delta"
+
+# Au-delà de cette taille (relative au contenu), un delta ne vaut pas la peine
+DELTA_MAX_RATIO = 0.5
+
+DeltaOp = Union[int, str]
+
+VERSION_STORAGE_COLUMNS = "version_number, storage, content, delta"
+
+INSERT_VERSION_SQL = """
+    INSERT INTO document_versions (
+        document_id, version_number, change_summary, storage, content, delta, content_length
+    )
+    VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s)
+"""
+
+# Position de la chaîne avant la nouvelle version: dernière version stockée
+# et dernier snapshot
+CHAIN_HEAD_SQL = """
+    SELECT max(version_number) AS previous,
+           max(version_number) FILTER (WHERE storage = 'snapshot') AS last_snapshot
+    FROM document_versions
+    WHERE document_id = %s AND version_number < %s
+"""
+
+# Lignes nécessaires pour reconstruire une version: du dernier snapshot
+# qui la précède jusqu'à elle
+CHAIN_SQL = f"""
+    SELECT {VERSION_STORAGE_COLUMNS}
+    FROM document_versions
+    WHERE document_id = %(document_id)s
+      AND version_number <= %(version_number)s
+      AND version_number >= (
+          SELECT max(version_number) FROM document_versions
+          WHERE document_id = %(document_id)s
+            AND version_number <= %(version_number)s
+            AND storage = 'snapshot'
+      )
+    ORDER BY version_number
+"""
+
+_reconstructions = metrics.counter("document_versions.reconstructions", "Versions rebuilt from deltas")
+_deltas_applied = metrics.counter("document_versions.deltas_applied", "Deltas applied while rebuilding versions")
+
+
+def encode_delta(base: str, content: str) -> List[DeltaOp]:
+    """Delta (à la ligne) transformant `base` en `content`"""
+    base_lines = base.splitlines(keepends=True)
+    content_lines = content.splitlines(keepends=True)
+    # autojunk (défaut): les lignes très fréquentes (lignes vides du markdown)
+    # ne servent pas d'ancres, ce qui évite un diff quadratique sur les gros documents
+    matcher = SequenceMatcher(None, base_lines, content_lines)
+
+    ops: List[DeltaOp] = []
+
+    def push(op: DeltaOp):
+        if ops and type(ops[-1]) is type(op) and (isinstance(op, str) or (ops[-1] > 0) == (op > 0)):
+            ops[-1] += op
+        else:
+            ops.append(op)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            push(sum(len(line) for line in base_lines[i1:i2]))
+            continue
+        if i2 > i1:
+            push(-sum(len(line) for line in base_lines[i1:i2]))
+        if j2 > j1:
+            push("".join(content_lines[j1:j2]))
+    return ops
+
+
+def apply_delta(base: str, delta: List[DeltaOp]) -> str:
+    """Applique un delta produit par encode_delta"""
+    parts = []
+    position = 0
+    for op in delta:
+        if isinstance(op, str):
+            parts.append(op)
+        elif op > 0:
+            parts.append(base[position:position + op])
+            position += op
+        else:
+            position -= op
+    return "".join(parts)
+
+
+def build_version(
+    content: str,
+    previous: Optional[str],
+    chain_length: int,
+    snapshot_interval: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Colonnes de stockage d'une nouvelle version
+
+    Args:
+        content: Contenu de la nouvelle version
+        previous: Contenu de la version précédente (None: première version)
+        chain_length: Versions depuis le dernier snapshot, celui-ci compris
+        snapshot_interval: Longueur maximale d'une chaîne (défaut: settings)
+
+    Returns:
+        {storage, content, delta, content_length}; delta est du JSON sérialisé
+    """
+    interval = snapshot_interval or settings.DOCUMENT_VERSION_SNAPSHOT_INTERVAL
+    row = {
+        "storage": SNAPSHOT,
+        "content": content,
+        "delta": None,
+        "content_length": len(content.encode("utf-8"))
+    }
+    if previous is None or chain_length >= interval:
+        return row
+
+    delta = json.dumps(encode_delta(previous, content), ensure_ascii=False, separators=(",", ":"))
+    if len(delta) > DELTA_MAX_RATIO * len(content):
+        return row
+    row.update(storage=DELTA, content=None, delta=delta)
+    return row
+
+
+def _delta_ops(delta) -> List[DeltaOp]:
+    # psycopg2 / psycopg 3 décodent déjà le jsonb; str si la colonne est lue en texte
+    return json.loads(delta) if isinstance(delta, str) else delta
+
+
+def replay(rows: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """
+    Rejoue une chaîne de versions triées par version_number (la première
+    doit être un snapshot) et produit (ligne, contenu) pour chacune
+    """
+    content: Optional[str] = None
+    for row in rows:
+        if row["storage"] == SNAPSHOT:
+            content = row["content"]
+        else:
+            if content is None:
+                raise ValueError(f"Version {row['version_number']} is a delta without a base snapshot")
+            content = apply_delta(content, _delta_ops(row["delta"]))
+            _deltas_applied.inc()
+        yield row, content
+
+
+def reconstruct(rows: List[Dict[str, Any]]) -> Optional[str]:
+    """Contenu de la dernière version d'une chaîne (lignes de CHAIN_SQL)"""
+    if not rows:
+        return None
+    if len(rows) > 1:
+        _reconstructions.inc()
+    content = None
+    for _, content in replay(rows):
+        pass
+    return content
+
+
+class VersionContentCache:
+    """LRU (document_id, version_number) -> contenu; les versions sont immuables"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = metrics.counter("document_versions.cache_hits", "Version contents served from cache")
+        self._misses = metrics.counter("document_versions.cache_misses", "Version contents rebuilt from the DB")
+
+    def get(self, document_id: int, version_number: int) -> Optional[str]:
+        key = (document_id, version_number)
+        with self._lock:
+            content = self._entries.get(key)
+            if content is not None:
+                self._entries.move_to_end(key)
+        (self._hits if content is not None else self._misses).inc()
+        return content
+
+    def put(self, document_id: int, version_number: int, content: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(document_id, version_number)] = content
+            self._entries.move_to_end((document_id, version_number))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, document_id: int) -> None:
+        """Oublie les versions d'un document (après compaction ou suppression)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == document_id]:
+                del self._entries[key]
+
+
+_version_cache: Optional[VersionContentCache] = None
+
+
+def get_version_cache() -> VersionContentCache:
+    """Get or create the version content cache"""
+    global _version_cache
+    if _version_cache is None:
+        _version_cache = VersionContentCache(settings.DOCUMENT_VERSION_CACHE_SIZE)
+    return _version_cache
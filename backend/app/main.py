@@ -1,6 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from app.config import settings
+from app import metrics
+from app.db.connection import PoolTimeout, close_pool
+from app.db.async_connection import init_async_pool, close_async_pool
+from app.db.pagination import InvalidCursor, NEXT_CURSOR_HEADER
+from app.db.instrumentation import QUERY_HEADERS, QueryStatsMiddleware
+from psycopg_pool import PoolTimeout as AsyncPoolTimeout
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -15,8 +22,89 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, *QUERY_HEADERS],
 )
 
+# SQL statements per request: metrics, N+1 warnings, X-DB-* debug headers
+app.add_middleware(QueryStatsMiddleware)
+
+
+@app.on_event("startup")
+def warm_up_llm():
+    """Load the Ollama model in the background so the first chat is not a cold start"""
+    from app.services.model_residency import get_residency_manager
+    residency = get_residency_manager()
+    if residency is not None:
+        residency.note_request()
+
+
+@app.on_event("startup")
+def start_version_compaction():
+    """Periodic document version compaction (when DOCUMENT_VERSION_COMPACTION_INTERVAL_SECONDS > 0)"""
+    from app.services.version_compaction import get_compaction_job
+    job = get_compaction_job()
+    if job is not None:
+        job.start()
+
+
+@app.on_event("startup")
+def start_step_partition_maintenance():
+    """Monthly step partitions ahead of time and retention (WORKFLOW_STEP_MAINTENANCE_INTERVAL_SECONDS > 0)"""
+    from app.services.step_partitions import get_partition_job
+    job = get_partition_job()
+    if job is not None:
+        job.start()
+
+
+@app.on_event("startup")
+async def open_async_pool():
+    """Open the async DB pool up front so the first requests do not pay for it"""
+    await init_async_pool()
+
+
+@app.on_event("shutdown")
+async def close_async_db_pool():
+    await close_async_pool()
+
+
+@app.on_event("shutdown")
+def flush_chat_history():
+    """Write queued chat turns, stop background jobs and close DB connections before the worker exits"""
+    from app.services.chat_session_service import get_history_writer
+    from app.services.model_residency import get_residency_manager
+    from app.services.version_compaction import get_compaction_job
+    from app.services.step_partitions import get_partition_job
+    writer = get_history_writer()
+    writer.flush()
+    writer.stop()
+    compaction = get_compaction_job()
+    if compaction is not None:
+        compaction.stop()
+    partitions = get_partition_job()
+    if partitions is not None:
+        partitions.stop()
+    residency = get_residency_manager()
+    if residency is not None:
+        residency.stop()
+    close_pool()
+
+
+@app.exception_handler(PoolTimeout)
+@app.exception_handler(AsyncPoolTimeout)
+def database_pool_timeout(request: Request, exc: Exception):
+    """Pool saturated: ask the client to retry instead of returning a 500"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(InvalidCursor)
+def invalid_pagination_cursor(request: Request, exc: InvalidCursor):
+    """Cursor not produced by this API (or tampered with): restart from the first page"""
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
 
 # Health check
 @app.get("/health")
@@ -24,6 +112,12 @@ def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def get_metrics():
+    """Snapshot of in-process counters and histograms"""
+    return metrics.registry.snapshot()
+
+
 @app.get("/")
 def root():
     return {
@@ -33,9 +127,10 @@ def root():
 
 
 # Include routers
-from app.api.v1 import projects, workflows, documents, rags, chat
+from app.api.v1 import projects, workflows, documents, rags, chat, search
 app.include_router(projects.router, prefix=f"{settings.API_V1_PREFIX}/projects", tags=["projects"])
 app.include_router(workflows.router, prefix=f"{settings.API_V1_PREFIX}/workflows", tags=["workflows"])
 app.include_router(documents.router, prefix=f"{settings.API_V1_PREFIX}/documents", tags=["documents"])
 app.include_router(rags.router, prefix=f"{settings.API_V1_PREFIX}/rags", tags=["rags"])
 app.include_router(chat.router, prefix=f"{settings.API_V1_PREFIX}/chat", tags=["chat"])
+app.include_router(search.router, prefix=f"{settings.API_V1_PREFIX}/search", tags=["search"])
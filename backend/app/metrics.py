@@ -0,0 +1,153 @@
+"""
+In-process metrics registry
+Counters and histograms shared by services, exposed as JSON on /metrics
+"""
+from typing import Callable, Dict, Any, Optional
+from collections import deque
+import math
+import threading
+
+
+def nearest_rank_percentile(sorted_samples, q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile (0-100) of an already sorted list: the smallest
+    sample with at least q% of the samples at or below it (rank ceil(q/100 * n))
+    """
+    if not sorted_samples:
+        return None
+    # Rounded first: float noise must not push an exact rank (95% of 20 = 19) to the next one
+    rank = math.ceil(round(q * len(sorted_samples) / 100, 9))
+    return sorted_samples[min(len(sorted_samples), max(1, rank)) - 1]
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": "counter", "value": self._value, "description": self.description}
+
+
+class Histogram:
+    """
+    Histogram keeping global count/sum and a bounded window of recent samples
+    for percentile estimation
+    """
+
+    def __init__(self, name: str, description: str = "", window: int = 1000):
+        self.name = name
+        self.description = description
+        self._samples = deque(maxlen=window)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: Optional[float]) -> None:
+        if value is None:
+            return
+        with self._lock:
+            self._samples.append(value)
+            self._count += 1
+            self._sum += value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentile (0-100) over the recent samples window"""
+        with self._lock:
+            samples = sorted(self._samples)
+        return nearest_rank_percentile(samples, q)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self._count, self._sum
+
+        return {
+            "type": "histogram",
+            "description": self.description,
+            "count": count,
+            "sum": total,
+            "avg": total / count if count else None,
+            "min": samples[0] if samples else None,
+            "max": samples[-1] if samples else None,
+            "p50": nearest_rank_percentile(samples, 50),
+            "p95": nearest_rank_percentile(samples, 95),
+            "p99": nearest_rank_percentile(samples, 99),
+        }
+
+
+class Gauge:
+    """Value computed on read (ratios, pool sizes...)"""
+
+    def __init__(self, name: str, fn: Callable[[], Optional[float]], description: str = ""):
+        self.name = name
+        self.description = description
+        self._fn = fn
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._fn()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"type": "gauge", "value": self._fn(), "description": self.description}
+
+
+class MetricsRegistry:
+    """Registry of named metrics (get-or-create)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, description)
+            return self._metrics[name]
+
+    def histogram(self, name: str, description: str = "", window: int = 1000) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, description, window)
+            return self._metrics[name]
+
+    def gauge(self, name: str, fn: Callable[[], Optional[float]], description: str = "") -> Gauge:
+        """Register (or replace) a gauge"""
+        with self._lock:
+            self._metrics[name] = Gauge(name, fn, description)
+            return self._metrics[name]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        return {name: metric.snapshot() for name, metric in sorted(metrics.items())}
+
+
+registry = MetricsRegistry()
+
+
+def counter(name: str, description: str = "") -> Counter:
+    """Get or create a counter in the global registry"""
+    return registry.counter(name, description)
+
+
+def histogram(name: str, description: str = "", window: int = 1000) -> Histogram:
+    """Get or create a histogram in the global registry"""
+    return registry.histogram(name, description, window)
+
+
+def gauge(name: str, fn: Callable[[], Optional[float]], description: str = "") -> Gauge:
+    """Register a gauge in the global registry"""
+    return registry.gauge(name, fn, description)
@@ -3,6 +3,7 @@ Pydantic schemas for chat-related requests and responses
 """
 from pydantic import BaseModel, Field
 from typing import Optional, List
+from datetime import datetime
 
 
 class ChatRequest(BaseModel):
@@ -10,6 +11,18 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, description="User message to send to the LLM")
     rag_id: Optional[int] = Field(None, description="Optional RAG collection ID for context retrieval")
     top_k: Optional[int] = Field(None, description="Number of documents to retrieve (default from config)")
+    provider: Optional[str] = Field(None, description="Pin the request to an LLM provider (default: fastest healthy)")
+    session_id: Optional[int] = Field(None, description="Chat session whose history is used and extended")
+    compress_context: Optional[bool] = Field(None, description="Keep only the retrieved sentences closest to the question (default from config)")
+
+
+class ChatBatchRequest(BaseModel):
+    """Request model for batch question answering against a RAG"""
+    rag_id: int = Field(..., description="RAG collection ID for context retrieval")
+    questions: List[str] = Field(..., min_length=1, description="Questions to answer")
+    top_k: Optional[int] = Field(None, description="Number of documents to retrieve per question (default from config)")
+    provider: Optional[str] = Field(None, description="Pin generations to an LLM provider (default: fastest healthy)")
+    concurrency: Optional[int] = Field(None, ge=1, description="Max concurrent LLM generations (default from config)")
 
 
 class DocumentUsed(BaseModel):
@@ -18,15 +31,76 @@ class DocumentUsed(BaseModel):
     score: float = Field(..., description="Relevance score")
 
 
+class ChatTimings(BaseModel):
+    """Per-stage latency breakdown of a chat request (milliseconds)"""
+    session_load_ms: Optional[float] = Field(None, description="Loading chat session summary and turns")
+    rag_lookup_ms: Optional[float] = Field(None, description="RAG existence lookup")
+    embed_ms: Optional[float] = Field(None, description="Query embedding")
+    cache_lookup_ms: Optional[float] = Field(None, description="Semantic answer cache lookup")
+    vector_search_ms: Optional[float] = Field(None, description="pgvector similarity search")
+    compress_ms: Optional[float] = Field(None, description="Extractive context compression")
+    compression_ratio: Optional[float] = Field(None, description="Retrieved context characters before / after compression")
+    filter_ms: Optional[float] = Field(None, description="Score filtering and context packing")
+    prompt_render_ms: Optional[float] = Field(None, description="Prompt template rendering")
+    ttft_ms: Optional[float] = Field(None, description="Time to first generated token")
+    generation_ms: Optional[float] = Field(None, description="Full LLM generation")
+    prompt_tokens: Optional[int] = Field(None, description="Prompt tokens (as reported by the provider)")
+    completion_tokens: Optional[int] = Field(None, description="Completion tokens")
+    tokens_per_sec: Optional[float] = Field(None, description="Decode throughput (completion tokens / post-TTFT time)")
+    total_ms: Optional[float] = Field(None, description="End-to-end service time")
+
+
 class ChatResponse(BaseModel):
     """Response model for chat messages"""
     response: str = Field(..., description="LLM generated response")
     duration_ms: float = Field(..., description="Time taken to generate response in milliseconds")
     timestamp: str = Field(..., description="ISO timestamp of response generation")
     model: str = Field(..., description="Model used for generation")
+    provider: Optional[str] = Field(None, description="LLM provider that served the request")
     rag_used: bool = Field(default=False, description="Whether RAG was used")
     documents_used: Optional[List[DocumentUsed]] = Field(None, description="Documents retrieved for context")
     retrieval_time_ms: Optional[float] = Field(None, description="Time spent retrieving documents")
+    coalesced: bool = Field(default=False, description="Whether the response was shared with an identical in-flight request")
+    cached: bool = Field(default=False, description="Whether the answer was reused from the semantic answer cache")
+    cache_similarity: Optional[float] = Field(None, description="Cosine similarity with the cached question")
+    session_id: Optional[int] = Field(None, description="Chat session the turn was recorded in")
+    timings: Optional[ChatTimings] = Field(None, description="Per-stage latency breakdown")
+
+
+# --- Chat Sessions ---
+
+class ChatSessionCreate(BaseModel):
+    """Request model for creating a chat session"""
+    rag_id: Optional[int] = Field(None, description="Default RAG collection for the session")
+    title: Optional[str] = Field(None, max_length=255)
+
+
+class ChatSession(BaseModel):
+    id: int
+    rag_id: Optional[int]
+    title: Optional[str]
+    summary: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ChatMessage(BaseModel):
+    id: int
+    role: str
+    content: str
+    token_count: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ChatSessionWithMessages(ChatSession):
+    """Chat session with its most recent messages"""
+    messages: List[ChatMessage] = []
 
 
 class ChatErrorResponse(BaseModel):
@@ -0,0 +1,26 @@
+from enum import Enum
+from typing import Annotated, Any, Union
+
+from pydantic import Discriminator, Tag
+
+
+class ListView(str, Enum):
+    """Projection of list endpoints"""
+    FULL = "full"  # Every column, including bodies (content, raw_data)
+    SUMMARY = "summary"  # Light columns only, bodies replaced by their size
+
+
+def list_view_item(full: type, summary: type, size_field: str) -> Any:
+    """
+    Item type of a list endpoint with a `view` parameter: a union tagged by
+    the projection, told apart by the summary's size column (size_field),
+    so each row is validated against the model of the view it was read with
+    """
+    def view_of(item: Any) -> str:
+        has_size = size_field in item if isinstance(item, dict) else hasattr(item, size_field)
+        return ListView.SUMMARY.value if has_size else ListView.FULL.value
+
+    return Annotated[
+        Union[Annotated[full, Tag(ListView.FULL.value)], Annotated[summary, Tag(ListView.SUMMARY.value)]],
+        Discriminator(view_of)
+    ]
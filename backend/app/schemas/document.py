@@ -3,6 +3,8 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
+from app.schemas.common import list_view_item
+
 
 class DocumentStatus(str, Enum):
     """Document status workflow"""
@@ -68,6 +70,33 @@ class Document(BaseModel):
         from_attributes = True
 
 
+class DocumentSummary(BaseModel):
+    """Document without its content (list views)"""
+    id: int
+    project_id: Optional[int]
+    rag_id: Optional[int]
+    workflow_id: Optional[int]
+    title: str
+    content_length: int = Field(..., description="Content size in bytes")
+    content_type: str
+    status: str
+    is_indexed: bool
+    metadata: Optional[Dict[str, Any]]
+    version: int
+    created_at: datetime
+    updated_at: datetime
+    validated_at: Optional[datetime]
+    last_indexed_at: Optional[datetime]
+    chunks_count: int
+
+    class Config:
+        from_attributes = True
+
+
+# Item of document lists (view=full: Document, view=summary: DocumentSummary)
+DocumentListItem = list_view_item(Document, DocumentSummary, "content_length")
+
+
 # --- Document Version Models ---
 
 class DocumentVersionBase(BaseModel):
@@ -92,6 +121,24 @@ class DocumentVersion(BaseModel):
         from_attributes = True
 
 
+class DocumentVersionSummary(BaseModel):
+    """Document version without its content"""
+    id: int
+    document_id: int
+    content_length: int = Field(..., description="Content size in bytes")
+    storage: str = Field("snapshot", description="snapshot (full copy) or delta (against the previous version)")
+    version_number: int
+    change_summary: Optional[str]
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# Item of version lists (view=full: DocumentVersion, view=summary: DocumentVersionSummary)
+DocumentVersionListItem = list_view_item(DocumentVersion, DocumentVersionSummary, "content_length")
+
+
 # --- Document Generation Request ---
 
 class GenerateDocumentRequest(BaseModel):
@@ -106,4 +153,29 @@ class GenerateDocumentRequest(BaseModel):
 
 class DocumentWithVersions(Document):
     """Document with all its versions"""
-    versions: list[DocumentVersion] = []
+    versions: list[DocumentVersionListItem] = []
+
+
+# --- Version storage ---
+
+class VersionStorageReport(BaseModel):
+    """Logical size of stored versions vs bytes actually stored"""
+    versions: int
+    snapshots: int
+    deltas: int
+    logical_bytes: int = Field(..., description="Sum of the full size of every version")
+    stored_bytes: int = Field(..., description="Bytes stored (snapshots + deltas, after TOAST compression)")
+    saved_bytes: int
+    compression_ratio: Optional[float] = Field(None, description="logical_bytes / stored_bytes")
+
+
+class VersionCompactionResult(BaseModel):
+    """Totals of a compaction pass"""
+    documents: int
+    pruned: int
+    rewritten: int
+    bytes_before: int
+    bytes_after: int
+    bytes_saved: int
+    errors: int
+    duration_ms: float
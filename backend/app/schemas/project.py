@@ -24,3 +24,21 @@ class Project(ProjectBase):
 
     class Config:
         from_attributes = True
+
+
+class ProjectStats(BaseModel):
+    project_id: int
+    workflow_count: int = 0
+    total_documents: int = 0
+    draft_count: int = 0
+    validated_count: int = 0
+    published_count: int = 0
+    indexed_count: int = 0
+    total_chunks: int = 0
+
+
+class ProjectStatsBatchItem(BaseModel):
+    """Stats d'un projet demandé par /projects/stats (found=False: projet inexistant)"""
+    project_id: int
+    found: bool
+    stats: Optional[ProjectStats] = None
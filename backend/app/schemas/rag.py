@@ -8,6 +8,8 @@ from datetime import datetime
 class RAGBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=255)
     description: Optional[str] = None
+    # Cosine similarity above which a cached answer is reused (None = global default)
+    semantic_cache_threshold: Optional[float] = Field(None, ge=0, le=1)
 
 
 class RAGCreate(RAGBase):
@@ -17,10 +19,12 @@ class RAGCreate(RAGBase):
 class RAGUpdate(BaseModel):
     name: Optional[str] = Field(None, min_length=1, max_length=255)
     description: Optional[str] = None
+    semantic_cache_threshold: Optional[float] = Field(None, ge=0, le=1)
 
 
 class RAG(RAGBase):
     id: int
+    index_version: int = 0
     created_at: datetime
     updated_at: datetime
 
@@ -44,6 +48,7 @@ class UploadedFile(BaseModel):
     filename: str
     file_type: str
     file_size: int
+    blob_sha256: Optional[str] = None
     mime_type: Optional[str]
     uploaded_at: datetime
     metadata: Optional[Dict[str, Any]]
@@ -59,3 +64,10 @@ class RAGStats(BaseModel):
     file_count: int = 0
     total_chunks: int = 0
     indexed_documents: int = 0
+
+
+class RAGStatsBatchItem(BaseModel):
+    """Stats of one RAG requested from /rags/stats (found=False: no such RAG)"""
+    rag_id: int
+    found: bool
+    stats: Optional[RAGStats] = None
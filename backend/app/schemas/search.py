@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+from enum import Enum
+
+
+class SearchScope(str, Enum):
+    """Tables searched by /search"""
+    DOCUMENTS = "documents"
+    WORKFLOWS = "workflows"
+
+
+class SearchHit(BaseModel):
+    type: str  # document, workflow
+    id: int
+    project_id: Optional[int]
+    rag_id: Optional[int]
+    title: str
+    status: Optional[str]
+    updated_at: Optional[datetime]
+    rank: float
+    # Excerpts of the body, matches wrapped in <mark></mark> (text is not HTML-escaped)
+    headline: str
+
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
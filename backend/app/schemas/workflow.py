@@ -1,6 +1,9 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
+from enum import Enum
+
+from app.schemas.common import list_view_item
 
 
 class WorkflowStateBase(BaseModel):
@@ -47,6 +50,55 @@ class Workflow(WorkflowBase):
         from_attributes = True
 
 
+class WorkflowSummary(BaseModel):
+    """Workflow without raw_data (list views)"""
+    id: int
+    project_id: int
+    name: str
+    description: Optional[str] = None
+    raw_data_size: int = Field(..., description="Stored raw_data size in bytes")
+    workflow_hash: str
+    url: Optional[str] = None
+    domain: Optional[str] = None
+    duration_ms: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# Item of workflow lists (view=full: Workflow, view=summary: WorkflowSummary)
+WorkflowListItem = list_view_item(Workflow, WorkflowSummary, "raw_data_size")
+
+
 class WorkflowWithDetails(Workflow):
     states: List[WorkflowStateBase] = []
     actions: List[WorkflowActionBase] = []
+
+
+class StepKind(str, Enum):
+    """Captured step tables"""
+    ACTION = "action"
+    STATE = "state"
+
+
+class WorkflowStepQuery(BaseModel):
+    """JSON filter over action_data / state_data (contains and/or path required)"""
+    kind: StepKind = StepKind.ACTION
+    # Containment: steps whose data includes this JSON, e.g. {"selector": "#submit"}
+    contains: Optional[Union[Dict[str, Any], List[Any]]] = None
+    # jsonpath that must match, e.g. '$.form ? (@.id == "login")'
+    path: Optional[str] = Field(None, min_length=1, max_length=1000)
+    step_type: Optional[str] = Field(None, description="action_type / state_type")
+    project_id: Optional[int] = None
+
+
+class WorkflowStep(BaseModel):
+    id: int
+    workflow_id: int
+    kind: StepKind
+    step_type: str
+    data: Dict[str, Any]
+    sequence_order: int
+    timestamp: datetime
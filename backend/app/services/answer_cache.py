@@ -0,0 +1,149 @@
+"""
+Semantic Answer Cache
+Reuses the generated answer of a previous RAG question whose embedding is
+close enough to the new one, skipping LLM generation. Entries are scoped to a
+RAG and to its index_version, so re-indexing or deleting documents
+invalidates them.
+"""
+from typing import Dict, Any, Hashable, Optional, Tuple
+from collections import OrderedDict
+import itertools
+import threading
+import time
+
+import numpy as np
+
+from app.config import settings
+from app import metrics
+
+# Global answer cache (initialized lazily)
+_answer_cache: Optional["SemanticAnswerCache"] = None
+
+
+class _RagEntries:
+    """Cached answers of one RAG, for a single index_version"""
+
+    def __init__(self, index_version: int):
+        self.index_version = index_version
+        # entry id -> (embedding, variant, answer, stored_at), in LRU order
+        self.entries: "OrderedDict[int, Tuple[np.ndarray, Hashable, Dict[str, Any], float]]" = OrderedDict()
+
+
+class SemanticAnswerCache:
+    """
+    In-memory, per-RAG LRU of (question embedding -> answer)
+
+    Lookups compare the normalized query embedding against the cached ones
+    (cosine similarity) and return the best match above the threshold. The
+    variant (top_k, provider...) must match exactly.
+    """
+
+    def __init__(self, max_entries_per_rag: int, ttl_seconds: float):
+        self.max_entries_per_rag = max_entries_per_rag
+        self.ttl_seconds = ttl_seconds
+        self._rags: Dict[int, _RagEntries] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._hits = metrics.counter("answer_cache.hits", "Chat answers served from the semantic cache")
+        self._misses = metrics.counter("answer_cache.misses", "Cacheable chat requests that missed")
+        self._invalidations = metrics.counter(
+            "answer_cache.invalidations", "RAG caches dropped after an index change"
+        )
+        metrics.gauge("answer_cache.hit_rate", self.hit_rate, "Hits / (hits + misses)")
+        metrics.gauge("answer_cache.entries", self.size, "Cached answers across RAGs")
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _entries_for(self, rag_id: int, index_version: int) -> _RagEntries:
+        """Entries of a RAG, dropped if they belong to an older index version (lock held)"""
+        rag_entries = self._rags.get(rag_id)
+        if rag_entries is None or rag_entries.index_version != index_version:
+            if rag_entries is not None:
+                self._invalidations.inc()
+            rag_entries = _RagEntries(index_version)
+            self._rags[rag_id] = rag_entries
+        return rag_entries
+
+    def lookup(
+        self,
+        rag_id: int,
+        index_version: int,
+        embedding,
+        threshold: float,
+        variant: Hashable = None
+    ) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Best cached answer for a question embedding
+
+        Returns:
+            (answer, similarity) or None on a miss
+        """
+        query = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            rag_entries = self._entries_for(rag_id, index_version)
+            entries = rag_entries.entries
+
+            expired = [key for key, entry in entries.items() if now - entry[3] > self.ttl_seconds]
+            for key in expired:
+                del entries[key]
+
+            candidates = [(key, entry) for key, entry in entries.items() if entry[1] == variant]
+            if candidates:
+                similarities = np.stack([entry[0] for _, entry in candidates]) @ query
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+                if similarity >= threshold:
+                    key, entry = candidates[best]
+                    entries.move_to_end(key)
+                    self._hits.inc()
+                    return dict(entry[2]), similarity
+
+        self._misses.inc()
+        return None
+
+    def store(
+        self,
+        rag_id: int,
+        index_version: int,
+        embedding,
+        answer: Dict[str, Any],
+        variant: Hashable = None
+    ) -> None:
+        """Cache an answer (evicts the least recently used entry of the RAG when full)"""
+        vector = self._normalize(embedding)
+
+        with self._lock:
+            entries = self._entries_for(rag_id, index_version).entries
+            entries[next(self._ids)] = (vector, variant, dict(answer), time.monotonic())
+            while len(entries) > self.max_entries_per_rag:
+                entries.popitem(last=False)
+
+    def hit_rate(self) -> Optional[float]:
+        total = self._hits.value + self._misses.value
+        return round(self._hits.value / total, 4) if total else None
+
+    def size(self) -> int:
+        with self._lock:
+            return sum(len(rag_entries.entries) for rag_entries in self._rags.values())
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Get or create the answer cache (None when disabled)"""
+    global _answer_cache
+
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+
+    if _answer_cache is None:
+        _answer_cache = SemanticAnswerCache(
+            max_entries_per_rag=settings.ANSWER_CACHE_MAX_ENTRIES_PER_RAG,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+        )
+
+    return _answer_cache
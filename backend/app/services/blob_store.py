@@ -0,0 +1,263 @@
+"""
+Blob Store
+Content-addressed storage for uploaded files: a blob is identified by the
+SHA-256 of its bytes, so identical uploads are stored once. uploaded_files
+rows only keep the digest (blob_sha256).
+
+Backends implement BlobStore; LocalBlobStore keeps blobs on the local
+filesystem under BLOB_STORE_PATH/ab/cd/<sha256>.
+
+Maintenance (from backend/):
+    python -m app.services.blob_store migrate   # move BYTEA rows to the store
+    python -m app.services.blob_store gc        # delete unreferenced blobs
+"""
+from typing import BinaryIO, Dict, Any, Iterable, Iterator, Optional, Set
+from abc import ABC, abstractmethod
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from app.config import settings
+from app.db.queries import rags as rag_queries
+from app import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global blob store (initialized lazily)
+_blob_store: Optional["BlobStore"] = None
+
+CHUNK_SIZE = 1024 * 1024
+
+_writes = metrics.counter("blob_store.writes", "Blobs written")
+_dedup_hits = metrics.counter("blob_store.dedup_hits", "Uploads whose content was already stored")
+_bytes_written = metrics.counter("blob_store.bytes_written", "Bytes written to the blob store")
+
+
+class BlobNotFound(FileNotFoundError):
+    """No blob stored under this digest"""
+
+
+class BlobStore(ABC):
+    """Content-addressed blob storage backend"""
+
+    @abstractmethod
+    def put(self, chunks: Iterable[bytes]) -> Dict[str, Any]:
+        """
+        Store a stream of bytes, hashed while written
+
+        Returns:
+            {sha256, size, deduplicated}; deduplicated: content was already stored
+        """
+
+    @abstractmethod
+    def open(self, sha256: str) -> BinaryIO:
+        """Binary file object for reading a blob (raises BlobNotFound)"""
+
+    @abstractmethod
+    def size(self, sha256: str) -> int:
+        """Blob size in bytes (raises BlobNotFound)"""
+
+    @abstractmethod
+    def exists(self, sha256: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, sha256: str) -> bool:
+        ...
+
+    @abstractmethod
+    def iter_blobs(self) -> Iterator[str]:
+        """Digests of every stored blob"""
+
+    @abstractmethod
+    def modified_at(self, sha256: str) -> float:
+        """Last write or dedup hit (unix time), used by the GC grace period"""
+
+    def local_path(self, sha256: str) -> Optional[str]:
+        """Filesystem path when the backend has one (lets downloads use sendfile), else None"""
+        return None
+
+    def put_file(self, fileobj: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+        """Store a file object from its current position, in chunks"""
+        return self.put(iter(lambda: fileobj.read(chunk_size), b""))
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blobs on the local filesystem, sharded by digest prefix
+
+    Writes go to a temporary file in the same filesystem, then are renamed
+    into place: a blob is either complete or absent, and concurrent uploads
+    of the same content are harmless.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._tmp = os.path.join(root, "tmp")
+        os.makedirs(self._tmp, exist_ok=True)
+
+    def _path(self, sha256: str) -> str:
+        if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+            raise ValueError(f"Invalid blob digest: {sha256!r}")
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def put(self, chunks: Iterable[bytes]) -> Dict[str, Any]:
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+
+            sha256 = digest.hexdigest()
+            path = self._path(sha256)
+            if os.path.exists(path):
+                # Already stored: refresh mtime so a concurrent GC keeps it
+                os.utime(path)
+                _dedup_hits.inc()
+                return {'sha256': sha256, 'size': size, 'deduplicated': True}
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+            tmp_path = None
+            _writes.inc()
+            _bytes_written.inc(size)
+            return {'sha256': sha256, 'size': size, 'deduplicated': False}
+        finally:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def open(self, sha256: str) -> BinaryIO:
+        try:
+            return open(self._path(sha256), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(sha256)
+
+    def size(self, sha256: str) -> int:
+        try:
+            return os.path.getsize(self._path(sha256))
+        except FileNotFoundError:
+            raise BlobNotFound(sha256)
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def delete(self, sha256: str) -> bool:
+        try:
+            os.unlink(self._path(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_blobs(self) -> Iterator[str]:
+        for dirpath, _, filenames in os.walk(self.root):
+            if dirpath.startswith(self._tmp):
+                continue
+            for filename in filenames:
+                if len(filename) == 64:
+                    yield filename
+
+    def modified_at(self, sha256: str) -> float:
+        return os.path.getmtime(self._path(sha256))
+
+    def local_path(self, sha256: str) -> Optional[str]:
+        return self._path(sha256)
+
+
+_BACKENDS = {
+    "local": lambda: LocalBlobStore(settings.BLOB_STORE_PATH),
+}
+
+
+def get_blob_store() -> BlobStore:
+    """Get or create the configured blob store"""
+    global _blob_store
+
+    if _blob_store is None:
+        backend = _BACKENDS.get(settings.BLOB_STORE_BACKEND)
+        if backend is None:
+            raise ValueError(f"Unknown BLOB_STORE_BACKEND: {settings.BLOB_STORE_BACKEND}")
+        _blob_store = backend()
+
+    return _blob_store
+
+
+# ==================== MAINTENANCE ====================
+
+def migrate_bytea_blobs(batch_size: int = 20) -> Dict[str, Any]:
+    """
+    Move uploaded_files.file_content (BYTEA) rows into the blob store
+
+    Each row is read in CHUNK_SIZE slices (never whole in memory), written
+    to the store, then its file_content is cleared. Batches commit
+    separately, so the migration can be interrupted and resumed.
+    """
+    store = get_blob_store()
+    totals = {'files': 0, 'bytes': 0, 'deduplicated': 0}
+    while True:
+        migrated = rag_queries.migrate_uploaded_file_batch(store, batch_size, CHUNK_SIZE)
+        if not migrated:
+            break
+        for info in migrated:
+            totals['files'] += 1
+            totals['bytes'] += info['size']
+            totals['deduplicated'] += int(info['deduplicated'])
+        logger.info(f"Migrated {totals['files']} uploaded files to the blob store")
+    return totals
+
+
+def collect_garbage(grace_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Delete blobs no uploaded_files row references
+
+    Blobs written or hit by dedup within `grace_seconds` are kept: their
+    upload may not have committed its row yet.
+    """
+    grace_seconds = settings.BLOB_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    store = get_blob_store()
+    referenced: Set[str] = set(rag_queries.get_referenced_blob_digests())
+    cutoff = time.time() - grace_seconds
+
+    totals = {'blobs': 0, 'deleted': 0, 'bytes_freed': 0}
+    for sha256 in list(store.iter_blobs()):
+        totals['blobs'] += 1
+        if sha256 in referenced:
+            continue
+        try:
+            if store.modified_at(sha256) > cutoff:
+                continue
+            size = store.size(sha256)
+        except FileNotFoundError:
+            continue
+        if store.delete(sha256):
+            totals['deleted'] += 1
+            totals['bytes_freed'] += size
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Blob store maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="Move BYTEA uploaded files to the blob store")
+    migrate.add_argument("--batch-size", type=int, default=20)
+    gc = subparsers.add_parser("gc", help="Delete blobs no uploaded file references")
+    gc.add_argument("--grace-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "migrate":
+        print(migrate_bytea_blobs(args.batch_size))
+    else:
+        print(collect_garbage(args.grace_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Chat Session Service
+Server-side conversation history: turns are persisted asynchronously in
+batches, and older turns are compressed into a running summary once the
+unsummarized history exceeds a token threshold
+"""
+from typing import Dict, Any, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+import time
+
+import psycopg2
+
+from app.config import settings
+from app.db.queries import chat_sessions as session_queries
+from app import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global history writer (started lazily)
+_history_writer: Optional["ChatHistoryWriter"] = None
+
+SUMMARY_PROMPT = """Tu résumes une conversation entre un utilisateur et un assistant.
+Produis un résumé concis en français qui conserve les faits, décisions, questions
+en suspens et préférences exprimées. Ne mentionne pas que c'est un résumé.
+
+{previous}CONVERSATION:
+{turns}
+
+RÉSUMÉ:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def format_turns(messages: List[Dict[str, Any]]) -> str:
+    """Render turns as plain text for prompts"""
+    labels = {'user': 'UTILISATEUR', 'assistant': 'ASSISTANT'}
+    return "\n".join(
+        f"{labels.get(m['role'], m['role'].upper())}: {m['content']}" for m in messages
+    )
+
+
+class ChatHistoryWriter:
+    """
+    Background writer for chat turns
+
+    The response path only enqueues; a daemon thread drains the queue and
+    inserts turns in multi-row batches. Summary compression of the sessions a
+    batch touched is an LLM call: it runs on a separate pool
+    (CHAT_SUMMARY_CONCURRENCY threads) so it never holds up writes or flush(),
+    at most once at a time per session. Turns not yet flushed are kept in
+    memory so the next request of a session still sees them.
+    """
+
+    def __init__(self):
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._pending: Dict[int, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._summarizer: Optional[ThreadPoolExecutor] = None
+        # Sessions queued or being compressed, and those written to meanwhile
+        self._compressing: Set[int] = set()
+        self._recompress: Set[int] = set()
+        self._batch_size = metrics.histogram("chat_history.batch_size", "Turns written per batch")
+        self._write_errors = metrics.counter("chat_history.write_errors", "Failed history batches")
+        self._summaries = metrics.counter("chat_history.summaries", "Summary compressions performed")
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, session_id: int, role: str, content: str) -> None:
+        """Queue a turn for persistence (non-blocking)"""
+        message = {
+            'session_id': session_id,
+            'role': role,
+            'content': content,
+            'token_count': estimate_tokens(content)
+        }
+        with self._lock:
+            self._pending.setdefault(session_id, []).append(message)
+        self._queue.put(message)
+        self.start()
+
+    def pending_messages(self, session_id: int) -> List[Dict[str, Any]]:
+        """Turns of a session that are queued but not yet written"""
+        with self._lock:
+            return list(self._pending.get(session_id, []))
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Block until everything queued so far has been written"""
+        done = threading.Event()
+        self._queue.put({'flush': done})
+        self.start()
+        done.wait(timeout)
+
+    def stop(self) -> None:
+        """Drop compressions not started yet (they run again after the session's next write)"""
+        with self._lock:
+            summarizer, self._summarizer = self._summarizer, None
+            self._compressing.clear()
+            self._recompress.clear()
+        if summarizer is not None:
+            summarizer.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            batch, flushes = [], []
+            # Drain whatever else is already waiting, up to the batch size
+            while True:
+                if 'flush' in item:
+                    flushes.append(item['flush'])
+                else:
+                    batch.append(item)
+                if len(batch) >= settings.CHAT_HISTORY_BATCH_SIZE:
+                    break
+                try:
+                    item = self._queue.get(timeout=settings.CHAT_HISTORY_FLUSH_INTERVAL_MS / 1000)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write(batch)
+            for done in flushes:
+                done.set()
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Write a batch; its turns leave the pending list only once stored
+
+        While the database is unreachable the batch is retried, waiting twice
+        as long each time (up to CHAT_HISTORY_RETRY_MAX_SECONDS). A batch the
+        database rejects is written turn by turn, so only the turns it
+        rejects are lost.
+        """
+        delay = settings.CHAT_HISTORY_FLUSH_INTERVAL_MS / 1000
+        while True:
+            try:
+                session_ids = session_queries.add_messages(batch)
+                self._batch_size.observe(len(batch))
+                break
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                self._write_errors.inc()
+                logger.warning(f"Failed to write {len(batch)} chat turns, retrying in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+                delay = min(delay * 2, settings.CHAT_HISTORY_RETRY_MAX_SECONDS)
+            except Exception as e:
+                self._write_errors.inc()
+                if len(batch) == 1:
+                    logger.error(f"Dropping chat turn of session {batch[0]['session_id']}: {str(e)}")
+                    session_ids = []
+                    break
+                logger.warning(f"Failed to write {len(batch)} chat turns, writing them one by one: {str(e)}")
+                for message in batch:
+                    self._write([message])
+                return
+
+        with self._lock:
+            for message in batch:
+                pending = self._pending.get(message['session_id'])
+                if pending:
+                    pending.remove(message)
+                    if not pending:
+                        del self._pending[message['session_id']]
+
+        for session_id in session_ids:
+            self._schedule_compression(session_id)
+
+    def _schedule_compression(self, session_id: int) -> None:
+        with self._lock:
+            if session_id in self._compressing:
+                # Already queued or running: check again once it is done
+                self._recompress.add(session_id)
+                return
+            if self._summarizer is None:
+                self._summarizer = ThreadPoolExecutor(
+                    max_workers=settings.CHAT_SUMMARY_CONCURRENCY, thread_name_prefix="chat-summary"
+                )
+            self._compressing.add(session_id)
+            self._summarizer.submit(self._compress, session_id)
+
+    def _compress(self, session_id: int) -> None:
+        try:
+            if ChatSessionService.compress_if_needed(session_id):
+                self._summaries.inc()
+        except Exception as e:
+            logger.error(f"Failed to summarize chat session {session_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._compressing.discard(session_id)
+                again = session_id in self._recompress
+                self._recompress.discard(session_id)
+            if again:
+                self._schedule_compression(session_id)
+
+
+def get_history_writer() -> ChatHistoryWriter:
+    """Get or create the chat history writer"""
+    global _history_writer
+
+    if _history_writer is None:
+        _history_writer = ChatHistoryWriter()
+
+    return _history_writer
+
+
+class ChatSessionService:
+    """Service for server-side chat sessions"""
+
+    @staticmethod
+    def load_context(session_id: int) -> Dict[str, Any]:
+        """
+        Load what goes into the prompt for a session: the running summary
+        and the recent (unsummarized) turns, including turns still queued
+
+        Raises:
+            ValueError: if the session does not exist
+        """
+        # Pending turns are read before the rows: a turn written in between is in
+        # both and skipped by id (as is one already folded into the summary)
+        pending = get_history_writer().pending_messages(session_id)
+        session = session_queries.get_session_context(session_id)
+        if not session:
+            raise ValueError(f"Chat session {session_id} not found")
+
+        stored = session.pop('messages')
+        stored_ids = {message['id'] for message in stored}
+        recent = stored + [
+            message for message in pending
+            if message.get('id') is None
+            or (message['id'] not in stored_ids and message['id'] > session['summarized_until_id'])
+        ]
+
+        # Until the background summarizer catches up, never send more than the budget
+        budget = settings.CHAT_SUMMARY_TRIGGER_TOKENS
+        kept, used = [], 0
+        for message in reversed(recent):
+            used += message['token_count']
+            if kept and used > budget:
+                break
+            kept.append(message)
+
+        session['recent_messages'] = list(reversed(kept))
+        return session
+
+    @staticmethod
+    def record_turn(session_id: int, user_message: str, assistant_message: str) -> None:
+        """Persist a question/answer pair off the response path"""
+        writer = get_history_writer()
+        writer.enqueue(session_id, 'user', user_message)
+        writer.enqueue(session_id, 'assistant', assistant_message)
+
+    @staticmethod
+    def compress_if_needed(session_id: int) -> bool:
+        """
+        Fold older turns into the running summary once the unsummarized
+        history exceeds CHAT_SUMMARY_TRIGGER_TOKENS. The last
+        CHAT_RECENT_MESSAGES turns are always kept verbatim.
+
+        Returns:
+            True if a new summary was written
+        """
+        session = session_queries.get_session_context(session_id)
+        if not session:
+            return False
+
+        messages = session['messages']
+        total_tokens = sum(m['token_count'] for m in messages)
+        if total_tokens <= settings.CHAT_SUMMARY_TRIGGER_TOKENS:
+            return False
+
+        to_fold = messages[:-settings.CHAT_RECENT_MESSAGES] if settings.CHAT_RECENT_MESSAGES else messages
+        if not to_fold:
+            return False
+
+        # Import here to avoid loading the LLM router for sessions that never compress
+        from app.services.llm_providers import get_llm_router
+
+        previous = f"RÉSUMÉ PRÉCÉDENT:\n{session['summary']}\n\n" if session['summary'] else ""
+        prompt = SUMMARY_PROMPT.format(previous=previous, turns=format_turns(to_fold))
+        generation = get_llm_router().generate(
+            prompt,
+            generation_kwargs={"max_tokens": settings.CHAT_SUMMARY_MAX_TOKENS, "temperature": 0.2}
+        )
+
+        summarized_until_id = to_fold[-1]['id']
+        updated = session_queries.update_session_summary(
+            session_id, generation["text"].strip(), summarized_until_id
+        )
+        if updated:
+            logger.info(
+                f"Compressed {len(to_fold)} turns of chat session {session_id} "
+                f"(~{sum(m['token_count'] for m in to_fold)} tokens) into summary"
+            )
+        return updated
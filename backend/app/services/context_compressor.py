@@ -0,0 +1,119 @@
+"""
+Extractive Context Compressor
+Shrinks retrieved chunks to the sentences most similar to the query (plus a
+little neighbor context) before they are put in the prompt
+"""
+from typing import Dict, Any, List, Optional, Tuple
+import re
+
+import numpy as np
+
+from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Sentence boundaries: end punctuation followed by whitespace, or line breaks
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+# Marks text skipped between kept sentences of a chunk
+GAP_MARKER = " [...] "
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a chunk into sentences (empty fragments dropped)"""
+    return [sentence.strip() for sentence in _SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+class ContextCompressor:
+    """Extractive compression of search results against a query"""
+
+    @staticmethod
+    def compress(
+        query: str,
+        results: List[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None,
+        top_sentences: Optional[int] = None,
+        neighbors: Optional[int] = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Keep the top sentences of the retrieved chunks
+
+        All sentences (and the query, when no embedding is given) are embedded
+        in one batched pass. The `top_sentences` best-scoring sentences across
+        all chunks are kept together with `neighbors` sentences on each side,
+        in their original order. Chunks left without any sentence are dropped.
+
+        Args:
+            query: User query
+            results: Search results (content, score, metadata)
+            query_embedding: Query vector if already computed
+            top_sentences: Sentences to keep (default CONTEXT_COMPRESSION_TOP_SENTENCES)
+            neighbors: Neighbor sentences kept around each one (default CONTEXT_COMPRESSION_NEIGHBORS)
+
+        Returns:
+            (compressed results, stats with chars_before, chars_after and compression_ratio)
+        """
+        # Import here to avoid loading the embedding stack for uncompressed requests
+        from app.services.haystack_service import HaystackService
+
+        top_sentences = top_sentences if top_sentences is not None else settings.CONTEXT_COMPRESSION_TOP_SENTENCES
+        neighbors = neighbors if neighbors is not None else settings.CONTEXT_COMPRESSION_NEIGHBORS
+
+        chunk_sentences = [split_sentences(result['content']) for result in results]
+        sentences = [sentence for chunk in chunk_sentences for sentence in chunk]
+        chars_before = sum(len(result['content']) for result in results)
+
+        if not sentences or len(sentences) <= top_sentences:
+            # Nothing to gain: keep the chunks as they are
+            return results, {
+                'chars_before': chars_before,
+                'chars_after': chars_before,
+                'compression_ratio': 1.0
+            }
+
+        texts = sentences if query_embedding is not None else [query] + sentences
+        embeddings = np.asarray(HaystackService.embed_queries(texts), dtype=np.float32)
+        if query_embedding is None:
+            query_vector, sentence_vectors = embeddings[0], embeddings[1:]
+        else:
+            query_vector, sentence_vectors = np.asarray(query_embedding, dtype=np.float32), embeddings
+
+        scores = _normalize_rows(sentence_vectors) @ _normalize_rows(query_vector)
+        selected = set(np.argsort(-scores)[:top_sentences].tolist())
+
+        compressed = []
+        offset = 0
+        for result, chunk in zip(results, chunk_sentences):
+            keep = set()
+            for idx in range(len(chunk)):
+                if offset + idx in selected:
+                    keep.update(range(max(0, idx - neighbors), min(len(chunk), idx + neighbors + 1)))
+            offset += len(chunk)
+
+            if not keep:
+                continue
+
+            # Join contiguous runs with a space, mark skipped text between runs
+            parts = []
+            previous = None
+            for idx in sorted(keep):
+                if previous is not None:
+                    parts.append(" " if idx == previous + 1 else GAP_MARKER)
+                parts.append(chunk[idx])
+                previous = idx
+
+            compressed.append({**result, 'content': "".join(parts)})
+
+        chars_after = sum(len(result['content']) for result in compressed)
+        return compressed, {
+            'chars_before': chars_before,
+            'chars_after': chars_after,
+            'compression_ratio': chars_before / chars_after if chars_after else None
+        }
@@ -2,22 +2,44 @@
 Haystack RAG Service
 Manages document indexing and retrieval using Haystack pipelines
 """
-from typing import List, Dict, Any, Optional
+from typing import Callable, Iterable, List, Dict, Any, Optional, Tuple
 from haystack import Pipeline, Document
 from haystack.utils import Secret
 from haystack.components.preprocessors import DocumentSplitter
-from haystack.components.embedders import SentenceTransformersDocumentEmbedder
+from haystack.components.embedders import SentenceTransformersDocumentEmbedder, SentenceTransformersTextEmbedder
 from haystack.components.writers import DocumentWriter
+from haystack.document_stores.types import DuplicatePolicy
 from haystack_integrations.document_stores.pgvector import PgvectorDocumentStore
 
 from app.config import settings
+from app.db.connection import get_cursor
+from app import metrics
+from app.services.single_flight import SingleFlight, normalize_message
+from app.services.text_stream import batched, iter_word_chunks
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 # Global document store instance (initialized lazily)
 _document_store: Optional[PgvectorDocumentStore] = None
 _indexing_pipeline: Optional[Pipeline] = None
+_query_embedder: Optional[SentenceTransformersTextEmbedder] = None
+_batch_query_embedder: Optional[SentenceTransformersDocumentEmbedder] = None
+
+# Coalesces identical concurrent searches (same normalized query, rag_id, top_k)
+_search_flight = SingleFlight("search")
+
+# Lookup index for chunk reuse (haystack_documents only exists once Haystack created it)
+_CONTENT_HASH_INDEX_SQL = """
+    CREATE INDEX IF NOT EXISTS idx_haystack_documents_content_sha256
+        ON haystack_documents((meta->>'content_sha256'))
+"""
+_content_hash_index_ready = False
+
+_chunks_embedded = metrics.counter("indexing.chunks_embedded", "Chunks embedded by the indexing pipeline")
+_chunks_reused = metrics.counter("indexing.chunks_reused", "Chunks copied with the embedding of identical content")
 
 
 def get_document_store() -> PgvectorDocumentStore:
@@ -122,6 +144,63 @@ def get_indexing_pipeline() -> Pipeline:
     return _indexing_pipeline
 
 
+def index_signature() -> str:
+    """
+    Model and chunking settings the embeddings depend on: chunks are only
+    reused between documents indexed with the same signature
+    """
+    return f"{settings.EMBEDDING_MODEL_NAME}|{settings.CHUNK_SIZE}|{settings.CHUNK_OVERLAP}"
+
+
+def ensure_content_hash_index() -> None:
+    """Create the haystack_documents index used to find reusable chunks (once per process)"""
+    global _content_hash_index_ready
+
+    if _content_hash_index_ready:
+        return
+    try:
+        with get_cursor() as cursor:
+            cursor.execute(_CONTENT_HASH_INDEX_SQL)
+        _content_hash_index_ready = True
+    except Exception as e:
+        logger.warning(f"Could not create the chunk content hash index: {e}")
+
+
+def get_query_embedder() -> SentenceTransformersTextEmbedder:
+    """Get or create the (warmed up) embedder used for single queries"""
+    global _query_embedder
+
+    if _query_embedder is None:
+        embedder = SentenceTransformersTextEmbedder(
+            model=settings.EMBEDDING_MODEL_NAME,
+            progress_bar=False
+        )
+        embedder.warm_up()
+        _query_embedder = embedder
+
+    return _query_embedder
+
+
+def get_batch_query_embedder() -> SentenceTransformersDocumentEmbedder:
+    """
+    Get or create the embedder used to embed many queries in one batched pass
+    (queries are wrapped as Documents; no meta fields are embedded, so vectors
+    match the single-query embedder)
+    """
+    global _batch_query_embedder
+
+    if _batch_query_embedder is None:
+        embedder = SentenceTransformersDocumentEmbedder(
+            model=settings.EMBEDDING_MODEL_NAME,
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            progress_bar=False
+        )
+        embedder.warm_up()
+        _batch_query_embedder = embedder
+
+    return _batch_query_embedder
+
+
 class HaystackService:
     """Service for indexing and searching documents using Haystack"""
 
@@ -135,6 +214,10 @@ class HaystackService:
         """
         Index a document: split, embed, and store in vector DB
 
+        When a document with the same content is already indexed (same
+        model and chunking settings), its chunks and embeddings are copied
+        under this document instead of being recomputed.
+
         Args:
             document_id: ID of the document in our documents table
             title: Document title
@@ -142,7 +225,7 @@ class HaystackService:
             metadata: Additional metadata to store with chunks
 
         Returns:
-            Indexing results (chunks created, etc.)
+            Indexing results (chunks created, whether embeddings were reused, etc.)
         """
         from datetime import datetime
         start_time = datetime.now()
@@ -152,39 +235,162 @@ class HaystackService:
         doc_metadata.update({
             'document_id': document_id,
             'title': title,
-            'indexed_at': start_time.isoformat()
+            'indexed_at': start_time.isoformat(),
+            'content_sha256': hashlib.sha256(content.encode('utf-8')).hexdigest(),
+            'index_signature': index_signature()
         })
 
-        # Create Haystack Document
-        haystack_doc = Document(
-            content=content,
-            meta=doc_metadata
+        documents_written = HaystackService._copy_indexed_chunks(doc_metadata)
+        reused = documents_written > 0
+
+        if not reused:
+            # Create Haystack Document
+            haystack_doc = Document(
+                content=content,
+                meta=doc_metadata
+            )
+
+            # Run indexing pipeline
+            pipeline = get_indexing_pipeline()
+            result = pipeline.run({
+                "splitter": {"documents": [haystack_doc]}
+            })
+
+            # Extract results
+            documents_written = result.get("writer", {}).get("documents_written", 0)
+            _chunks_embedded.inc(documents_written)
+            ensure_content_hash_index()
+
+        end_time = datetime.now()
+        duration_ms = (end_time - start_time).total_seconds() * 1000
+
+        logger.info(
+            f"Indexed document {document_id}: "
+            f"{documents_written} chunks in {duration_ms:.2f}ms"
+            f"{' (embeddings reused)' if reused else ''}"
         )
 
-        # Run indexing pipeline
-        pipeline = get_indexing_pipeline()
-        result = pipeline.run({
-            "splitter": {"documents": [haystack_doc]}
+        return {
+            'document_id': document_id,
+            'chunks_created': documents_written,
+            'embeddings_reused': reused,
+            'indexing_time_ms': duration_ms,
+            'indexed_at': end_time.isoformat()
+        }
+
+    @staticmethod
+    def index_text_stream(
+        document_id: int,
+        title: str,
+        texts: Callable[[], Iterable[str]],
+        content_sha256: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Index a large document from a stream of text without holding it:
+        word chunks (same windows as the pipeline's DocumentSplitter) are
+        embedded EMBEDDING_BATCH_SIZE at a time and written as they come
+
+        Args:
+            document_id: ID of the document in our documents table
+            title: Document title
+            texts: Returns an iterator over the document content, in pieces
+            content_sha256: SHA-256 of the UTF-8 content (for embedding reuse)
+            metadata: Additional metadata to store with chunks
+
+        Returns:
+            Indexing results, as index_document
+        """
+        from datetime import datetime
+        start_time = datetime.now()
+
+        doc_metadata = metadata or {}
+        doc_metadata.update({
+            'document_id': document_id,
+            'title': title,
+            'indexed_at': start_time.isoformat(),
+            'content_sha256': content_sha256,
+            'index_signature': index_signature()
         })
 
-        # Extract results
-        documents_written = result.get("writer", {}).get("documents_written", 0)
+        documents_written = HaystackService._copy_indexed_chunks(doc_metadata)
+        reused = documents_written > 0
+
+        if not reused:
+            # Same embedder instance as the indexing pipeline
+            embedder = get_indexing_pipeline().get_component("embedder")
+            embedder.warm_up()
+            document_store = get_document_store()
+
+            chunks = iter_word_chunks(texts(), settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+            split_id = 0
+            for batch in batched(chunks, settings.EMBEDDING_BATCH_SIZE):
+                documents = []
+                for content, split_idx_start in batch:
+                    documents.append(Document(
+                        content=content,
+                        meta={**doc_metadata, 'split_id': split_id, 'split_idx_start': split_idx_start}
+                    ))
+                    split_id += 1
+                embedded = embedder.run(documents=documents)["documents"]
+                documents_written += document_store.write_documents(embedded, policy=DuplicatePolicy.OVERWRITE)
+            _chunks_embedded.inc(documents_written)
+            ensure_content_hash_index()
 
         end_time = datetime.now()
         duration_ms = (end_time - start_time).total_seconds() * 1000
 
         logger.info(
-            f"Indexed document {document_id}: "
+            f"Indexed document {document_id} (streamed): "
             f"{documents_written} chunks in {duration_ms:.2f}ms"
+            f"{' (embeddings reused)' if reused else ''}"
         )
 
         return {
             'document_id': document_id,
             'chunks_created': documents_written,
+            'embeddings_reused': reused,
             'indexing_time_ms': duration_ms,
             'indexed_at': end_time.isoformat()
         }
 
+    @staticmethod
+    def _copy_indexed_chunks(doc_metadata: Dict[str, Any]) -> int:
+        """
+        Copy the chunks of another document indexed with the same content
+        hash and signature, with this document's metadata
+
+        Returns:
+            Chunks written (0 when there is nothing to reuse)
+        """
+        document_store = get_document_store()
+        chunks = document_store.filter_documents(filters={
+            "operator": "AND",
+            "conditions": [
+                {"field": "meta.content_sha256", "operator": "==", "value": doc_metadata['content_sha256']},
+                {"field": "meta.index_signature", "operator": "==", "value": doc_metadata['index_signature']},
+                {"field": "meta.document_id", "operator": "!=", "value": doc_metadata['document_id']},
+            ]
+        })
+        if not chunks:
+            return 0
+
+        # Several documents may share the content: copy a single one's chunks
+        source_id = min(chunk.meta['document_id'] for chunk in chunks)
+        source_chunks = [chunk for chunk in chunks if chunk.meta['document_id'] == source_id]
+        if any(chunk.embedding is None for chunk in source_chunks):
+            return 0
+
+        # Chunk-level meta (split_id, offsets...) is kept, document-level meta replaced
+        copies = [
+            Document(content=chunk.content, embedding=chunk.embedding, meta={**chunk.meta, **doc_metadata})
+            for chunk in source_chunks
+        ]
+        written = document_store.write_documents(copies, policy=DuplicatePolicy.OVERWRITE)
+        _chunks_reused.inc(written)
+        logger.info(f"Reused {written} chunk embeddings of document {source_id} for document {doc_metadata['document_id']}")
+        return written
+
     @classmethod
     def delete_document_from_index(cls, document_id: int) -> int:
         # appeler la fonction module-level, pas cls.get_document_store()
@@ -207,31 +413,96 @@ class HaystackService:
     def search_documents(
         query: str,
         rag_id: Optional[int] = None,
-        top_k: int = 5
+        top_k: int = 5,
+        timings: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Semantic search across indexed documents
 
+        Concurrent identical searches (same normalized query, rag_id and top_k)
+        share a single embedding + vector query.
+
         Args:
             query: Search query
             rag_id: Optional RAG ID to filter results
             top_k: Number of results to return
+            timings: Optional dict filled with embed_ms and vector_search_ms
 
         Returns:
             List of matching document chunks with scores
         """
-        from haystack.components.embedders import SentenceTransformersTextEmbedder
-        from haystack.components.retrievers.in_memory import InMemoryEmbeddingRetriever
+        if not settings.REQUEST_COALESCING_ENABLED:
+            results, stage_timings = HaystackService._search_documents(query, rag_id, top_k)
+        else:
+            key = (normalize_message(query), rag_id, top_k)
+            (results, stage_timings), _ = _search_flight.do(
+                key, HaystackService._search_documents, query, rag_id, top_k
+            )
+
+        if timings is not None:
+            timings.update(stage_timings)
 
-        # Create query embedder
-        text_embedder = SentenceTransformersTextEmbedder(
-            model=settings.EMBEDDING_MODEL_NAME
+        # Followers share the leader's list: hand out a copy
+        return list(results)
+
+    @staticmethod
+    def _search_documents(
+        query: str,
+        rag_id: Optional[int],
+        top_k: int
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """Embed the query and run the vector search (uncoalesced), with stage timings"""
+        embed_start = time.perf_counter()
+        query_embedding = HaystackService.embed_query(query)
+        embed_ms = (time.perf_counter() - embed_start) * 1000
+
+        search_start = time.perf_counter()
+        results = HaystackService.search_by_embedding(query_embedding, rag_id, top_k)
+        vector_search_ms = (time.perf_counter() - search_start) * 1000
+
+        return results, {'embed_ms': embed_ms, 'vector_search_ms': vector_search_ms}
+
+    @staticmethod
+    def embed_query(query: str) -> List[float]:
+        """Embed a single query with the warmed up query embedder"""
+        return get_query_embedder().run(query)["embedding"]
+
+    @staticmethod
+    def embed_queries(queries: List[str]) -> List[List[float]]:
+        """
+        Embed several queries in one batched forward pass
+
+        Args:
+            queries: Query texts
+
+        Returns:
+            One embedding per query, in input order
+        """
+        if not queries:
+            return []
+
+        result = get_batch_query_embedder().run(
+            documents=[Document(content=query) for query in queries]
         )
+        return [doc.embedding for doc in result["documents"]]
+
+    @staticmethod
+    def search_by_embedding(
+        query_embedding: List[float],
+        rag_id: Optional[int] = None,
+        top_k: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Vector search with an already computed query embedding
 
-        # Get query embedding
-        query_result = text_embedder.run(query)
-        query_embedding = query_result["embedding"]
+        Args:
+            query_embedding: Query vector
+            rag_id: Optional RAG ID to filter results
+            top_k: Number of results to return
 
+        Returns:
+            List of matching document chunks with scores
+        """
         # Build filters
         filters = None
         if rag_id is not None:
@@ -1,218 +1,548 @@
 """
 LLM Chat Service
-Manages chat conversations using Haystack pipelines and Ollama
+Manages chat conversations using a Haystack prompt builder and the LLM provider router
 """
-from typing import Dict, Any, Optional
-from haystack import Pipeline
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import queue
+import time
 from haystack.components.builders import PromptBuilder
-from haystack.components.generators import OpenAIGenerator
-from haystack.utils import Secret
 
 from app.config import settings
+from app import metrics
+from app.services.llm_providers import get_llm_router
+from app.services.chat_session_service import ChatSessionService, format_turns
+from app.services.single_flight import SingleFlight, normalize_message
+from app.services.prompts import CHAT_PROMPT_PREFIX, CHAT_PROMPT_TEMPLATE
+from app.services.model_residency import get_residency_manager
+from app.services.answer_cache import get_answer_cache
+from app.services.context_compressor import ContextCompressor
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Global chat pipeline instance (initialized lazily)
-_chat_pipeline: Optional[Pipeline] = None
+# Global prompt builder instance (initialized lazily)
+_prompt_builder: Optional[PromptBuilder] = None
 
+# Coalesces identical concurrent chat requests (same normalized message, rag_id, top_k, provider)
+_chat_flight = SingleFlight("chat")
 
-def get_chat_pipeline() -> Pipeline:
+# With the answer cache on, retrieval is embed -> cache lookup -> vector search:
+# coalesced like HaystackService.search_documents, plus the cache inputs
+_cached_search_flight = SingleFlight("cached_search")
+
+
+def get_prompt_builder() -> PromptBuilder:
     """
-    Get or create the chat pipeline
+    Get or create the chat prompt builder
 
-    Pipeline components:
-    1. PromptBuilder - Formats the user message into a prompt
-    2. OpenAIGenerator - Calls Ollama via OpenAI-compatible API
+    Generation itself goes through the LLM router (see llm_providers), which
+    picks the fastest healthy provider for each request.
     """
-    global _chat_pipeline
-
-    if _chat_pipeline is None:
-        logger.info("Initializing Ollama chat pipeline")
-
-        # Create pipeline
-        pipeline = Pipeline()
-
-        # 1. Prompt Builder
-        #preprompt
-        preprompt = """Tu es un assistant expert. Utilise toujours les documents ci-dessous pour répondre de manière complète et précise. réponds en francais.
-         Si tu ne trouve pas d'information dans les documents pour répondre tu réponds que tu n'as pas de connaissance sur le sujet"""
-
-        # Template with conditional RAG context
-        template = """INSTRUCTION : {{ preprompt }}
-
-        {% if documents %}
-        CONTEXT DOCUMENTS:
-        {{ documents }}
-        
-        Utilise UNIQUEMENT les documents ci-dessus pour répondre.
-        {% else %}
-        {% if rag_requested %}
-        IMPORTANT: Aucun document pertinent n'a été trouvé dans la base de connaissances.
-        Tu DOIS répondre: "Je n'ai pas trouvé d'information sur ce sujet dans la base de connaissances."
-        {% endif %}
-        {% endif %}
-        
-        USER QUESTION: {{ user_message }}
-        
-        A:"""
-
-        prompt_builder = PromptBuilder(template=template)
-
-        # 2. OpenAI Generator configured for Ollama
-        # Ollama provides an OpenAI-compatible API endpoint at /v1
-        generator = OpenAIGenerator(
-            api_key=Secret.from_token("ollama"),  # Ollama doesn't require real API key
-            api_base_url=settings.OLLAMA_BASE_URL + "/v1",
-            model=settings.OLLAMA_MODEL,
-            generation_kwargs={
-                "max_tokens": 1000,
-                "temperature": 0.7,
-            }
-        )
+    global _prompt_builder
+
+    if _prompt_builder is None:
+        logger.info("Initializing chat prompt builder")
+
+        # Only the request-specific part is templated; the static instruction
+        # prefix is prepended verbatim in render_prompt
+        _prompt_builder = PromptBuilder(template=CHAT_PROMPT_TEMPLATE)
+        logger.info("Chat prompt builder initialized successfully")
 
-        # Add components to pipeline
-        pipeline.add_component("prompt_builder", prompt_builder)
-        pipeline.add_component("generator", generator)
+    return _prompt_builder
 
-        # Connect components
-        pipeline.connect("prompt_builder.prompt", "generator.prompt")
 
-        _chat_pipeline = pipeline
-        logger.info("Chat pipeline initialized successfully")
+@contextmanager
+def timed(timings: Dict[str, Any], name: str):
+    """Record the duration of the enclosed block in timings[name] (ms)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
 
-    return _chat_pipeline
+
+def generation_timings(generation: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract TTFT, generation time, token counts and decode throughput from a router result"""
+    ttft_ms = generation.get("ttft_ms")
+    generation_ms = generation.get("generation_ms")
+    completion_tokens = generation.get("completion_tokens")
+
+    tokens_per_sec = None
+    if completion_tokens and generation_ms is not None:
+        decode_ms = generation_ms - (ttft_ms or 0)
+        if decode_ms > 0:
+            tokens_per_sec = completion_tokens / (decode_ms / 1000)
+
+    return {
+        "ttft_ms": ttft_ms,
+        "generation_ms": generation_ms,
+        "prompt_tokens": generation.get("prompt_tokens"),
+        "completion_tokens": completion_tokens,
+        "tokens_per_sec": tokens_per_sec
+    }
+
+
+def record_timings(timings: Dict[str, Any]) -> None:
+    """Feed per-request stage timings into the aggregated chat histograms"""
+    for name, value in timings.items():
+        if isinstance(value, (int, float)):
+            metrics.histogram(f"chat.{name}", f"Chat {name} per request").observe(value)
 
 
 class LLMChatService:
     """Service for handling chat conversations with LLM"""
 
+    @staticmethod
+    def filter_results(search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep results above RAG_MIN_SCORE_THRESHOLD"""
+        return [
+            result for result in search_results
+            if result['score'] >= settings.RAG_MIN_SCORE_THRESHOLD
+        ]
+
+    @staticmethod
+    def format_context(search_results: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Keep results above RAG_MIN_SCORE_THRESHOLD and format them for the prompt
+
+        Returns:
+            (documents_context, documents_used)
+        """
+        filtered_results = LLMChatService.filter_results(search_results)
+
+        if not filtered_results:
+            logger.warning(f"No documents found with score >= {settings.RAG_MIN_SCORE_THRESHOLD}")
+            return "", []
+
+        formatted_docs = []
+        documents_used = []
+        for idx, result in enumerate(filtered_results, 1):
+            doc_text = f"Document {idx} (score: {result['score']:.2f}):\n"
+            doc_text += result['content']
+            doc_text += f"\nSource: {result['metadata'].get('title', 'Sans titre')}\n"
+            formatted_docs.append(doc_text)
+
+            # Store metadata for response
+            documents_used.append({
+                'title': result['metadata'].get('title', 'Sans titre'),
+                'score': result['score']
+            })
+
+        return "\n\n".join(formatted_docs), documents_used
+
+    @staticmethod
+    def render_prompt(
+        user_message: str,
+        documents_context: str,
+        rag_requested: bool,
+        session: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Render the chat prompt (RAG context, optional session summary and turns)
+
+        The static instruction prefix always comes first and is byte-identical
+        across requests so the LLM server can reuse its cached prefill.
+        """
+        variable_part = get_prompt_builder().run(
+            user_message=user_message,
+            documents=documents_context,
+            rag_requested=rag_requested,
+            summary=session['summary'] if session else None,
+            history=format_turns(session['recent_messages']) if session else None
+        )["prompt"]
+        return CHAT_PROMPT_PREFIX + variable_part
+
     @staticmethod
     def generate_response(
         user_message: str,
         rag_id: Optional[int] = None,
-        top_k: Optional[int] = None
+        top_k: Optional[int] = None,
+        provider: Optional[str] = None,
+        session_id: Optional[int] = None,
+        compress_context: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Generate a response from the LLM based on user message
 
+        Concurrent identical requests (same normalized message, rag_id, top_k
+        and pinned provider) share one retrieval + generation. Requests bound
+        to a chat session are never coalesced since their history differs.
+
         Args:
             user_message: The user's input message
             rag_id: Optional RAG collection ID for context retrieval
             top_k: Number of documents to retrieve (default from config)
+            provider: Optional LLM provider to pin the request to (default: routed)
+            session_id: Optional chat session; its summary and recent turns
+                are added to the prompt and the new turn is recorded
+            compress_context: Keep only the retrieved sentences closest to the
+                question (default CONTEXT_COMPRESSION_ENABLED)
 
         Returns:
             Dictionary containing the response and metadata
         """
+        if compress_context is None:
+            compress_context = settings.CONTEXT_COMPRESSION_ENABLED
+
+        if session_id is not None:
+            return LLMChatService._generate_response(
+                user_message, rag_id, top_k, provider, session_id, compress_context
+            )
+
+        if not settings.REQUEST_COALESCING_ENABLED:
+            return LLMChatService._generate_response(
+                user_message, rag_id, top_k, provider, compress_context=compress_context
+            )
+
+        effective_top_k = top_k if top_k is not None else settings.RAG_TOP_K_DEFAULT
+        key = (
+            normalize_message(user_message),
+            rag_id,
+            effective_top_k if rag_id is not None else None,
+            provider,
+            compress_context
+        )
+        result, coalesced = _chat_flight.do(
+            key, LLMChatService._generate_response, user_message, rag_id, top_k, provider, None, compress_context
+        )
+
+        response = dict(result)
+        response["coalesced"] = coalesced
+        return response
+
+    @staticmethod
+    def _generate_response(
+        user_message: str,
+        rag_id: Optional[int],
+        top_k: Optional[int],
+        provider: Optional[str],
+        session_id: Optional[int] = None,
+        compress_context: bool = False
+    ) -> Dict[str, Any]:
+        """Retrieve context and run the chat pipeline (uncoalesced)"""
         from datetime import datetime
-        start_time = datetime.now()
+        start = time.perf_counter()
 
         # Initialize RAG variables
         documents_context = ""
         documents_used = []
         retrieval_time_ms = None
-        rag_requested = rag_id is not None
+        session = None
+        answer_cache = None
+        query_embedding = None
+        timings: Dict[str, Any] = {}
+
+        residency = get_residency_manager()
+        if residency is not None:
+            residency.note_request()
 
         try:
+            # Load server-side conversation state (summary + recent turns)
+            if session_id is not None:
+                with timed(timings, 'session_load_ms'):
+                    session = ChatSessionService.load_context(session_id)
+                if rag_id is None:
+                    rag_id = session['rag_id']
+
+            rag_requested = rag_id is not None
+
             # Retrieve documents from RAG if rag_id is provided
             if rag_id is not None:
-                retrieval_start = datetime.now()
+                retrieval_start = time.perf_counter()
 
                 # Import here to avoid circular dependency
                 from app.services.haystack_service import HaystackService
                 from app.db.queries import rags as rag_queries
 
                 # Validate RAG exists
-                rag = rag_queries.get_rag_by_id(rag_id)
+                with timed(timings, 'rag_lookup_ms'):
+                    rag = rag_queries.get_rag_by_id(rag_id)
                 if not rag:
                     raise ValueError(f"RAG collection {rag_id} not found")
 
                 # Determine top_k (use provided value or default from settings)
                 effective_top_k = top_k if top_k is not None else settings.RAG_TOP_K_DEFAULT
 
-                # Search documents using HaystackService
-                logger.info(f"Searching RAG {rag_id} with query: '{user_message[:50]}...' (top_k={effective_top_k})")
-                search_results = HaystackService.search_documents(
-                    query=user_message,
-                    rag_id=rag_id,
-                    top_k=effective_top_k
-                )
-
-                # Filter by minimum score threshold
-                filtered_results = [
-                    result for result in search_results
-                    if result['score'] >= settings.RAG_MIN_SCORE_THRESHOLD
-                ]
+                # Semantic answer cache: session turns depend on history, never cached
+                answer_cache = get_answer_cache() if session is None else None
+                cache_variant = (effective_top_k, provider, compress_context)
 
-                retrieval_end = datetime.now()
-                retrieval_time_ms = (retrieval_end - retrieval_start).total_seconds() * 1000
+                logger.info(f"Searching RAG {rag_id} with query: '{user_message[:50]}...' (top_k={effective_top_k})")
+                if answer_cache is None:
+                    # Search documents using HaystackService (fills embed_ms / vector_search_ms)
+                    search_results = HaystackService.search_documents(
+                        query=user_message,
+                        rag_id=rag_id,
+                        top_k=effective_top_k,
+                        timings=timings
+                    )
+                else:
+                    threshold = rag['semantic_cache_threshold']
+                    if threshold is None:
+                        threshold = settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+                    args = (user_message, rag_id, rag['index_version'], effective_top_k, threshold, cache_variant)
+                    if not settings.REQUEST_COALESCING_ENABLED:
+                        retrieval = LLMChatService._cached_search(*args)
+                    else:
+                        key = (normalize_message(user_message), rag_id, effective_top_k,
+                               rag['index_version'], threshold, cache_variant)
+                        retrieval, _ = _cached_search_flight.do(key, LLMChatService._cached_search, *args)
+                    cached, search_results, query_embedding, stage_timings = retrieval
+                    timings.update(stage_timings)
+                    if cached is not None:
+                        return LLMChatService._cached_response(cached, start, timings)
+                    # Followers share the leader's list: work on a copy
+                    search_results = list(search_results)
+
+                # Shrink relevant chunks to the sentences closest to the question
+                context_results = search_results
+                if compress_context:
+                    with timed(timings, 'compress_ms'):
+                        context_results, compression = ContextCompressor.compress(
+                            user_message,
+                            LLMChatService.filter_results(search_results),
+                            query_embedding=query_embedding
+                        )
+                    timings['compression_ratio'] = compression['compression_ratio']
+
+                # Filter by minimum score and format documents for prompt
+                with timed(timings, 'filter_ms'):
+                    documents_context, documents_used = LLMChatService.format_context(context_results)
+
+                retrieval_time_ms = (time.perf_counter() - retrieval_start) * 1000
 
                 logger.info(
                     f"Retrieved {len(search_results)} documents, "
-                    f"{len(filtered_results)} after filtering (score >= {settings.RAG_MIN_SCORE_THRESHOLD}), "
+                    f"{len(documents_used)} after filtering (score >= {settings.RAG_MIN_SCORE_THRESHOLD}), "
                     f"in {retrieval_time_ms:.2f}ms"
                 )
 
-                # Format documents for prompt
-                if filtered_results:
-                    formatted_docs = []
-                    for idx, result in enumerate(filtered_results, 1):
-                        doc_text = f"Document {idx} (score: {result['score']:.2f}):\n"
-                        doc_text += result['content']
-                        doc_text += f"\nSource: {result['metadata'].get('title', 'Sans titre')}\n"
-                        formatted_docs.append(doc_text)
-
-                        # Store metadata for response
-                        documents_used.append({
-                            'title': result['metadata'].get('title', 'Sans titre'),
-                            'score': result['score']
-                        })
-
-                    documents_context = "\n\n".join(formatted_docs)
-                    logger.info(f"Formatted {len(filtered_results)} documents for context")
-                else:
-                    logger.warning(f"No documents found with score >= {settings.RAG_MIN_SCORE_THRESHOLD}")
-
-            # Get the chat pipeline
-            pipeline = get_chat_pipeline()
-
-            #preprompt
-            preprompt = """Tu es un assistant expert. Utilise toujours les documents ci-dessous pour répondre de manière complète et précise. réponds en francais.
-             Si tu ne trouve pas d'information dans les documents pour répondre tu réponds que tu n'as pas de connaissance sur le sujet"""
-
-            # Run the pipeline with RAG context
-            result = pipeline.run({
-                "prompt_builder": {
-                    "user_message": user_message,
-                    "documents": documents_context,
-                    "preprompt": preprompt,
-                    "rag_requested": rag_requested
-                }
-            })
-
-            # Extract the generated response
-            replies = result.get("generator", {}).get("replies", [])
+            # Render the prompt with RAG context
+            with timed(timings, 'prompt_render_ms'):
+                prompt = LLMChatService.render_prompt(user_message, documents_context, rag_requested, session)
 
-            if not replies:
-                raise ValueError("No response generated from LLM")
-
-            response_text = replies[0]
+            # Generate through the router (fastest healthy provider, or the pinned one)
+            generation = get_llm_router().generate(prompt, provider=provider)
+            response_text = generation["text"]
+            timings.update(generation_timings(generation))
 
             end_time = datetime.now()
-            duration_ms = (end_time - start_time).total_seconds() * 1000
+            duration_ms = (time.perf_counter() - start) * 1000
+            timings['total_ms'] = duration_ms
+            record_timings(timings)
 
             logger.info(f"Generated response in {duration_ms:.2f}ms")
 
-            return {
+            # Persisted asynchronously, never on the response path
+            if session is not None:
+                ChatSessionService.record_turn(session_id, user_message, response_text)
+
+            result = {
                 "response": response_text,
                 "duration_ms": duration_ms,
                 "timestamp": end_time.isoformat(),
-                "model": settings.OLLAMA_MODEL,
+                "model": generation["model"],
+                "provider": generation["provider"],
                 "rag_used": rag_requested,
                 "documents_used": documents_used if documents_used else None,
-                "retrieval_time_ms": retrieval_time_ms
+                "retrieval_time_ms": retrieval_time_ms,
+                "session_id": session_id,
+                "timings": timings
             }
 
+            if answer_cache is not None:
+                answer_cache.store(rag_id, rag['index_version'], query_embedding, result, cache_variant)
+
+            return result
+
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             raise
+
+    @staticmethod
+    def _cached_search(
+        user_message: str,
+        rag_id: int,
+        index_version: int,
+        top_k: int,
+        threshold: float,
+        cache_variant: Tuple[Any, ...]
+    ) -> Tuple[Optional[Tuple[Dict[str, Any], float]], List[Dict[str, Any]], List[float], Dict[str, float]]:
+        """
+        Embed the question once, look it up in the answer cache, and run the
+        vector search on a miss (uncoalesced)
+
+        Returns:
+            (cached, search_results, query_embedding, stage timings); cached is
+            the cache hit or None, search_results is empty on a hit
+        """
+        from app.services.haystack_service import HaystackService
+
+        stage_timings: Dict[str, float] = {}
+        with timed(stage_timings, 'embed_ms'):
+            query_embedding = HaystackService.embed_query(user_message)
+
+        with timed(stage_timings, 'cache_lookup_ms'):
+            cached = get_answer_cache().lookup(rag_id, index_version, query_embedding, threshold, cache_variant)
+        if cached is not None:
+            return cached, [], query_embedding, stage_timings
+
+        with timed(stage_timings, 'vector_search_ms'):
+            search_results = HaystackService.search_by_embedding(query_embedding, rag_id, top_k)
+        return None, search_results, query_embedding, stage_timings
+
+    @staticmethod
+    def _cached_response(
+        cached: Tuple[Dict[str, Any], float],
+        start: float,
+        timings: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Serve a semantic cache hit (no generation)"""
+        from datetime import datetime
+
+        answer, similarity = cached
+        duration_ms = (time.perf_counter() - start) * 1000
+        timings['total_ms'] = duration_ms
+        record_timings(timings)
+
+        logger.info(f"Served cached answer (similarity {similarity:.3f}) in {duration_ms:.2f}ms")
+
+        return {
+            **answer,
+            "duration_ms": duration_ms,
+            "timestamp": datetime.now().isoformat(),
+            "retrieval_time_ms": None,
+            "timings": timings,
+            "cached": True,
+            "cache_similarity": similarity
+        }
+
+    @staticmethod
+    def generate_batch(
+        questions: List[str],
+        rag_id: int,
+        top_k: Optional[int] = None,
+        provider: Optional[str] = None,
+        concurrency: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Answer many questions against one RAG (evaluation runs)
+
+        All questions are embedded in one batched pass up front, retrievals
+        run concurrently and generations are sent to the LLM with at most
+        `concurrency` requests in flight. Validation and embedding happen
+        eagerly; the returned iterator yields one result per question, in
+        completion order.
+
+        Args:
+            questions: Questions to answer
+            rag_id: RAG collection ID for context retrieval
+            top_k: Number of documents to retrieve per question
+            provider: Optional LLM provider to pin generations to
+            concurrency: Max concurrent generations (default CHAT_BATCH_CONCURRENCY)
+
+        Returns:
+            Iterator of per-question result dicts (status, response, timings...)
+        """
+        # Import here to avoid circular dependency
+        from app.services.haystack_service import HaystackService
+        from app.db.queries import rags as rag_queries
+
+        if not rag_queries.get_rag_by_id(rag_id):
+            raise ValueError(f"RAG collection {rag_id} not found")
+
+        if provider is not None:
+            get_llm_router().get_provider(provider)  # Fail fast on unknown provider
+
+        effective_top_k = top_k if top_k is not None else settings.RAG_TOP_K_DEFAULT
+        concurrency = max(1, min(concurrency or settings.CHAT_BATCH_CONCURRENCY, settings.CHAT_BATCH_MAX_CONCURRENCY))
+
+        batch_start = time.perf_counter()
+        embeddings = HaystackService.embed_queries(questions)
+        embed_ms = (time.perf_counter() - batch_start) * 1000
+        logger.info(f"Embedded {len(questions)} batch questions in {embed_ms:.2f}ms")
+
+        return LLMChatService._run_batch(
+            questions, embeddings, rag_id, effective_top_k, provider, concurrency, batch_start, embed_ms
+        )
+
+    @staticmethod
+    def _run_batch(
+        questions: List[str],
+        embeddings: List[List[float]],
+        rag_id: int,
+        top_k: int,
+        provider: Optional[str],
+        concurrency: int,
+        batch_start: float,
+        embed_ms: float
+    ) -> Iterator[Dict[str, Any]]:
+        """Retrieval / generation fan-out for generate_batch, yielding as items complete"""
+        from app.services.haystack_service import HaystackService
+
+        router = get_llm_router()
+        completed: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        retrieval_pool = ThreadPoolExecutor(
+            max_workers=settings.CHAT_BATCH_RETRIEVAL_CONCURRENCY, thread_name_prefix="batch-retrieval"
+        )
+        generation_pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch-generation")
+
+        def elapsed_ms(since: float) -> float:
+            return (time.perf_counter() - since) * 1000
+
+        def fail(index: int, question: str, timings: Dict[str, Any], error: Exception) -> None:
+            timings["total_ms"] = elapsed_ms(batch_start)
+            completed.put({
+                "index": index,
+                "question": question,
+                "status": "error",
+                "error": str(error),
+                "timings": timings
+            })
+
+        def generate(index: int, question: str, search_results: List[Dict[str, Any]],
+                     timings: Dict[str, Any], queued_at: float) -> None:
+            try:
+                timings["generation_queue_ms"] = elapsed_ms(queued_at)
+                documents_context, documents_used = LLMChatService.format_context(search_results)
+                prompt = LLMChatService.render_prompt(question, documents_context, True)
+
+                generation = router.generate(prompt, provider=provider)
+                timings.update(generation_timings(generation))
+                timings["total_ms"] = elapsed_ms(batch_start)
+
+                completed.put({
+                    "index": index,
+                    "question": question,
+                    "status": "success",
+                    "response": generation["text"],
+                    "model": generation["model"],
+                    "provider": generation["provider"],
+                    "documents_used": documents_used or None,
+                    "timings": timings
+                })
+            except Exception as e:
+                fail(index, question, timings, e)
+
+        def retrieve(index: int, question: str, embedding: List[float]) -> None:
+            timings: Dict[str, Any] = {"embed_ms": embed_ms}
+            try:
+                retrieval_start = time.perf_counter()
+                search_results = HaystackService.search_by_embedding(embedding, rag_id, top_k)
+                timings["retrieval_ms"] = elapsed_ms(retrieval_start)
+                generation_pool.submit(generate, index, question, search_results, timings, time.perf_counter())
+            except Exception as e:
+                fail(index, question, timings, e)
+
+        for index, (question, embedding) in enumerate(zip(questions, embeddings)):
+            retrieval_pool.submit(retrieve, index, question, embedding)
+
+        try:
+            for _ in range(len(questions)):
+                yield completed.get()
+        finally:
+            # Client gone or batch done: drop anything not started yet
+            retrieval_pool.shutdown(wait=False, cancel_futures=True)
+            generation_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,310 @@
+"""
+LLM Provider Router
+Holds several OpenAI-compatible LLM backends (Ollama, LM Studio, OpenAI, Anthropic),
+tracks their rolling latency and error rate, and routes each request to the
+fastest healthy one with failover on timeouts and server errors
+"""
+from typing import Dict, Any, List, Optional
+from collections import deque
+import threading
+import time
+
+import httpx
+import openai
+from openai import OpenAI
+
+from app.config import settings
+from app import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global router instance (initialized lazily)
+_llm_router: Optional["LLMRouter"] = None
+
+# Errors worth trying another provider for; anything else (bad request,
+# auth...) is a caller/config problem and is raised immediately
+_FAILOVER_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    httpx.TimeoutException,  # Raised while iterating a stream
+    httpx.TransportError,
+)
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when no provider could serve a request"""
+
+
+def chat_messages(prompt: str) -> List[Dict[str, str]]:
+    """
+    Chat messages sent for a rendered prompt
+
+    The server applies the model's chat template to them: anything meant to
+    share the KV cache with real requests (Ollama warm-up) must send the
+    same structure.
+    """
+    return [{"role": "user", "content": prompt}]
+
+
+class LLMProvider:
+    """One OpenAI-compatible backend with rolling latency/error statistics"""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        model: str,
+        api_key: str = "none",
+        timeout: Optional[float] = None,
+        window: Optional[int] = None
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout if timeout is not None else settings.LLM_TIMEOUT_SECONDS
+        self.client = OpenAI(
+            base_url=base_url,
+            api_key=api_key or "none",
+            timeout=self.timeout,
+            max_retries=0  # Failover is handled by the router
+        )
+
+        window = window or settings.LLM_LATENCY_WINDOW
+        self._latencies = deque(maxlen=window)  # successful call latencies (ms)
+        self._outcomes = deque(maxlen=window)   # True = success, False = failure
+        self._cooldown_until = 0.0
+        self._lock = threading.Lock()
+        self.total_requests = 0
+        self.last_error: Optional[str] = None
+
+        self._latency_histogram = metrics.histogram(f"llm.{name}.latency_ms", f"{name} generation latency")
+        self._failures = metrics.counter(f"llm.{name}.failures", f"{name} failed generations")
+
+    # ---------- statistics ----------
+
+    def record_success(self, latency_ms: float) -> None:
+        with self._lock:
+            self._latencies.append(latency_ms)
+            self._outcomes.append(True)
+            self.total_requests += 1
+        self._latency_histogram.observe(latency_ms)
+
+    def record_failure(self, error: Exception, timeout: bool = False) -> None:
+        with self._lock:
+            self._outcomes.append(False)
+            self.total_requests += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            # Timeouts or a high recent error rate open the circuit for a while
+            if timeout or self._error_rate_locked() >= settings.LLM_MAX_ERROR_RATE:
+                self._cooldown_until = time.monotonic() + settings.LLM_PROVIDER_COOLDOWN_SECONDS
+        self._failures.inc()
+
+    def _error_rate_locked(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def _percentile_locked(self, q: float) -> Optional[float]:
+        return metrics.nearest_rank_percentile(sorted(self._latencies), q)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self._cooldown_until
+
+    def routing_score(self) -> float:
+        """Lower is better: rolling p95 latency (unmeasured providers get probed first)"""
+        with self._lock:
+            p95 = self._percentile_locked(95)
+        return p95 if p95 is not None else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "name": self.name,
+                "base_url": self.base_url,
+                "model": self.model,
+                "healthy": self.healthy,
+                "p50_ms": self._percentile_locked(50),
+                "p95_ms": self._percentile_locked(95),
+                "error_rate": self._error_rate_locked(),
+                "window_size": len(self._outcomes),
+                "total_requests": self.total_requests,
+                "last_error": self.last_error
+            }
+
+    # ---------- generation ----------
+
+    def generate(self, prompt: str, generation_kwargs: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Run a single streamed chat completion (no statistics, no failover)
+
+        Streaming lets us measure time to first token; token usage comes from
+        the final usage chunk when the server supports it, otherwise the
+        completion token count is estimated from the number of content chunks.
+        """
+        kwargs = {
+            "max_tokens": settings.LLM_MAX_TOKENS,
+            "temperature": settings.LLM_TEMPERATURE,
+        }
+        kwargs.update(generation_kwargs or {})
+        if settings.LLM_STREAM_USAGE:
+            kwargs.setdefault("stream_options", {"include_usage": True})
+
+        start = time.perf_counter()
+        ttft_ms = None
+        parts: List[str] = []
+        content_chunks = 0
+        model = None
+        usage = None
+
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=chat_messages(prompt),
+            stream=True,
+            **kwargs
+        )
+        for chunk in stream:
+            model = model or chunk.model
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if content:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - start) * 1000
+                parts.append(content)
+                content_chunks += 1
+
+        if not parts:
+            raise ValueError("No response generated from LLM")
+
+        return {
+            "text": "".join(parts),
+            "model": model or self.model,
+            "provider": self.name,
+            "ttft_ms": ttft_ms,
+            "generation_ms": (time.perf_counter() - start) * 1000,
+            "prompt_tokens": usage.prompt_tokens if usage else None,
+            "completion_tokens": usage.completion_tokens if usage else content_chunks
+        }
+
+
+class LLMRouter:
+    """Routes generations to the fastest healthy provider, failing over on errors"""
+
+    def __init__(self, providers: List[LLMProvider]):
+        if not providers:
+            raise ValueError("LLMRouter requires at least one provider")
+        self.providers: Dict[str, LLMProvider] = {p.name: p for p in providers}
+
+    def get_provider(self, name: str) -> LLMProvider:
+        provider = self.providers.get(name)
+        if provider is None:
+            raise ValueError(
+                f"Unknown LLM provider '{name}'. Available: {', '.join(self.providers)}"
+            )
+        return provider
+
+    def candidates(self, provider: Optional[str] = None) -> List[LLMProvider]:
+        """
+        Providers to try, in order
+
+        A pinned provider is the only candidate. Otherwise healthy providers
+        sorted by rolling p95, followed by cooling-down ones as a last resort.
+        """
+        if provider is not None:
+            return [self.get_provider(provider)]
+
+        providers = list(self.providers.values())
+        healthy = sorted((p for p in providers if p.healthy), key=lambda p: p.routing_score())
+        cooling = sorted((p for p in providers if not p.healthy), key=lambda p: p._cooldown_until)
+        return healthy + cooling
+
+    def generate(
+        self,
+        prompt: str,
+        provider: Optional[str] = None,
+        generation_kwargs: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a completion
+
+        Args:
+            prompt: Rendered prompt
+            provider: Optional provider name to pin the request to (no failover)
+            generation_kwargs: Overrides for max_tokens, temperature...
+
+        Returns:
+            Dict with text, model, provider, ttft_ms, generation_ms,
+            token usage and latency_ms
+        """
+        errors = []
+        for candidate in self.candidates(provider):
+            start = time.perf_counter()
+            try:
+                result = candidate.generate(prompt, generation_kwargs)
+            except _FAILOVER_ERRORS as e:
+                candidate.record_failure(
+                    e, timeout=isinstance(e, (openai.APITimeoutError, httpx.TimeoutException))
+                )
+                errors.append(f"{candidate.name}: {type(e).__name__}")
+                logger.warning(f"LLM provider {candidate.name} failed ({type(e).__name__}), failing over")
+                continue
+
+            latency_ms = (time.perf_counter() - start) * 1000
+            candidate.record_success(latency_ms)
+            result["latency_ms"] = latency_ms
+            return result
+
+        raise LLMUnavailableError(f"No LLM provider available ({'; '.join(errors)})")
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [p.stats() for p in self.providers.values()]
+
+
+def configured_provider_names() -> List[str]:
+    """Provider names from LLM_PROVIDERS (DEFAULT_LLM_PROVIDER when empty)"""
+    names = [n.strip() for n in settings.LLM_PROVIDERS.split(",") if n.strip()]
+    return names or [settings.DEFAULT_LLM_PROVIDER]
+
+
+def build_providers_from_settings() -> List[LLMProvider]:
+    """Instantiate the providers listed in LLM_PROVIDERS (cloud ones need an API key)"""
+    providers = []
+    for name in configured_provider_names():
+        if name == "ollama":
+            # Ollama provides an OpenAI-compatible API endpoint at /v1
+            providers.append(LLMProvider("ollama", settings.OLLAMA_BASE_URL + "/v1", settings.OLLAMA_MODEL, "ollama"))
+        elif name == "lm_studio":
+            providers.append(LLMProvider("lm_studio", settings.LM_STUDIO_BASE_URL, settings.LM_STUDIO_MODEL, "lm-studio"))
+        elif name == "openai":
+            if not settings.OPENAI_API_KEY:
+                logger.warning("Skipping LLM provider 'openai': OPENAI_API_KEY is not set")
+                continue
+            providers.append(LLMProvider("openai", settings.OPENAI_BASE_URL, settings.OPENAI_MODEL, settings.OPENAI_API_KEY))
+        elif name == "anthropic":
+            if not settings.ANTHROPIC_API_KEY:
+                logger.warning("Skipping LLM provider 'anthropic': ANTHROPIC_API_KEY is not set")
+                continue
+            # Anthropic exposes an OpenAI SDK compatible endpoint
+            providers.append(LLMProvider("anthropic", settings.ANTHROPIC_BASE_URL, settings.ANTHROPIC_MODEL, settings.ANTHROPIC_API_KEY))
+        else:
+            logger.warning(f"Unknown LLM provider '{name}' in LLM_PROVIDERS, ignored")
+
+    return providers
+
+
+def get_llm_router() -> LLMRouter:
+    """Get or create the LLM router from settings"""
+    global _llm_router
+
+    if _llm_router is None:
+        providers = build_providers_from_settings()
+        logger.info(f"Initializing LLM router with providers: {[p.name for p in providers]}")
+        _llm_router = LLMRouter(providers)
+
+    return _llm_router
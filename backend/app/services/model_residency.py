@@ -0,0 +1,186 @@
+"""
+Ollama Model Residency Manager
+Keeps OLLAMA_MODEL loaded while there is chat traffic: periodic keep-alive /
+warm-up calls (which also prefill the static prompt prefix) and model-loaded
+state for health checks
+"""
+from typing import Dict, Any, Optional
+from datetime import datetime, timezone
+import threading
+import time
+
+import httpx
+
+from app.config import settings
+from app.services.prompts import CHAT_PROMPT_PREFIX
+from app.services.llm_providers import chat_messages, configured_provider_names
+from app import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global residency manager (initialized lazily)
+_residency_manager: Optional["ModelResidencyManager"] = None
+
+
+class ModelResidencyManager:
+    """
+    Background keep-alive for an Ollama model
+
+    Every OLLAMA_RESIDENCY_CHECK_SECONDS, if a chat request was seen within
+    OLLAMA_WARM_TRAFFIC_WINDOW_SECONDS, the manager checks /api/ps and sends a
+    warm-up generation when the model is not loaded or its keep-alive is
+    about to expire. The warm-up is a chat call (/api/chat) with the same
+    message structure as real requests and the static instruction prefix as
+    content: once the chat template is applied, its tokens are the prefix of
+    every real prompt, which the server keeps in its KV cache.
+    """
+
+    def __init__(self, base_url: str, model: str, keep_alive: str):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self._client = httpx.Client(base_url=self.base_url, timeout=settings.LLM_TIMEOUT_SECONDS)
+        self._last_request = 0.0
+        self._last_warmup: Optional[float] = None
+        self._last_warmup_ms: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._warmups = metrics.counter("ollama.warmups", "Warm-up / keep-alive calls sent to Ollama")
+        self._warmup_ms = metrics.histogram("ollama.warmup_ms", "Warm-up call duration (includes model load)")
+
+    # ---------- lifecycle ----------
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="ollama-residency", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def note_request(self) -> None:
+        """Record chat traffic (keeps the model warm for the traffic window)"""
+        self._last_request = time.monotonic()
+        self.start()
+
+    # ---------- Ollama API ----------
+
+    def loaded_model(self) -> Optional[Dict[str, Any]]:
+        """Entry for our model in /api/ps, or None if it is not loaded"""
+        response = self._client.get("/api/ps")
+        response.raise_for_status()
+        for entry in response.json().get("models", []):
+            if entry.get("name") == self.model or entry.get("model") == self.model:
+                return entry
+        return None
+
+    def warm_up(self) -> float:
+        """
+        Load the model (if needed), refresh its keep-alive and prefill the
+        static prompt prefix
+
+        Returns:
+            Call duration in ms
+        """
+        start = time.perf_counter()
+        # Same endpoint family and template as /v1/chat/completions (used by the
+        # router), plus keep_alive, which the OpenAI-compatible API does not accept
+        response = self._client.post("/api/chat", json={
+            "model": self.model,
+            "messages": chat_messages(CHAT_PROMPT_PREFIX),
+            "keep_alive": self.keep_alive,
+            "stream": False,
+            "options": {"num_predict": 1}
+        })
+        response.raise_for_status()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        self._last_warmup = time.monotonic()
+        self._last_warmup_ms = duration_ms
+        self._warmups.inc()
+        self._warmup_ms.observe(duration_ms)
+        logger.info(f"Warmed up Ollama model {self.model} in {duration_ms:.0f}ms")
+        return duration_ms
+
+    def _needs_warmup(self) -> bool:
+        entry = self.loaded_model()
+        if entry is None:
+            return True
+
+        expires_at = entry.get("expires_at")
+        if not expires_at:
+            return False
+        try:
+            expires = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
+        except ValueError:
+            return False
+        remaining = (expires - datetime.now(timezone.utc)).total_seconds()
+        # Refresh before the next check could find it unloaded
+        return remaining < 2 * settings.OLLAMA_RESIDENCY_CHECK_SECONDS
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            idle = time.monotonic() - self._last_request
+            if idle <= settings.OLLAMA_WARM_TRAFFIC_WINDOW_SECONDS:
+                try:
+                    if self._needs_warmup():
+                        self.warm_up()
+                    self._last_error = None
+                except Exception as e:
+                    self._last_error = f"{type(e).__name__}: {e}"
+                    logger.warning(f"Ollama residency check failed: {self._last_error}")
+            self._stop.wait(settings.OLLAMA_RESIDENCY_CHECK_SECONDS)
+
+    # ---------- health ----------
+
+    def status(self) -> Dict[str, Any]:
+        """Model-loaded state for health endpoints"""
+        state: Dict[str, Any] = {
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+            "loaded": None,
+            "expires_at": None,
+            "size_vram": None,
+            "seconds_since_last_request": (
+                round(time.monotonic() - self._last_request, 1) if self._last_request else None
+            ),
+            "seconds_since_last_warmup": (
+                round(time.monotonic() - self._last_warmup, 1) if self._last_warmup else None
+            ),
+            "last_warmup_ms": self._last_warmup_ms,
+            "last_error": self._last_error
+        }
+        try:
+            entry = self.loaded_model()
+            state["loaded"] = entry is not None
+            if entry:
+                state["expires_at"] = entry.get("expires_at")
+                state["size_vram"] = entry.get("size_vram")
+        except Exception as e:
+            state["last_error"] = f"{type(e).__name__}: {e}"
+        return state
+
+
+def get_residency_manager() -> Optional[ModelResidencyManager]:
+    """Get or create the residency manager (None when disabled or Ollama is not routed)"""
+    global _residency_manager
+
+    if not settings.OLLAMA_RESIDENCY_ENABLED:
+        return None
+
+    if "ollama" not in configured_provider_names():
+        return None
+
+    if _residency_manager is None:
+        _residency_manager = ModelResidencyManager(
+            base_url=settings.OLLAMA_BASE_URL,
+            model=settings.OLLAMA_MODEL,
+            keep_alive=settings.OLLAMA_KEEP_ALIVE
+        )
+
+    return _residency_manager
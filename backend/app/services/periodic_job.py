@@ -0,0 +1,56 @@
+"""
+Periodic background jobs
+A daemon thread running one maintenance function every `interval_seconds`
+(version compaction, step partitions). A failed pass is logged and the next
+one runs on schedule.
+"""
+from typing import Any, Callable, Optional
+import threading
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    """
+    Background thread calling `fn()` every `interval_seconds`
+
+    With run_at_start, the first pass runs as soon as the job starts instead
+    of after one interval. The latest pass's return value is kept in
+    last_result.
+    """
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval_seconds: float, run_at_start: bool = False):
+        self.name = name
+        self.fn = fn
+        self.interval_seconds = interval_seconds
+        self.run_at_start = run_at_start
+        self.last_result: Any = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> Any:
+        """One pass on the calling thread (failures are logged, not raised)"""
+        try:
+            self.last_result = self.fn()
+        except Exception as e:
+            logger.warning(f"Background job {self.name} failed: {e}")
+        return self.last_result
+
+    def _run(self) -> None:
+        if self.run_at_start:
+            self.run_once()
+        while not self._stop.wait(self.interval_seconds):
+            self.run_once()
@@ -0,0 +1,29 @@
+"""
+Chat prompt templates
+
+The instruction prefix is a constant that always comes first in the prompt,
+byte for byte, so the LLM server can reuse its KV cache for it across
+requests. Everything request-specific (summary, documents, history, question)
+is rendered after it by the template below.
+"""
+
+CHAT_PROMPT_PREFIX = (
+    "INSTRUCTION : Tu es un assistant expert. Utilise toujours les documents ci-dessous pour "
+    "répondre de manière complète et précise. Réponds en français.\n"
+    "Si tu ne trouves pas d'information dans les documents pour répondre, tu réponds que tu "
+    "n'as pas de connaissance sur le sujet.\n"
+    "Quand des documents de contexte sont fournis, utilise UNIQUEMENT ces documents pour répondre.\n"
+    "\n"
+)
+
+# Variable part, appended to CHAT_PROMPT_PREFIX. Tags are kept inline so the
+# rendered text has no indentation or blank-line drift between requests.
+CHAT_PROMPT_TEMPLATE = (
+    "{% if summary %}RÉSUMÉ DE LA CONVERSATION:\n{{ summary }}\n\n{% endif %}"
+    "{% if documents %}CONTEXT DOCUMENTS:\n{{ documents }}\n\n"
+    "{% elif rag_requested %}IMPORTANT: Aucun document pertinent n'a été trouvé dans la base de connaissances.\n"
+    "Tu DOIS répondre: \"Je n'ai pas trouvé d'information sur ce sujet dans la base de connaissances.\"\n\n"
+    "{% endif %}"
+    "{% if history %}CONVERSATION RÉCENTE:\n{{ history }}\n\n{% endif %}"
+    "USER QUESTION: {{ user_message }}\n\nA:"
+)
@@ -0,0 +1,86 @@
+"""
+Single-flight request coalescing
+Concurrent calls sharing the same key wait for one underlying computation
+and all receive its result (or its exception)
+"""
+from typing import Any, Callable, Dict, Hashable, Tuple
+import threading
+
+from app import metrics
+
+
+def normalize_message(message: str) -> str:
+    """Normalize a user message for coalescing keys (case and whitespace insensitive)"""
+    return " ".join(message.split()).casefold()
+
+
+class _Call:
+    """In-flight computation shared by the leader and its followers"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical in-flight calls
+
+    The first caller for a key (the leader) runs the function, callers arriving
+    while it runs block until it finishes and get the same result. Nothing is
+    cached once the call completes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._executed = metrics.counter(
+            f"{name}.executed_requests",
+            "Requests that ran the underlying computation"
+        )
+        self._coalesced = metrics.counter(
+            f"{name}.coalesced_requests",
+            "Requests served by joining an identical in-flight computation"
+        )
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run fn(*args, **kwargs) once per in-flight key
+
+        Returns:
+            (result, coalesced) where coalesced is True if the result
+            was produced by another caller's computation
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            self._coalesced.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        self._executed.inc()
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """Number of distinct computations currently running"""
+        with self._lock:
+            return len(self._calls)
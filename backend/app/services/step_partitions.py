@@ -0,0 +1,169 @@
+"""
+Workflow Step Partitions
+workflow_states / workflow_actions are partitioned by month of capture
+(migrations/010_partition_workflow_steps.sql). This job keeps partitions
+WORKFLOW_STEP_PARTITIONS_AHEAD months ahead, gives rows parked in the
+default partitions their month, and applies retention: partitions older
+than WORKFLOW_STEP_RETENTION_MONTHS are detached, optionally archived as
+gzipped CSV under WORKFLOW_STEP_ARCHIVE_PATH, then dropped. Dropping a
+partition is instant and leaves no dead rows, unlike DELETE.
+
+Workflows themselves are kept: raw_data still holds the full capture.
+
+Maintenance (from backend/):
+    python -m app.services.step_partitions maintain
+    python -m app.services.step_partitions list
+"""
+from typing import Dict, Any, List, Optional
+from datetime import date
+import argparse
+import gzip
+import os
+import time
+
+from app.config import settings
+from app.services.periodic_job import PeriodicJob
+from app.db.queries import workflows as workflow_queries
+from app import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global background job (initialized lazily)
+_partition_job: Optional[PeriodicJob] = None
+
+_created = metrics.counter("workflow_steps.partitions_created", "Monthly step partitions created")
+_dropped = metrics.counter("workflow_steps.partitions_dropped", "Step partitions dropped by retention")
+_archived_bytes = metrics.counter("workflow_steps.archived_bytes", "Compressed bytes of archived step partitions")
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after (or before, if negative) `month`"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_partitions(months_ahead: Optional[int] = None) -> int:
+    """
+    Create the partitions of the current month and `months_ahead` months
+    after it, plus those of months with rows in the default partitions
+
+    Returns:
+        Number of partitions created
+    """
+    months_ahead = settings.WORKFLOW_STEP_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+    this_month = date.today().replace(day=1)
+    created = workflow_queries.create_step_partitions(this_month, add_months(this_month, months_ahead))
+    for month in workflow_queries.get_default_partition_months():
+        created += workflow_queries.create_step_partitions(month, month)
+    _created.inc(created)
+    return created
+
+
+def archive_partition(name: str, archive_path: str) -> int:
+    """
+    Write a detached partition to <archive_path>/<name>.csv.gz
+
+    The file is written under a temporary name and renamed once complete.
+    Returns its size in bytes.
+    """
+    os.makedirs(archive_path, exist_ok=True)
+    path = os.path.join(archive_path, f"{name}.csv.gz")
+    tmp_path = f"{path}.tmp"
+    try:
+        with gzip.open(tmp_path, "wb") as archive:
+            workflow_queries.export_step_partition(name, archive)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return os.path.getsize(path)
+
+
+def apply_retention(retention_months: Optional[int] = None, archive_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Detach, archive (when `archive_path` is set) and drop the partitions of
+    months entirely older than `retention_months` (0 = keep everything)
+
+    A partition left detached by an interrupted run is archived and dropped
+    by the next one.
+    """
+    retention_months = settings.WORKFLOW_STEP_RETENTION_MONTHS if retention_months is None else retention_months
+    archive_path = settings.WORKFLOW_STEP_ARCHIVE_PATH if archive_path is None else archive_path
+
+    totals: Dict[str, Any] = {'dropped': 0, 'archived': 0, 'archived_bytes': 0, 'freed_bytes': 0, 'errors': 0}
+    if retention_months <= 0:
+        return totals
+
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+    for partition in workflow_queries.get_step_partitions():
+        if partition['month'] >= cutoff:
+            continue
+        # One partition at a time: a failure leaves it detached (invisible) for the next run
+        try:
+            if partition['attached']:
+                workflow_queries.detach_step_partition(partition['parent'], partition['name'])
+            if archive_path:
+                totals['archived_bytes'] += archive_partition(partition['name'], archive_path)
+                totals['archived'] += 1
+            workflow_queries.drop_step_partition(partition['name'])
+        except Exception as e:
+            totals['errors'] += 1
+            logger.warning(f"Retention failed for step partition {partition['name']}: {e}")
+            continue
+        totals['dropped'] += 1
+        totals['freed_bytes'] += partition['size_bytes']
+
+    _dropped.inc(totals['dropped'])
+    _archived_bytes.inc(totals['archived_bytes'])
+    return totals
+
+
+def maintain_partitions() -> Dict[str, Any]:
+    """One maintenance pass: partition creation, then retention"""
+    start = time.perf_counter()
+    result = {'created': ensure_partitions(), **apply_retention()}
+    result['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(
+        f"Step partitions: {result['created']} created, {result['dropped']} dropped "
+        f"({result['archived']} archived) in {result['duration_ms']:.0f}ms"
+    )
+    return result
+
+
+def get_partition_job() -> Optional[PeriodicJob]:
+    """Get or create the background partition job (None when disabled)"""
+    global _partition_job
+
+    if settings.WORKFLOW_STEP_MAINTENANCE_INTERVAL_SECONDS <= 0:
+        return None
+
+    if _partition_job is None:
+        # First pass at startup: partitions of the current month must exist
+        _partition_job = PeriodicJob(
+            "step-partitions", maintain_partitions, settings.WORKFLOW_STEP_MAINTENANCE_INTERVAL_SECONDS,
+            run_at_start=True
+        )
+
+    return _partition_job
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Workflow step partition maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("maintain", help="Create upcoming partitions and apply retention")
+    subparsers.add_parser("list", help="List monthly step partitions")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "maintain":
+        print(maintain_partitions())
+    else:
+        partitions: List[Dict[str, Any]] = workflow_queries.get_step_partitions()
+        for partition in partitions:
+            state = "attached" if partition['attached'] else "detached"
+            print(f"{partition['name']}\t{partition['month']}\t{state}\t{partition['size_bytes']}")
+
+
+if __name__ == "__main__":
+    main()
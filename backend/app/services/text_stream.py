@@ -0,0 +1,100 @@
+"""
+Text Streams
+Incremental UTF-8 decoding and word chunking, so large uploads can be
+validated, stored and indexed piece by piece with a flat memory footprint.
+"""
+from typing import Iterable, Iterator, List, Tuple
+from collections import deque
+import codecs
+
+# A "word" longer than this (text without spaces, e.g. minified JSON) is cut:
+# the embedder truncates long inputs anyway, and memory stays bounded
+MAX_WORD_CHARS = 64 * 1024
+
+
+def iter_utf8(chunks: Iterable[bytes]) -> Iterator[str]:
+    """
+    Decode a stream of bytes as UTF-8, characters split across chunks included
+
+    Raises:
+        UnicodeDecodeError: Invalid UTF-8 (raised at the chunk containing it)
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def validate_utf8(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass chunks through unchanged, raising UnicodeDecodeError as soon as they stop being valid UTF-8"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        decoder.decode(chunk)
+        yield chunk
+    decoder.decode(b"", final=True)
+
+
+def iter_words(texts: Iterable[str]) -> Iterator[Tuple[str, int]]:
+    """
+    Split text pieces on spaces like DocumentSplitter(split_by="word"): every
+    word but the last keeps its trailing space. Yields (word, start offset).
+    """
+    carry = ""
+    offset = 0
+    for text in texts:
+        parts = (carry + text).split(" ")
+        carry = parts.pop()
+        for part in parts:
+            yield part + " ", offset
+            offset += len(part) + 1
+        while len(carry) > MAX_WORD_CHARS:
+            yield carry[:MAX_WORD_CHARS], offset
+            offset += MAX_WORD_CHARS
+            carry = carry[MAX_WORD_CHARS:]
+    if carry:
+        yield carry, offset
+
+
+def iter_word_chunks(texts: Iterable[str], split_length: int, split_overlap: int) -> Iterator[Tuple[str, int]]:
+    """
+    Chunks of `split_length` words, consecutive chunks sharing `split_overlap`
+    words (same windows as DocumentSplitter), built from a stream of text.
+    Yields (chunk text, start offset); only one window is held in memory.
+    """
+    if split_overlap >= split_length:
+        raise ValueError("split_overlap must be smaller than split_length")
+    step = split_length - split_overlap
+    window: "deque[Tuple[str, int]]" = deque()
+    new_words = 0
+
+    def chunk() -> Tuple[str, int]:
+        return "".join(word for word, _ in window), window[0][1]
+
+    for word in iter_words(texts):
+        window.append(word)
+        new_words += 1
+        if len(window) == split_length:
+            yield chunk()
+            new_words = 0
+            for _ in range(step):
+                window.popleft()
+
+    # Last, partial window (only if it has words no chunk contains yet)
+    if window and new_words:
+        yield chunk()
+
+
+def batched(items: Iterable, size: int) -> Iterator[List]:
+    """Group an iterable in lists of `size` (the last one may be shorter)"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
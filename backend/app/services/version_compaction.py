@@ -0,0 +1,83 @@
+"""
+Document Version Compaction
+Re-encodes stored versions as periodic snapshots + deltas (rows written
+before delta storage, chains broken into extra snapshots) and prunes versions
+past the configured retention. Runs on demand, or in the background every
+DOCUMENT_VERSION_COMPACTION_INTERVAL_SECONDS.
+"""
+from typing import Dict, Any, Optional
+import time
+
+from app.config import settings
+from app.services.periodic_job import PeriodicJob
+from app.db.queries import documents as document_queries
+from app import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Global background job (initialized lazily)
+_compaction_job: Optional[PeriodicJob] = None
+
+_runs = metrics.counter("document_versions.compaction_runs", "Version compaction passes")
+_pruned = metrics.counter("document_versions.pruned", "Versions deleted by retention")
+_rewritten = metrics.counter("document_versions.rewritten", "Versions re-encoded by compaction")
+_bytes_saved = metrics.counter("document_versions.compaction_bytes_saved", "Stored bytes freed by compaction")
+
+
+def compact_versions(keep_last: Optional[int] = None, max_age_days: Optional[int] = None) -> Dict[str, Any]:
+    """
+    One compaction pass over every candidate document
+
+    Args:
+        keep_last: Versions kept per document (default: DOCUMENT_VERSION_KEEP_LAST, 0 = all)
+        max_age_days: Drop older versions (default: DOCUMENT_VERSION_MAX_AGE_DAYS, 0 = never)
+
+    Returns:
+        Totals of the pass (documents, pruned, rewritten, bytes before / after, errors)
+    """
+    keep_last = settings.DOCUMENT_VERSION_KEEP_LAST if keep_last is None else keep_last
+    max_age_days = settings.DOCUMENT_VERSION_MAX_AGE_DAYS if max_age_days is None else max_age_days
+
+    start = time.perf_counter()
+    totals = {'documents': 0, 'pruned': 0, 'rewritten': 0, 'bytes_before': 0, 'bytes_after': 0, 'errors': 0}
+
+    # One transaction per document: a failure only skips that document
+    for document_id in document_queries.get_compaction_candidates(keep_last, max_age_days):
+        try:
+            result = document_queries.compact_document_versions(document_id, keep_last, max_age_days)
+        except Exception as e:
+            totals['errors'] += 1
+            logger.warning(f"Version compaction failed for document {document_id}: {e}")
+            continue
+        totals['documents'] += 1
+        for key in ('pruned', 'rewritten', 'bytes_before', 'bytes_after'):
+            totals[key] += result[key]
+
+    totals['bytes_saved'] = totals['bytes_before'] - totals['bytes_after']
+    totals['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+    _runs.inc()
+    _pruned.inc(totals['pruned'])
+    _rewritten.inc(totals['rewritten'])
+    _bytes_saved.inc(max(totals['bytes_saved'], 0))
+    logger.info(
+        f"Version compaction: {totals['documents']} documents, {totals['rewritten']} rewritten, "
+        f"{totals['pruned']} pruned, {totals['bytes_saved']} bytes saved in {totals['duration_ms']:.0f}ms"
+    )
+    return totals
+
+
+def get_compaction_job() -> Optional[PeriodicJob]:
+    """Get or create the background compaction job (None when disabled)"""
+    global _compaction_job
+
+    if settings.DOCUMENT_VERSION_COMPACTION_INTERVAL_SECONDS <= 0:
+        return None
+
+    if _compaction_job is None:
+        _compaction_job = PeriodicJob(
+            "version-compaction", compact_versions, settings.DOCUMENT_VERSION_COMPACTION_INTERVAL_SECONDS
+        )
+
+    return _compaction_job
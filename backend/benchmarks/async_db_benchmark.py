@@ -0,0 +1,141 @@
+"""
+Async DB layer benchmark: sync psycopg2 endpoints vs async psycopg 3 endpoints
+
+Builds two small FastAPI apps exposing the same list and get endpoints, one
+with `def` handlers on app.db.queries (threadpool + psycopg2 pool, as before
+the migration) and one with `async def` handlers on app.db.async_queries,
+then drives both in-process with the same concurrency and reports
+requests/sec, p50 and p99 per endpoint.
+
+A throwaway project with --documents documents is created first and deleted
+at the end. Needs DATABASE_URL pointing at a database with the schema.
+
+Usage (from backend/):
+    python -m benchmarks.async_db_benchmark --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.db.queries import projects as sync_projects
+from app.db.queries import documents as sync_documents
+from app.db.async_queries import projects as async_projects
+from app.db.async_queries import documents as async_documents
+from app.db.async_connection import init_async_pool, close_async_pool
+from app.db.connection import close_pool
+from app.metrics import nearest_rank_percentile
+
+
+def build_sync_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/projects")
+    def list_projects():
+        return sync_projects.get_all_projects(limit=50)
+
+    @app.get("/projects/{project_id}")
+    def get_project(project_id: int):
+        return sync_projects.get_project_by_id(project_id)
+
+    @app.get("/projects/{project_id}/documents")
+    def list_documents(project_id: int):
+        return sync_documents.get_documents_by_project(project_id, limit=50)
+
+    @app.get("/documents/{document_id}")
+    def get_document(document_id: int):
+        return sync_documents.get_document_by_id(document_id)
+
+    return app
+
+
+def build_async_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/projects")
+    async def list_projects():
+        return await async_projects.get_all_projects(limit=50)
+
+    @app.get("/projects/{project_id}")
+    async def get_project(project_id: int):
+        return await async_projects.get_project_by_id(project_id)
+
+    @app.get("/projects/{project_id}/documents")
+    async def list_documents(project_id: int):
+        return await async_documents.get_documents_by_project(project_id, limit=50)
+
+    @app.get("/documents/{document_id}")
+    async def get_document(document_id: int):
+        return await async_documents.get_document_by_id(document_id)
+
+    return app
+
+
+async def drive(app: FastAPI, path: str, total: int, concurrency: int):
+    latencies = []
+    remaining = iter(range(total))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "rps": total / elapsed,
+        "p50": nearest_rank_percentile(sorted(latencies), 50),
+        "p99": nearest_rank_percentile(sorted(latencies), 99),
+    }
+
+
+async def run(args):
+    project = sync_projects.create_project("benchmark-async-db", "Temporary benchmark data")
+    document_ids = [
+        sync_documents.create_document(
+            project_id=project["id"],
+            title=f"Benchmark document {i}",
+            content="Lorem ipsum dolor sit amet. " * 40
+        )["id"]
+        for i in range(args.documents)
+    ]
+
+    await init_async_pool()
+    endpoints = {
+        "list projects": "/projects",
+        "get project": f"/projects/{project['id']}",
+        "list documents": f"/projects/{project['id']}/documents",
+        "get document": f"/documents/{document_ids[0]}",
+    }
+
+    try:
+        print(f"{'endpoint':<16}{'mode':<7}{'req/s':>10}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+        for name, path in endpoints.items():
+            for mode, app in (("sync", build_sync_app()), ("async", build_async_app())):
+                await drive(app, path, min(100, args.requests), args.concurrency)  # warm-up
+                stats = await drive(app, path, args.requests, args.concurrency)
+                print(f"{name:<16}{mode:<7}{stats['rps']:>10.0f}{stats['p50']:>10.1f}{stats['p99']:>10.1f}")
+    finally:
+        sync_projects.delete_project(project["id"])
+        await close_async_pool()
+        close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--documents", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Context compression benchmark: full retrieved chunks vs extractive compression
+
+Sends the same questions to the running API's chat endpoint against one RAG,
+once with compress_context=false and once with compress_context=true, and
+reports prompt tokens, compression ratio, compression time and end-to-end
+latency. Start the server with ANSWER_CACHE_ENABLED=false so repeated
+questions are actually generated.
+
+Usage (from backend/):
+    python -m benchmarks.compression_benchmark --api-url http://localhost:8000 --rag-id 1
+"""
+import argparse
+import statistics
+
+import httpx
+
+QUESTIONS = [
+    "Comment créer un nouveau projet ?",
+    "Quelles sont les étapes pour valider un document ?",
+    "Comment indexer tous les documents d'un RAG ?",
+    "Où trouver l'historique des versions d'un document ?",
+    "Comment supprimer un workflow capturé ?",
+    "Quels formats de fichiers peut-on importer ?",
+]
+
+
+def run_mode(client: httpx.Client, rag_id: int, compress: bool, rounds: int):
+    rows = []
+    for _ in range(rounds):
+        for question in QUESTIONS:
+            response = client.post("/api/v1/chat/", json={
+                "message": question,
+                "rag_id": rag_id,
+                "compress_context": compress
+            })
+            response.raise_for_status()
+            rows.append(response.json()["timings"] or {})
+    return rows
+
+
+def mean_of(rows, key):
+    values = [row[key] for row in rows if row.get(key) is not None]
+    return statistics.mean(values) if values else None
+
+
+def fmt(value, width):
+    return f"{value:>{width}.1f}" if value is not None else f"{'-':>{width}}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--rag-id", type=int, required=True)
+    parser.add_argument("--rounds", type=int, default=2)
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.api_url, timeout=300) as client:
+        results = {
+            "full": run_mode(client, args.rag_id, False, args.rounds),
+            "compressed": run_mode(client, args.rag_id, True, args.rounds),
+        }
+
+    print(
+        f"{'mode':<12}{'prompt tokens':>15}{'ratio':>8}{'compress (ms)':>15}"
+        f"{'ttft (ms)':>11}{'total p50 (ms)':>16}{'total mean (ms)':>17}"
+    )
+    for name, rows in results.items():
+        totals = [row["total_ms"] for row in rows if row.get("total_ms") is not None]
+        print(
+            f"{name:<12}{fmt(mean_of(rows, 'prompt_tokens'), 15)}{fmt(mean_of(rows, 'compression_ratio'), 8)}"
+            f"{fmt(mean_of(rows, 'compress_ms'), 15)}{fmt(mean_of(rows, 'ttft_ms'), 11)}"
+            f"{fmt(statistics.median(totals) if totals else None, 16)}{fmt(mean_of(rows, 'total_ms'), 17)}"
+        )
+
+    full = mean_of(results["full"], "total_ms")
+    compressed = mean_of(results["compressed"], "total_ms")
+    if full and compressed:
+        print(f"\nTotal latency change: {(compressed / full - 1) * 100:+.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Pagination benchmark: LIMIT/OFFSET vs keyset cursor at increasing page depth
+
+Fills a throwaway project with --documents documents, then fetches one page
+of get_documents_by_project at several depths, once with `offset` and once
+with the keyset cursor of the previous page, and reports the median query
+time per depth. The project is deleted at the end. Needs DATABASE_URL
+pointing at a database with the schema and migrations applied.
+
+Usage (from backend/):
+    python -m benchmarks.pagination_benchmark --documents 100000 --page-size 50
+"""
+import argparse
+import statistics
+import time
+
+from app.db.connection import get_cursor, close_pool
+from app.db.pagination import decode_cursor, next_cursor
+from app.db.queries import projects as project_queries
+from app.db.queries import documents as document_queries
+
+
+def fill(project_id: int, n: int):
+    """Bulk insert: one INSERT ... SELECT instead of n create_document calls"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO documents (project_id, title, content, content_type, updated_at)
+            SELECT %s, 'Benchmark document ' || i, repeat('Lorem ipsum dolor sit amet. ', 40), 'markdown',
+                   NOW() - make_interval(secs => i)
+            FROM generate_series(1, %s) AS i
+            """,
+            (project_id, n)
+        )
+        cursor.execute("ANALYZE documents")
+
+
+def cursor_at(project_id: int, depth: int):
+    """Keyset position of the row just before `depth` (what the client holds after depth / page_size pages)"""
+    if depth == 0:
+        return None
+    rows = document_queries.get_documents_by_project(
+        project_id, limit=1, offset=depth - 1, summary=True
+    )
+    return decode_cursor(next_cursor(rows, 1, "updated_at"))
+
+
+def time_ms(fn, rounds: int) -> float:
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    project = project_queries.create_project("benchmark-pagination", "Temporary benchmark data")
+    try:
+        fill(project["id"], args.documents)
+        depths = [0] + [d for d in (1000, 10000, 50000, args.documents - args.page_size) if 0 < d < args.documents]
+
+        print(f"{args.documents} documents, page size {args.page_size}, median of {args.rounds}\n")
+        print(f"{'depth':>8}{'offset (ms)':>13}{'cursor (ms)':>13}")
+        for depth in depths:
+            after = cursor_at(project["id"], depth)
+            by_offset = time_ms(lambda: document_queries.get_documents_by_project(
+                project["id"], limit=args.page_size, offset=depth, summary=True
+            ), args.rounds)
+            by_cursor = time_ms(lambda: document_queries.get_documents_by_project(
+                project["id"], limit=args.page_size, summary=True, after=after
+            ), args.rounds)
+            print(f"{depth:>8}{by_offset:>13.2f}{by_cursor:>13.2f}")
+    finally:
+        project_queries.delete_project(project["id"])
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
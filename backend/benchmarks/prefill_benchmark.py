@@ -0,0 +1,147 @@
+"""
+Prefill benchmark: legacy chat prompt layout vs prefix-stable layout
+
+Sends the same set of RAG-style prompts to Ollama's /api/chat, with the
+message structure the LLM router uses (chat template applied by the
+server), in both layouts and reports the prompt evaluation (prefill) time
+and the number of prompt tokens Ollama actually had to evaluate. With the
+prefix-stable layout the instruction prefix is served from the KV cache,
+so prompt_eval_count and prompt_eval_duration drop.
+
+The warm-up rows check the residency manager's warm-up call: each question
+follows an unrelated prompt (which evicts the prefix), with or without a
+ModelResidencyManager-style warm-up in between. If the warm-up primes the
+cache, the warmed row evaluates about the prefix's token count fewer.
+
+Usage (from backend/):
+    python -m benchmarks.prefill_benchmark --ollama-url http://localhost:11434 --model qwen3:4b
+"""
+import argparse
+import statistics
+
+import httpx
+from jinja2 import Template
+
+from app.services.llm_providers import chat_messages
+from app.services.prompts import CHAT_PROMPT_PREFIX, CHAT_PROMPT_TEMPLATE
+
+# Layout used before prompt assembly was made prefix-stable
+LEGACY_PREPROMPT = """Tu es un assistant expert. Utilise toujours les documents ci-dessous pour répondre de manière complète et précise. réponds en francais.
+             Si tu ne trouve pas d'information dans les documents pour répondre tu réponds que tu n'as pas de connaissance sur le sujet"""
+
+LEGACY_TEMPLATE = """INSTRUCTION : {{ preprompt }}
+
+        {% if documents %}
+        CONTEXT DOCUMENTS:
+        {{ documents }}
+
+        Utilise UNIQUEMENT les documents ci-dessus pour répondre.
+        {% else %}
+        {% if rag_requested %}
+        IMPORTANT: Aucun document pertinent n'a été trouvé dans la base de connaissances.
+        Tu DOIS répondre: "Je n'ai pas trouvé d'information sur ce sujet dans la base de connaissances."
+        {% endif %}
+        {% endif %}
+
+        USER QUESTION: {{ user_message }}
+
+        A:"""
+
+QUESTIONS = [
+    "Comment créer un nouveau projet ?",
+    "Quelles sont les étapes pour valider un document ?",
+    "Comment indexer tous les documents d'un RAG ?",
+    "Où trouver l'historique des versions d'un document ?",
+    "Comment supprimer un workflow capturé ?",
+    "Quels formats de fichiers peut-on importer ?",
+]
+
+DOCUMENT = (
+    "Document 1 (score: 0.82):\n"
+    "Pour {topic}, ouvrez le menu principal, choisissez l'action correspondante "
+    "puis confirmez dans la boîte de dialogue. L'opération est journalisée.\n"
+    "Source: Guide utilisateur\n"
+)
+
+
+def render_legacy(question: str) -> str:
+    return Template(LEGACY_TEMPLATE).render(
+        preprompt=LEGACY_PREPROMPT,
+        documents=DOCUMENT.format(topic=question.lower()),
+        rag_requested=True,
+        user_message=question
+    )
+
+
+def render_prefix_stable(question: str) -> str:
+    return CHAT_PROMPT_PREFIX + Template(CHAT_PROMPT_TEMPLATE).render(
+        documents=DOCUMENT.format(topic=question.lower()),
+        rag_requested=True,
+        user_message=question
+    )
+
+
+# Evicts the instruction prefix from the KV cache between warm-up measurements
+UNRELATED_PROMPT = "Write one word about the sea."
+
+
+def chat(client: httpx.Client, model: str, prompt: str) -> dict:
+    response = client.post("/api/chat", json={
+        "model": model,
+        "messages": chat_messages(prompt),
+        "stream": False,
+        "options": {"num_predict": 1, "temperature": 0}
+    })
+    response.raise_for_status()
+    return response.json()
+
+
+def run_layout(client: httpx.Client, model: str, render, rounds: int, warm_up=None):
+    prefill_ms, evaluated_tokens = [], []
+    for _ in range(rounds):
+        for question in QUESTIONS:
+            if warm_up is not None:
+                chat(client, model, UNRELATED_PROMPT)
+                if warm_up:
+                    chat(client, model, CHAT_PROMPT_PREFIX)  # what ModelResidencyManager.warm_up sends
+            data = chat(client, model, render(question))
+            prefill_ms.append(data.get("prompt_eval_duration", 0) / 1e6)
+            evaluated_tokens.append(data.get("prompt_eval_count", 0))
+    return prefill_ms, evaluated_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ollama-url", default="http://localhost:11434")
+    parser.add_argument("--model", default="qwen3:4b")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.ollama_url, timeout=300) as client:
+        # Make sure the model is loaded so load time does not skew the first layout
+        client.post("/api/chat", json={"model": args.model, "messages": [], "stream": False}).raise_for_status()
+
+        results = {}
+        for name, render in (("legacy", render_legacy), ("prefix-stable", render_prefix_stable)):
+            results[name] = run_layout(client, args.model, render, args.rounds)
+        results["no warm-up"] = run_layout(client, args.model, render_prefix_stable, args.rounds, warm_up=False)
+        results["warm-up"] = run_layout(client, args.model, render_prefix_stable, args.rounds, warm_up=True)
+
+    print(f"{'layout':<15}{'prefill p50 (ms)':>18}{'prefill mean (ms)':>19}{'evaluated tokens':>18}")
+    for name, (prefill_ms, evaluated_tokens) in results.items():
+        print(
+            f"{name:<15}{statistics.median(prefill_ms):>18.1f}"
+            f"{statistics.mean(prefill_ms):>19.1f}{statistics.mean(evaluated_tokens):>18.1f}"
+        )
+
+    legacy = statistics.mean(results["legacy"][0])
+    stable = statistics.mean(results["prefix-stable"][0])
+    if legacy:
+        print(f"\nPrefill time reduction: {(1 - stable / legacy) * 100:.1f}%")
+
+    saved = statistics.mean(results["no warm-up"][1]) - statistics.mean(results["warm-up"][1])
+    print(f"Prompt tokens served from cache after warm-up: {saved:.1f}")
+
+
+if __name__ == "__main__":
+    main()
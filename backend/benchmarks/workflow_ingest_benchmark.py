@@ -0,0 +1,136 @@
+"""
+Workflow ingest benchmark: per-row INSERT loop vs batched jsonb_to_recordset
+
+Creates workflows with --actions actions and --states states three ways:
+the former one-INSERT-per-row loop (reproduced here), the sync
+create_workflow and the async create_workflow, and reports ingest time.
+Data is written under a throwaway project deleted at the end. Needs
+DATABASE_URL pointing at a database with the schema.
+
+Usage (from backend/):
+    python -m benchmarks.workflow_ingest_benchmark --actions 10000 --states 2000
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app.db.connection import get_cursor, close_pool
+from app.db.async_connection import close_async_pool
+from app.db.queries import projects as project_queries
+from app.db.queries import workflows as workflow_queries
+from app.db.async_queries import workflows as async_workflow_queries
+
+
+def build_steps(n_actions: int, n_states: int):
+    start = datetime(2025, 1, 1, 9, 0, 0)
+    actions = [
+        {
+            'action_type': 'click' if i % 3 else 'input',
+            'action_data': {'selector': f'#field-{i}', 'value': f'value {i}', 'x': i % 1280, 'y': i % 720},
+            'sequence_order': i,
+            'timestamp': start + timedelta(milliseconds=250 * i)
+        }
+        for i in range(n_actions)
+    ]
+    states = [
+        {
+            'state_type': 'dom',
+            'state_data': {'url': f'https://example.test/page/{i}', 'title': f'Page {i}', 'nodes': i % 400},
+            'sequence_order': i,
+            'timestamp': start + timedelta(milliseconds=1000 * i)
+        }
+        for i in range(n_states)
+    ]
+    return states, actions
+
+
+def create_workflow_row_by_row(project_id, states, actions):
+    """Former implementation: one INSERT per state and per action"""
+    with get_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO workflows (project_id, name, raw_data, workflow_hash)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id
+            """,
+            (project_id, 'row-by-row', json.dumps({}), uuid.uuid4().hex)
+        )
+        workflow_id = cursor.fetchone()['id']
+        for state in states:
+            cursor.execute(
+                """
+                INSERT INTO workflow_states (workflow_id, state_type, state_data, sequence_order, timestamp)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (workflow_id, state['state_type'], json.dumps(state['state_data']),
+                 state['sequence_order'], state['timestamp'])
+            )
+        for action in actions:
+            cursor.execute(
+                """
+                INSERT INTO workflow_actions (workflow_id, action_type, action_data, sequence_order, timestamp)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                (workflow_id, action['action_type'], json.dumps(action['action_data']),
+                 action['sequence_order'], action['timestamp'])
+            )
+
+
+def create_workflow_batched(project_id, states, actions):
+    workflow_queries.create_workflow(
+        project_id=project_id, name='batched', raw_data={}, workflow_hash=uuid.uuid4().hex,
+        states=states, actions=actions
+    )
+
+
+def create_workflow_batched_async(project_id, states, actions):
+    asyncio.run(_create_async(project_id, states, actions))
+
+
+async def _create_async(project_id, states, actions):
+    try:
+        await async_workflow_queries.create_workflow(
+            project_id=project_id, name='batched-async', raw_data={}, workflow_hash=uuid.uuid4().hex,
+            states=states, actions=actions
+        )
+    finally:
+        await close_async_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actions", type=int, default=10000)
+    parser.add_argument("--states", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    states, actions = build_steps(args.actions, args.states)
+    project = project_queries.create_project("benchmark-workflow-ingest", "Temporary benchmark data")
+
+    try:
+        print(f"{args.actions} actions + {args.states} states per workflow, {args.rounds} rounds\n")
+        print(f"{'method':<16}{'median (ms)':>13}{'min (ms)':>10}{'rows/s':>10}")
+        for name, create in (
+            ("row-by-row", create_workflow_row_by_row),
+            ("batched", create_workflow_batched),
+            ("batched async", create_workflow_batched_async),
+        ):
+            durations = []
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                create(project["id"], states, actions)
+                durations.append((time.perf_counter() - start) * 1000)
+            median = statistics.median(durations)
+            rows_per_sec = (args.actions + args.states) / (median / 1000)
+            print(f"{name:<16}{median:>13.0f}{min(durations):>10.0f}{rows_per_sec:>10.0f}")
+    finally:
+        project_queries.delete_project(project["id"])
+        close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+LLMRouter against local OpenAI-compatible stub servers
+
+Each stub answers POST /v1/chat/completions with a streamed completion, after
+an optional delay, or with an HTTP error status.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import socket
+import threading
+import time
+
+import openai
+import pytest
+
+from app.config import settings
+from app.services.llm_providers import LLMProvider, LLMRouter, LLMUnavailableError
+
+
+class StubServer:
+    """OpenAI-compatible chat completions server on 127.0.0.1 (streaming only)"""
+
+    def __init__(self, reply: str = "ok", delay: float = 0.0, status: int = 200):
+        self.reply = reply
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests += 1
+                time.sleep(stub.delay)
+                if stub.status != 200:
+                    body = json.dumps({"error": {"message": "stub failure", "type": "server_error"}}).encode()
+                    self.send_response(stub.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                try:
+                    for chunk in stub.chunks():
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client gave up (timeout)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}/v1"
+
+    def chunks(self):
+        base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": 0, "model": "stub-model"}
+        for word in self.reply.split(" "):
+            yield {**base, "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+        yield {**base, "choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}}
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stubs():
+    """Factory of stub servers, shut down after the test"""
+    servers = []
+
+    def start(**kwargs) -> StubServer:
+        server = StubServer(**kwargs)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@pytest.fixture(autouse=True)
+def router_settings(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_STREAM_USAGE", True)
+    monkeypatch.setattr(settings, "LLM_MAX_ERROR_RATE", 0.5)
+    monkeypatch.setattr(settings, "LLM_PROVIDER_COOLDOWN_SECONDS", 30.0)
+
+
+def provider(name: str, base_url: str, timeout: float = 2.0) -> LLMProvider:
+    return LLMProvider(name, base_url, "stub-model", timeout=timeout, window=10)
+
+
+def closed_port_url() -> str:
+    """Base URL of a local port nothing listens on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def test_generate_returns_text_and_usage(stubs):
+    server = stubs(reply="bonjour")
+    router = LLMRouter([provider("local", server.base_url)])
+
+    result = router.generate("question")
+
+    assert result["text"] == "bonjour"
+    assert result["provider"] == "local"
+    assert result["prompt_tokens"] == 3
+    assert result["completion_tokens"] == 2
+    assert result["latency_ms"] > 0
+
+
+def test_candidates_ordered_by_p95(stubs):
+    slow = stubs(reply="slow", delay=0.15)
+    fast = stubs(reply="fast")
+    router = LLMRouter([provider("slow", slow.base_url), provider("fast", fast.base_url)])
+
+    for _ in range(3):
+        router.generate("question", provider="slow")
+        router.generate("question", provider="fast")
+
+    assert [p.name for p in router.candidates()] == ["fast", "slow"]
+    assert router.generate("question")["provider"] == "fast"
+
+
+def test_unmeasured_provider_is_probed_first(stubs):
+    measured = stubs()
+    new = stubs()
+    router = LLMRouter([provider("measured", measured.base_url), provider("new", new.base_url)])
+    router.generate("question", provider="measured")
+
+    assert [p.name for p in router.candidates()] == ["new", "measured"]
+
+
+def test_failover_on_timeout(stubs):
+    hanging = stubs(delay=2.0)
+    backup = stubs(reply="backup")
+    router = LLMRouter([provider("hanging", hanging.base_url, timeout=0.3), provider("backup", backup.base_url)])
+
+    result = router.generate("question")
+
+    assert result["provider"] == "backup"
+    assert hanging.requests == 1
+    # A timeout opens the circuit right away
+    assert not router.get_provider("hanging").healthy
+    assert router.get_provider("hanging").stats()["last_error"].startswith("APITimeoutError")
+
+
+def test_failover_on_server_error(stubs):
+    failing = stubs(status=500)
+    backup = stubs(reply="backup")
+    router = LLMRouter([provider("failing", failing.base_url), provider("backup", backup.base_url)])
+
+    result = router.generate("question")
+
+    assert result["provider"] == "backup"
+    assert failing.requests == 1
+    assert router.get_provider("failing").stats()["error_rate"] == 1.0
+
+
+def test_failover_on_connection_error(stubs):
+    backup = stubs(reply="backup")
+    router = LLMRouter([provider("down", closed_port_url()), provider("backup", backup.base_url)])
+
+    result = router.generate("question")
+
+    assert result["provider"] == "backup"
+    assert router.get_provider("down").stats()["last_error"].startswith("APIConnectionError")
+
+
+def test_client_errors_do_not_fail_over(stubs):
+    rejecting = stubs(status=400)
+    backup = stubs()
+    router = LLMRouter([provider("rejecting", rejecting.base_url), provider("backup", backup.base_url)])
+
+    with pytest.raises(openai.BadRequestError):
+        router.generate("question")
+
+    assert backup.requests == 0
+
+
+def test_all_providers_failing_raises_unavailable(stubs):
+    first = stubs(status=503)
+    second = stubs(status=502)
+    router = LLMRouter([provider("first", first.base_url), provider("second", second.base_url)])
+
+    with pytest.raises(LLMUnavailableError) as error:
+        router.generate("question")
+
+    assert "first: InternalServerError" in str(error.value)
+    assert "second: InternalServerError" in str(error.value)
+
+
+def test_failing_provider_cools_down_then_recovers(stubs, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER_COOLDOWN_SECONDS", 0.3)
+    flaky = stubs(status=500)
+    backup = stubs(reply="backup", delay=0.05)
+    router = LLMRouter([provider("flaky", flaky.base_url), provider("backup", backup.base_url)])
+
+    router.generate("question")
+    assert not router.get_provider("flaky").healthy
+    # Cooling down: tried last, so the next request goes straight to the backup
+    assert [p.name for p in router.candidates()] == ["backup", "flaky"]
+    router.generate("question")
+    assert flaky.requests == 1
+
+    time.sleep(0.35)
+    assert router.get_provider("flaky").healthy
+    flaky.status = 200
+    router.generate("question")
+    assert flaky.requests == 2
+
+
+def test_pinned_provider_is_the_only_candidate(stubs):
+    slow = stubs(reply="slow", delay=0.1)
+    fast = stubs(reply="fast")
+    router = LLMRouter([provider("slow", slow.base_url), provider("fast", fast.base_url)])
+    router.generate("question", provider="fast")
+
+    assert [p.name for p in router.candidates("slow")] == ["slow"]
+    assert router.generate("question", provider="slow")["provider"] == "slow"
+
+
+def test_pinned_provider_does_not_fail_over(stubs):
+    failing = stubs(status=500)
+    backup = stubs()
+    router = LLMRouter([provider("failing", failing.base_url), provider("backup", backup.base_url)])
+
+    with pytest.raises(LLMUnavailableError):
+        router.generate("question", provider="failing")
+
+    assert backup.requests == 0
+
+
+def test_unknown_pinned_provider(stubs):
+    router = LLMRouter([provider("local", stubs().base_url)])
+
+    with pytest.raises(ValueError, match="Unknown LLM provider 'missing'"):
+        router.generate("question", provider="missing")
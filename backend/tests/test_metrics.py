@@ -0,0 +1,30 @@
+"""
+app.metrics percentiles
+"""
+import pytest
+
+from app.metrics import Histogram, nearest_rank_percentile
+
+
+@pytest.mark.parametrize("q, expected", [(0, 1), (5, 1), (50, 10), (95, 19), (99, 20), (100, 20)])
+def test_nearest_rank_percentile(q, expected):
+    assert nearest_rank_percentile(list(range(1, 21)), q) == expected
+
+
+def test_nearest_rank_percentile_of_few_samples():
+    assert nearest_rank_percentile([], 50) is None
+    assert nearest_rank_percentile([7], 99) == 7
+    # p50 of two samples is the lower one, p95 the upper one
+    assert nearest_rank_percentile([1, 2], 50) == 1
+    assert nearest_rank_percentile([1, 2], 95) == 2
+
+
+def test_histogram_percentiles_over_window():
+    histogram = Histogram("latency", window=10)
+    for value in range(100, 0, -1):
+        histogram.observe(value)
+
+    # Only the 10 most recent samples (10..1) are kept
+    assert histogram.percentile(50) == 5
+    assert histogram.snapshot()["p95"] == 10
+    assert histogram.snapshot()["count"] == 100
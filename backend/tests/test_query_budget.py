@@ -0,0 +1,50 @@
+"""
+SQL statement budgets of API endpoints (app.db.instrumentation.assert_max_queries)
+
+Needs a database created from schema.sql at DATABASE_URL; skipped otherwise.
+"""
+import pytest
+
+from app.db.instrumentation import assert_max_queries
+
+
+@pytest.fixture
+def project_id(client):
+    response = client.post("/api/v1/projects/", json={"name": "Query budget", "description": "test"})
+    assert response.status_code == 201
+    project_id = response.json()["id"]
+    yield project_id
+    client.delete(f"/api/v1/projects/{project_id}")
+
+
+def test_update_project_is_one_statement(client, project_id):
+    with assert_max_queries(1):
+        response = client.put(f"/api/v1/projects/{project_id}", json={"name": "Renamed"})
+
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert response.json()["description"] == "test"
+
+
+def test_update_missing_project_is_one_statement(client):
+    with assert_max_queries(1):
+        response = client.put("/api/v1/projects/2147483647", json={"name": "Renamed"})
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Project 2147483647 not found"
+
+
+def test_delete_project_is_one_statement(client, project_id):
+    with assert_max_queries(1):
+        response = client.delete(f"/api/v1/projects/{project_id}")
+    assert response.status_code == 204
+
+    with assert_max_queries(1):
+        response = client.delete(f"/api/v1/projects/{project_id}")
+    assert response.status_code == 404
+
+
+def test_budget_exceeded_lists_statements(client, project_id):
+    with pytest.raises(AssertionError, match=r"1 queries executed, expected at most 0:\n  1x UPDATE projects"):
+        with assert_max_queries(0):
+            client.put(f"/api/v1/projects/{project_id}", json={"name": "Over budget"})
@@ -0,0 +1,60 @@
+"""
+File uploads to a RAG: identical files in one request
+
+Needs a database created from schema.sql at DATABASE_URL; skipped otherwise.
+"""
+import asyncio
+import json
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def rag_id(client):
+    response = client.post("/api/v1/rags/", json={"name": f"Uploads {uuid.uuid4().hex[:8]}"})
+    assert response.status_code == 201
+    rag_id = response.json()["id"]
+    yield rag_id
+    client.delete(f"/api/v1/rags/{rag_id}")
+
+
+@pytest.fixture
+def first_file_prepared_last(client, monkeypatch):
+    """The first file of a request finishes preparing after the others"""
+    from app.api.v1 import rags
+
+    prepare_upload = rags._prepare_upload
+
+    async def slow_first(position, file):
+        if position == 0:
+            await asyncio.sleep(0.2)
+        return await prepare_upload(position, file)
+
+    monkeypatch.setattr(rags, "_prepare_upload", slow_first)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_first_identical_file_is_the_original(client, rag_id, first_file_prepared_last, stream):
+    content = f"# Identical\n\n{uuid.uuid4()}\n".encode()
+    files = [
+        ("files", ("a.md", content, "text/markdown")),
+        ("files", ("b.md", f"other {uuid.uuid4()}".encode(), "text/markdown")),
+        ("files", ("a2.md", content, "text/markdown")),
+    ]
+
+    response = client.post(f"/api/v1/rags/{rag_id}/upload", params={"stream": stream}, files=files)
+
+    assert response.status_code == 201
+    if stream:
+        lines = [line for line in response.iter_lines() if line]
+        results = [json.loads(line) for line in lines]
+        results = sorted((r for r in results if r["type"] == "result"), key=lambda r: r["position"])
+    else:
+        results = response.json()["results"]
+    assert [r["status"] for r in results] == ["success", "success", "duplicate"]
+    assert results[2]["duplicate_of"] == "a.md"
+    assert results[2]["document_id"] == results[0]["document_id"]
+
+    listed = client.get(f"/api/v1/rags/{rag_id}/files").json()
+    assert sorted(f["filename"] for f in listed) == ["a.md", "b.md"]